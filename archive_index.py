@@ -0,0 +1,59 @@
+# archive_index.py (YENİ - Parçalı arşiv index'i)
+#
+# Her oyunun arşiv geçmişi aylık parçalara (shard) bölünür:
+#   {safe_name}/index.json           -> küçük baş manifest (parça listesi + son girdiler)
+#   {safe_name}/index/YYYYMM.json    -> o aya ait arşiv girdileri (yeniden eskiye)
+# Scraper her çalışmada yalnızca ilgili ayın parçasını ve manifesti yazar;
+# API geçmişi imleç (cursor) tabanlı sayfalarla bu parçalardan okur.
+#
+# Eski tek dosyalı format ({"history": [...]}) okunurken hâlâ desteklenir ve
+# scraper tarafından ilk güncellemede parçalı formata taşınır.
+
+import re
+from typing import Dict, List, Optional
+
+INDEX_FORMAT_VERSION = 2
+HEAD_RECENT_SIZE = 50
+ARCHIVE_KEY_PATTERN = re.compile(r"^[a-z0-9_]+/\d{8}_\d{6}\.json$")
+
+
+def head_key(safe_name: str) -> str:
+    return f"{safe_name}/index.json"
+
+
+def shard_key(safe_name: str, month: str) -> str:
+    return f"{safe_name}/index/{month}.json"
+
+
+def is_archive_key(key: str) -> bool:
+    """Anahtar, bir kez yazılıp değişmeyen bir arşiv nesnesine mi ait?"""
+    return bool(ARCHIVE_KEY_PATTERN.match(key))
+
+
+def archive_month(archive_key: str) -> str:
+    """'{safe_name}/YYYYMMDD_HHMMSS.json' anahtarından 'YYYYMM' ayını çıkarır."""
+    month = archive_key.rsplit("/", 1)[-1][:6]
+    return month if month.isdigit() else "000000"
+
+
+def sort_entries(entries: List[Dict]) -> List[Dict]:
+    """Girdileri anahtara göre yeniden eskiye sıralar (anahtarlar zaman damgası içerir)."""
+    return sorted(entries, key=lambda entry: entry["key"], reverse=True)
+
+
+def split_into_shards(entries: List[Dict]) -> Dict[str, List[Dict]]:
+    shards: Dict[str, List[Dict]] = {}
+    for entry in entries:
+        shards.setdefault(archive_month(entry["key"]), []).append(entry)
+    return {month: sort_entries(items) for month, items in shards.items()}
+
+
+def new_head(game: Optional[str]) -> Dict:
+    return {"game": game, "version": INDEX_FORMAT_VERSION, "total": 0, "shards": [], "recent": []}
+
+
+def page_entries(entries: List[Dict], limit: int, before: Optional[str]) -> List[Dict]:
+    """Sıralı girdilerden imleçten (hariç) sonraki en fazla `limit` girdiyi döner."""
+    if before:
+        entries = [entry for entry in entries if entry["key"] < before]
+    return entries[:limit]
@@ -0,0 +1,304 @@
+# benchmarks/bench_api.py
+#
+# main.py API'si için tekrarlanabilir yük / gecikme ölçümü.
+#
+# Yerel bir S3 taklidi (moto sunucusu) başlatır, üretilmiş *_latest.json,
+# parçalı index, arşiv, logs/ ve stats/ verisiyle doldurur, uygulamayı ayrı
+# bir uvicorn sürecinde bu sunucuya bağlar ve her endpoint'i sabit
+# eşzamanlılıkla belirli bir süre boyunca yükler. Her senaryo için
+# throughput ve p50/p95/p99 gecikmesi raporlanır; SSE senaryosunda çok
+# sayıda /events abonesi açıkken bir yama güncellemesinin tüm abonelere
+# ulaşma süresi ölçülür.
+#
+# Kurulum:  pip install -r requirements.txt -r benchmarks/requirements.txt
+# Kullanım (depo kök dizininden):
+#   python benchmarks/bench_api.py
+#   python benchmarks/bench_api.py --duration 20 --concurrency 100 --sse-clients 1000
+#   python benchmarks/bench_api.py --json sonuc.json     # regresyon karşılaştırması için
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import boto3
+import httpx
+from moto.server import ThreadedMotoServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import archive_index  # noqa: E402
+import search_index  # noqa: E402
+from usage_stats import rollup_entries  # noqa: E402
+
+BUCKET = "bench-bucket"
+GAMES = ["valorant", "roblox", "minecraft", "league_of_legends", "counter_strike_2", "fortnite"]
+CREDENTIALS = {"aws_access_key_id": "bench", "aws_secret_access_key": "bench"}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def fake_patch(game, index):
+    changes = [
+        {
+            "type": random.choice(["nerf", "buff", "new", "fix", "other"]),
+            "target": f"Hedef {i}",
+            "ability": "Genel",
+            "details": {"tr": f"Değişiklik açıklaması {i} " * 4, "en": f"Change description {i} " * 4},
+        }
+        for i in range(random.randint(5, 25))
+    ]
+    return {"game": game, "patch_version": f"{index // 10}.{index % 10}", "date": "unknown",
+            "changes": changes, "impact_score": 6, "impact_label": "Orta"}
+
+
+def seed_bucket(s3, archives_per_game, log_files):
+    """Scraper ve log göndericinin ürettiği düzende test verisi yazar."""
+    s3.create_bucket(Bucket=BUCKET)
+    archive_keys = []
+    start = datetime(2023, 1, 1)
+    for game in GAMES:
+        entries = []
+        search = search_index.new_index(game)
+        for i in range(archives_per_game):
+            moment = start + timedelta(hours=4 * i)
+            key = f"{game}/{moment:%Y%m%d_%H%M%S}.json"
+            patch = fake_patch(game, i)
+            s3.put_object(Bucket=BUCKET, Key=key, Body=json.dumps(patch))
+            search_index.add_patch(search, key, moment.isoformat(), patch)
+            entries.append({"key": key, "date": moment.isoformat(), "patch_version": f"{i}",
+                            "impact_score": 6, "impact_label": "Orta"})
+            archive_keys.append(key)
+        s3.put_object(Bucket=BUCKET, Key=f"{game}_latest.json", Body=json.dumps(fake_patch(game, archives_per_game)))
+
+        head = archive_index.new_head(game)
+        for month, items in archive_index.split_into_shards(entries).items():
+            shard_key = archive_index.shard_key(game, month)
+            s3.put_object(Bucket=BUCKET, Key=shard_key, Body=json.dumps({"game": game, "month": month, "history": items}))
+            head["shards"].append({"month": month, "key": shard_key, "count": len(items)})
+        head["shards"].sort(key=lambda shard: shard["month"], reverse=True)
+        head["total"] = len(entries)
+        head["recent"] = archive_index.sort_entries(entries)[:archive_index.HEAD_RECENT_SIZE]
+        s3.put_object(Bucket=BUCKET, Key=archive_index.head_key(game), Body=json.dumps(head))
+        s3.put_object(Bucket=BUCKET, Key=search_index.search_key(game), Body=search_index.dumps(search))
+
+    log_entries = []
+    now = datetime.utcnow()
+    for f in range(log_files):
+        batch = [{"timestamp": (now - timedelta(minutes=30 * f, seconds=j)).isoformat(), "path": "/public/patches",
+                  "method": "GET", "status_code": random.choice([200] * 19 + [404]),
+                  "game_query": random.choice(GAMES), "process_time_ms": random.uniform(1, 20),
+                  "client_ip": "127.0.0.1"} for j in range(50)]
+        s3.put_object(Bucket=BUCKET, Key=f"logs/usage_{f:06d}.jsonl", Body="\n".join(json.dumps(e) for e in batch))
+        log_entries.extend(batch)
+    for key, rollup in rollup_entries(log_entries).items():
+        s3.put_object(Bucket=BUCKET, Key=key, Body=json.dumps(rollup))
+    return archive_keys
+
+
+def start_api(port, s3_endpoint, workers, sse_poll_interval, verbose):
+    env = dict(os.environ, S3_ENDPOINT_URL=s3_endpoint, S3_BUCKET_NAME=BUCKET,
+               S3_ACCESS_KEY_ID="bench", S3_SECRET_ACCESS_KEY="bench",
+               SSE_POLL_INTERVAL=str(sse_poll_interval), API_KEY="",
+               # Her çalışma boş bir disk katmanıyla başlar (ölçümler tekrarlanabilir kalsın)
+               LOCAL_CACHE_PATH=os.path.join(tempfile.mkdtemp(prefix="gpnai_bench_"), "objects.sqlite3"))
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning", "--no-access-log"],
+        cwd=ROOT, env=env,
+        stdout=None if verbose else subprocess.DEVNULL, stderr=None if verbose else subprocess.DEVNULL,
+    )
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/health", timeout=1).status_code == 200:
+                return process
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("API süreci 30 saniye içinde hazır olmadı.")
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def summarize(name, latencies, errors, elapsed):
+    latencies.sort()
+    return {
+        "scenario": name,
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+    }
+
+
+async def run_load(client, name, make_request, concurrency, duration):
+    """Kapalı döngü yük: her worker bir önceki yanıtı alınca yeni istek gönderir."""
+    latencies, errors = [], 0
+    stop_at = time.perf_counter() + duration
+
+    async def worker():
+        nonlocal errors
+        while time.perf_counter() < stop_at:
+            url, params = make_request()
+            start = time.perf_counter()
+            try:
+                response = await client.get(url, params=params)
+                if response.status_code >= 400:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(name, latencies, errors, time.perf_counter() - start)
+
+
+async def run_sse_fanout(base_url, s3, subscribers, timeout):
+    """N abone açar, bir _latest.json günceller ve olayın abonelere ulaşma süresini ölçer."""
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    connected = 0
+    all_connected = asyncio.Event()
+    delivered = []
+    published_at = {}
+
+    async def subscriber(client):
+        nonlocal connected
+        async with client.stream("GET", f"{base_url}/events") as response:
+            async for line in response.aiter_lines():
+                if line.startswith("retry:"):
+                    connected += 1
+                    if connected == subscribers:
+                        all_connected.set()
+                elif line.startswith("data:") and "at" in published_at:
+                    delivered.append(time.perf_counter() - published_at["at"])
+                    return
+
+    async with httpx.AsyncClient(limits=limits, timeout=None) as client:
+        tasks = [asyncio.create_task(subscriber(client)) for _ in range(subscribers)]
+        connect_start = time.perf_counter()
+        await asyncio.wait_for(all_connected.wait(), timeout=60)
+        connect_time = time.perf_counter() - connect_start
+
+        published_at["at"] = time.perf_counter()
+        await asyncio.to_thread(
+            s3.put_object, Bucket=BUCKET, Key=f"{GAMES[0]}_latest.json", Body=json.dumps(fake_patch(GAMES[0], 9999))
+        )
+        done, pending = await asyncio.wait(tasks, timeout=timeout)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+    delivered.sort()
+    return {
+        "scenario": f"/events fan-out ({subscribers} abone)",
+        "connect_all_s": round(connect_time, 2),
+        "delivered": len(delivered),
+        "p50_ms": round(percentile(delivered, 0.50) * 1000, 1),
+        "p95_ms": round(percentile(delivered, 0.95) * 1000, 1),
+        "p99_ms": round(percentile(delivered, 0.99) * 1000, 1),
+    }
+
+
+async def run_benchmarks(args, base_url, s3, archive_keys):
+    results = []
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        scenarios = [
+            ("/public/patches", lambda: ("/public/patches", {"game": random.choice(GAMES)})),
+            ("/public/patches/batch?games=*", lambda: ("/public/patches/batch", {"games": "*"})),
+            ("/public/patches/history", lambda: ("/public/patches/history", {"game": random.choice(GAMES)})),
+            ("/public/patches/history (derin sayfa)", lambda: (
+                "/public/patches/history",
+                {"game": random.choice(GAMES), "before": random.choice(archive_keys), "limit": 50})),
+            ("/public/patches/archive", lambda: ("/public/patches/archive", {"key": random.choice(archive_keys)})),
+            ("/public/search", lambda: ("/public/search", {
+                "q": f"description {random.randint(0, 24)}", "type": random.choice(["nerf", "buff"])})),
+            ("/public/stats", lambda: ("/public/stats", {})),
+            ("/public/stats?since=7g", lambda: (
+                "/public/stats", {"since": (datetime.utcnow() - timedelta(days=7)).isoformat()})),
+        ]
+        for name, make_request in scenarios:
+            if args.only and args.only not in name:
+                continue
+            result = await run_load(client, name, make_request, args.concurrency, args.duration)
+            results.append(result)
+            print_row(result)
+
+    if args.sse_clients and (not args.only or "events" in args.only):
+        result = await run_sse_fanout(base_url, s3, args.sse_clients, timeout=args.sse_poll_interval * 3 + 10)
+        results.append(result)
+        print(f"{result['scenario']:<42} bağlanma {result['connect_all_s']}s, "
+              f"ulaşan {result['delivered']}, p50 {result['p50_ms']}ms, p95 {result['p95_ms']}ms, p99 {result['p99_ms']}ms")
+    return results
+
+
+def print_row(result):
+    print(f"{result['scenario']:<42}{result['requests']:>9}{result['errors']:>8}{result['rps']:>10}"
+          f"{result['p50_ms']:>10}{result['p95_ms']:>10}{result['p99_ms']:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="API yük ve gecikme ölçümü (moto S3 taklidi ile)")
+    parser.add_argument("--duration", type=float, default=10, help="Senaryo başına süre (saniye)")
+    parser.add_argument("--concurrency", type=int, default=50, help="Eşzamanlı istemci sayısı")
+    parser.add_argument("--sse-clients", type=int, default=200, help="SSE fan-out senaryosundaki abone sayısı (0: atla)")
+    parser.add_argument("--sse-poll-interval", type=int, default=2, help="API'nin SSE_POLL_INTERVAL değeri")
+    parser.add_argument("--archives", type=int, default=500, help="Oyun başına arşiv sayısı")
+    parser.add_argument("--log-files", type=int, default=200, help="logs/ altındaki dosya sayısı")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker sayısı")
+    parser.add_argument("--only", help="Yalnızca adı bu metni içeren senaryoları çalıştır")
+    parser.add_argument("--json", help="Sonuçları bu dosyaya JSON olarak yaz")
+    parser.add_argument("--verbose", action="store_true", help="API ve S3 taklidi loglarını göster")
+    args = parser.parse_args()
+
+    random.seed(42)
+    if not args.verbose:
+        logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    moto_port, api_port = free_port(), free_port()
+    moto = ThreadedMotoServer(ip_address="127.0.0.1", port=moto_port, verbose=False)
+    moto.start()
+    s3_endpoint = f"http://127.0.0.1:{moto_port}"
+    s3 = boto3.client("s3", endpoint_url=s3_endpoint, region_name="us-east-1", **CREDENTIALS)
+    api = None
+    try:
+        print(f"S3 taklidi dolduruluyor ({len(GAMES)} oyun x {args.archives} arşiv, {args.log_files} log dosyası)...")
+        archive_keys = seed_bucket(s3, args.archives, args.log_files)
+        api = start_api(api_port, s3_endpoint, args.workers, args.sse_poll_interval, args.verbose)
+
+        print(f"\n{'senaryo':<42}{'istek':>9}{'hata':>8}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+        results = asyncio.run(run_benchmarks(args, f"http://127.0.0.1:{api_port}", s3, archive_keys))
+        if args.json:
+            with open(args.json, "w", encoding="utf-8") as f:
+                json.dump({"args": vars(args), "results": results}, f, indent=2, ensure_ascii=False)
+    finally:
+        if api is not None:
+            api.terminate()
+            api.wait(timeout=15)
+        moto.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+# benchmarks/bench_extract.py
+#
+# scrapers.py'deki HTML ve RSS çıkarım motorlarını (lxml ve eski bs4 yolu) kayıtlı
+# sayfalar üzerinde karşılaştırır: sayfa başına süre, hızlanma oranı ve iki
+# motorun aynı metni üretip üretmediği.
+#
+# Kullanım (depo kök dizininden):
+#   python benchmarks/bench_extract.py --save      # sources.yaml'daki sayfaları fixtures/ altına kaydeder
+#   python benchmarks/bench_extract.py             # kayıtlı sayfalar üzerinde ölçüm yapar
+#   python benchmarks/bench_extract.py -n 50
+#
+# Fixture dosyaları: fixtures/<safe_name>.listing.html, fixtures/<safe_name>.detail.html
+# ve RSS kaynakları için fixtures/<safe_name>.feed.xml. Depodaki fixture'lar her
+# kaynağın işaretleme yapısını (seçicilerin eşleştiği elemanlar, head'deki büyük
+# script / JSON blokları, uzun yama notu bölümleri) koruyan kırpılmış kopyalardır;
+# metinleri anlamsızdır. Güncel sayfalarla ölçmek için --save ile yenileyin.
+# Hiç fixture yoksa script-ağırlıklı sentetik bir sayfa ile ölçüm yapılır.
+
+import argparse
+import os
+import sys
+import time
+from urllib.parse import urljoin
+
+import yaml
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import scrapers  # noqa: E402
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def load_sources(strategy="html"):
+    with open(os.path.join(ROOT, "sources.yaml"), "r", encoding="utf-8") as f:
+        return [config for config in yaml.safe_load(f) if config.get("strategy") == strategy]
+
+
+def fixture_path(safe_name, kind):
+    extension = "xml" if kind == "feed" else "html"
+    return os.path.join(FIXTURES_DIR, f"{safe_name}.{kind}.{extension}")
+
+
+def save_fixtures():
+    import requests
+
+    os.makedirs(FIXTURES_DIR, exist_ok=True)
+    session = requests.Session()
+    session.headers["User-Agent"] = "Mozilla/5.0 (GPNAI benchmark)"
+    for config in load_sources():
+        try:
+            res = session.get(config["url"], timeout=15)
+            res.raise_for_status()
+            with open(fixture_path(config["safe_name"], "listing"), "wb") as f:
+                f.write(res.content)
+            link_selector = config["selectors"].get("link")
+            if link_selector:
+                link = scrapers.select_one(scrapers.parse_html(res.content), link_selector)
+                if link is not None and link.get("href"):
+                    detail_url = urljoin(config.get("base_url", config["url"]), link.get("href"))
+                    detail = session.get(detail_url, timeout=15)
+                    detail.raise_for_status()
+                    with open(fixture_path(config["safe_name"], "detail"), "wb") as f:
+                        f.write(detail.content)
+            print(f"kaydedildi: {config['safe_name']}")
+        except Exception as e:
+            print(f"atlandı: {config['safe_name']} ({e})")
+    for config in load_sources("rss"):
+        try:
+            res = session.get(config["url"], timeout=15)
+            res.raise_for_status()
+            with open(fixture_path(config["safe_name"], "feed"), "wb") as f:
+                f.write(res.content)
+            print(f"kaydedildi: {config['safe_name']}")
+        except Exception as e:
+            print(f"atlandı: {config['safe_name']} ({e})")
+
+
+def synthetic_page():
+    scripts = "".join(f"<script>window.__DATA_{i}__ = {{{'x' * 4000!r}: [{i}]}};</script>" for i in range(60))
+    paragraphs = "".join(f"<p>Agent {i}: damage reduced from {i + 40} to {i + 35}.</p>" for i in range(150))
+    return (f"<html><head>{scripts}<style>.a{{color:red}}</style></head><body>"
+            f"<nav>{'<a href=/x>x</a>' * 200}</nav><div class='article-body'>{paragraphs}</div>"
+            f"</body></html>").encode("utf-8")
+
+
+def read_fixture(safe_name, kind):
+    path = fixture_path(safe_name, kind)
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def collect_cases():
+    """(isim, baytlar, seçici, çıkarım fonksiyonu) dörtlülerini döner."""
+    cases = []
+    if os.path.isdir(FIXTURES_DIR):
+        for config in load_sources():
+            selectors = config["selectors"]
+            listing = read_fixture(config["safe_name"], "listing")
+            detail = read_fixture(config["safe_name"], "detail")
+            if selectors.get("link") and listing is not None:
+                cases.append((f"{config['safe_name']} (liste)", listing, selectors["link"], extract))
+            if selectors.get("link") and detail is not None:
+                cases.append((f"{config['safe_name']} (detay)", detail, selectors["content"], extract))
+            elif not selectors.get("link") and listing is not None:
+                cases.append((f"{config['safe_name']} (direkt)", listing, selectors["content"], extract))
+        for config in load_sources("rss"):
+            feed = read_fixture(config["safe_name"], "feed")
+            if feed is not None:
+                cases.append((f"{config['safe_name']} (rss)", feed, config["selectors"]["content"], extract_feed))
+    if not cases:
+        print("Fixture bulunamadı, sentetik sayfa kullanılıyor (gerçek sayfalar için --save).\n")
+        cases.append(("sentetik", synthetic_page(), "div.article-body", extract))
+    return cases
+
+
+def extract(content, selector, engine):
+    element = scrapers.select_one(scrapers.parse_html(content, engine=engine), selector)
+    if element is None:
+        return None
+    return element.get("href") if element.get("href") else scrapers.element_text(element)
+
+
+def extract_feed(content, tags, engine):
+    """list_rss_articles'ın her öğeden okuduğu alanlar (etiketlerin metni, guid, link, pubDate)."""
+    results = []
+    for item in scrapers.feed_find_all(scrapers.parse_feed(content, engine=engine), "item"):
+        fields = [scrapers.feed_find(item, tag) for tag in list(tags) + ["guid", "link", "pubDate"]]
+        results.append([scrapers.feed_text(field) if field is not None else None for field in fields])
+    return results
+
+
+def measure(function, content, selector, engine, iterations):
+    function(content, selector, engine)  # ısınma
+    start = time.perf_counter()
+    for _ in range(iterations):
+        result = function(content, selector, engine)
+    return (time.perf_counter() - start) / iterations * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HTML çıkarım motoru karşılaştırması")
+    parser.add_argument("--save", action="store_true", help="sources.yaml'daki sayfaları fixtures/ altına kaydet")
+    parser.add_argument("-n", "--iterations", type=int, default=20)
+    args = parser.parse_args()
+
+    if args.save:
+        save_fixtures()
+        return
+
+    cases = collect_cases()
+    print(f"{'sayfa':<34}{'boyut':>9}{'bs4 ms':>10}{'lxml ms':>10}{'hızlanma':>10}  aynı çıktı")
+    total_bs4 = total_lxml = 0.0
+    for name, content, selector, function in cases:
+        bs4_ms, bs4_result = measure(function, content, selector, "bs4", args.iterations)
+        lxml_ms, lxml_result = measure(function, content, selector, "lxml", args.iterations)
+        total_bs4 += bs4_ms
+        total_lxml += lxml_ms
+        same = "evet" if bs4_result == lxml_result else "HAYIR"
+        print(f"{name:<34}{len(content) // 1024:>7}KB{bs4_ms:>10.2f}{lxml_ms:>10.2f}{bs4_ms / lxml_ms:>9.1f}x  {same}")
+    print(f"{'TOPLAM':<34}{'':>9}{total_bs4:>10.2f}{total_lxml:>10.2f}{total_bs4 / total_lxml:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
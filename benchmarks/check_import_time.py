@@ -0,0 +1,97 @@
+# benchmarks/check_import_time.py
+#
+# Modüllerin import süresini `python -X importtime` ile ölçer ve ağır
+# bağımlılıkların (boto3, google.genai, bs4) import sırasında yüklenmediğini
+# doğrular. Health modu ayrıca uçtan uca (ağ olmadan) çalıştırılır ve S3
+# yığınının hiç yüklenmediği kontrol edilir. Herhangi bir kontrol başarısız
+# olursa çıkış kodu 1'dir; CI'da ya da deploy öncesinde çalıştırılabilir.
+#
+# Kullanım (depo kök dizininden):
+#   python benchmarks/check_import_time.py
+#   python benchmarks/check_import_time.py --budget-ms 800
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# `python scrape.py --run=health` ile aynı yol: outbox __main__'daki gibi kurulur ve sağlık
+# kontrolü çalışır. Ağ yoktur; her istek boş bir sayfa alır, Telegram kanalı hiçbir yere göndermez.
+HEALTH_RUN = f"""
+import functools, os
+os.environ.update(TELEGRAM_BOT_TOKEN="import-check", TELEGRAM_CHAT_ID="import-check")
+import httpx
+httpx.AsyncClient = functools.partial(
+    httpx.AsyncClient, transport=httpx.MockTransport(lambda request: httpx.Response(200, text="<html></html>")))
+import notifier
+notifier.TelegramChannel.send = lambda self, text, parse_mode: None
+import scrape
+os.chdir({ROOT!r})  # sources.yaml
+scrape.start_notifications("health")
+try:
+    scrape.run_health_check()
+finally:
+    scrape.notifications.close()
+"""
+
+# (isim, çalıştırılacak kod, süreç boyunca yüklenmemesi gereken modüller)
+CHECKS = [
+    ("scrape (import)", "import scrape", ("boto3", "botocore", "google.genai", "bs4")),
+    ("scrape --run=health", HEALTH_RUN, ("boto3", "botocore", "google.genai", "bs4")),
+    ("utils", "import utils", ("google.genai",)),
+    ("scrapers", "import scrapers", ("bs4", "boto3")),
+    ("main (API)", "import main", ("boto3", "botocore.client", "google.genai", "bs4")),
+]
+
+# scrape.py import sırasında bu değişkenleri kontrol eder; ölçüm hiçbir servise bağlanmaz.
+DUMMY_ENV = {"GEMINI_API_KEY": "import-check", "S3_BUCKET_NAME": "import-check", "LOCAL_CACHE_PATH": "off"}
+
+
+def profile_import(statement):
+    """(toplam süre ms, yüklenen modül adları) döner."""
+    env = dict(os.environ, PYTHONPATH=ROOT, **DUMMY_ENV)
+    # scrape.py çalışma dizinine scraper.log açar; ölçüm geçici bir dizinde yapılır.
+    with tempfile.TemporaryDirectory() as cwd:
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", statement],
+            cwd=cwd, env=env, capture_output=True, text=True,
+        )
+    if result.returncode != 0:
+        raise RuntimeError(f"'{statement}' başarısız oldu:\n{result.stderr[-2000:]}")
+
+    modules, total_us = set(), 0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line.split(":", 1)[1].split("|")
+        modules.add(name.strip())
+        if not name[1:].startswith(" "):  # yalnızca en üst düzey importlar toplanır (iç içe olanlar girintili)
+            total_us += int(cumulative_us)
+    return total_us / 1000, modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import süresi ve tembel yükleme kontrolü")
+    parser.add_argument("--budget-ms", type=float, default=None, help="Modül başına izin verilen en fazla import süresi")
+    args = parser.parse_args()
+
+    failed = False
+    print(f"{'modül':<24}{'süre ms':>10}  sonuç")
+    for name, statement, forbidden in CHECKS:
+        total_ms, modules = profile_import(statement)
+        loaded = [module for module in forbidden if module in modules]
+        problems = []
+        if loaded:
+            problems.append(f"yüklenmemesi gerekenler yüklendi: {', '.join(loaded)}")
+        if args.budget_ms is not None and total_ms > args.budget_ms:
+            problems.append(f"bütçe aşıldı ({args.budget_ms:.0f} ms)")
+        failed = failed or bool(problems)
+        print(f"{name:<24}{total_ms:>10.1f}  {'; '.join(problems) if problems else 'tamam'}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
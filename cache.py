@@ -0,0 +1,168 @@
+# cache.py (YENİ - S3 okuma cache'i)
+#
+# API'nin S3'ten okuduğu JSON nesneleri için TTL'li, ETag ile doğrulanan ve
+# bayt bütçesiyle sınırlandırılan bellek içi cache. Her segmentin kendi
+# bütçesi vardır; arşiv okumaları güncel yama / index girdilerini düşüremez.
+
+import gzip
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+try:
+    import brotli
+except ImportError:  # brotli kurulu değilse yalnızca gzip sunulur
+    brotli = None
+
+
+class PreparedBody:
+    """Bir JSON nesnesinin önceden serileştirilmiş ve sıkıştırılmış HTTP gövdeleri.
+
+    Her kodlamanın kendi güçlü ETag'i vardır; hepsi aynı içerik özetinden türetilir.
+    """
+
+    def __init__(self, value: Any):
+        self._encode(json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+
+    @classmethod
+    def from_identity(cls, identity: bytes) -> "PreparedBody":
+        """Zaten serileştirilmiş JSON baytlarından oluşturur (parçalardan birleştirilen gövdeler için)."""
+        prepared = cls.__new__(cls)
+        prepared._encode(identity)
+        return prepared
+
+    def _encode(self, identity: bytes):
+        self.identity = identity
+        self.gzip = gzip.compress(self.identity, compresslevel=9, mtime=0)
+        self.br = brotli.compress(self.identity, quality=9) if brotli else None
+        digest = hashlib.sha256(self.identity).hexdigest()[:32]
+        self.etags = {
+            "identity": f'"{digest}"',
+            "gzip": f'"{digest}-gz"',
+            "br": f'"{digest}-br"',
+        }
+
+    @property
+    def size(self) -> int:
+        return len(self.identity) + len(self.gzip) + (len(self.br) if self.br else 0)
+
+    def matches(self, if_none_match: Optional[str]) -> bool:
+        """If-None-Match başlığı bu içeriğin herhangi bir kodlamasıyla eşleşiyor mu?"""
+        if not if_none_match:
+            return False
+        if if_none_match.strip() == "*":
+            return True
+        candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return not candidates.isdisjoint(self.etags.values())
+
+    def select(self, accept_encoding: Optional[str]):
+        """Client'ın kabul ettiği en iyi kodlamayı (kodlama, gövde, etag) olarak döner."""
+        accepted = {part.split(";")[0].strip().lower() for part in (accept_encoding or "").split(",")}
+        if self.br is not None and "br" in accepted:
+            return "br", self.br, self.etags["br"]
+        if "gzip" in accepted:
+            return "gzip", self.gzip, self.etags["gzip"]
+        return "identity", self.identity, self.etags["identity"]
+
+
+@dataclass
+class CacheEntry:
+    value: Any
+    etag: Optional[str]
+    size: int
+    expires_at: float
+    prepared: Optional[PreparedBody] = None
+
+    def is_fresh(self) -> bool:
+        return time.monotonic() < self.expires_at
+
+
+class CacheSegment:
+    """Bayt bütçeli LRU segment. Süresi dolan girdiler silinmez; ETag ile yeniden doğrulanır."""
+
+    def __init__(self, name: str, max_bytes: int, ttl: float):
+        self.name = name
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+        return entry
+
+    def put(self, key: str, value: Any, etag: Optional[str], size: int,
+            prepared: Optional[PreparedBody] = None) -> CacheEntry:
+        self.remove(key)
+        if prepared is not None:
+            size += prepared.size
+        entry = CacheEntry(value=value, etag=etag, size=size, expires_at=time.monotonic() + self.ttl,
+                           prepared=prepared)
+        if size > self.max_bytes:
+            # Bütçeden büyük nesneler cache'lenmez ama çağırana yine döndürülür.
+            return entry
+        self.entries[key] = entry
+        self.total_bytes += size
+        while self.total_bytes > self.max_bytes:
+            _, evicted = self.entries.popitem(last=False)
+            self.total_bytes -= evicted.size
+            self.evictions += 1
+        return entry
+
+    def touch(self, entry: CacheEntry):
+        """304 sonrası girdinin ömrünü yeniler."""
+        entry.expires_at = time.monotonic() + self.ttl
+        self.revalidations += 1
+
+    def remove(self, key: str):
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.total_bytes -= entry.size
+
+    def clear(self):
+        self.entries.clear()
+        self.total_bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self.entries),
+            "bytes": self.total_bytes,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "revalidations": self.revalidations,
+            "evictions": self.evictions,
+        }
+
+
+class ObjectCache:
+    """S3 anahtarını türüne göre doğru segmente yönlendiren segmentli cache."""
+
+    def __init__(self, hot: CacheSegment, archive: CacheSegment, search: CacheSegment):
+        self.hot = hot
+        self.archive = archive
+        self.search = search
+
+    def segment_for(self, key: str) -> CacheSegment:
+        if key.startswith("search:"):
+            return self.search
+        if (key.endswith("_latest.json") or key.endswith("/index.json")
+                or "/index/" in key or key.startswith("stats/")):
+            return self.hot
+        return self.archive
+
+    def invalidate(self, key: str):
+        self.segment_for(key).remove(key)
+
+    def stats(self) -> Dict[str, Any]:
+        return {segment.name: segment.stats() for segment in (self.hot, self.archive, self.search)}
@@ -0,0 +1,69 @@
+# chunking.py (YENİ - Uzun yama notlarını parçalara bölme)
+#
+# 'analysis: chunked' kaynaklarında metin text_limit ile kırpılmaz; scraper
+# başlıkları (h1-h4) SECTION_MARK ile işaretler ve metin burada bölüm
+# sınırlarından, her biri en fazla chunk_size karakterlik parçalara ayrılır.
+# Her parça ayrı analiz edilir ve sonucu içerik özetiyle cache'lenir; uzun bir
+# sayfadaki küçük bir düzenleme yalnızca ilgili parçanın yeniden analizine yol açar.
+#
+# Bölümler parçalara açgözlü biçimde doldurulur, ancak içerik özetine göre seçilen
+# "çapa" bölümlerden sonra parça her zaman kapanır. Böylece bir bölümün uzunluğu
+# değiştiğinde sınırlar yalnızca bir sonraki çapaya kadar kayar, sayfanın geri
+# kalanının parçaları (ve cache anahtarları) aynı kalır.
+
+import hashlib
+from typing import List
+
+SECTION_MARK = "## "
+DEFAULT_CHUNK_SIZE = 6000
+ANCHOR_EVERY = 4  # ortalama kaç bölümde bir zorunlu sınır
+
+
+def _is_anchor(unit: str) -> bool:
+    return int(hashlib.sha256(unit.encode("utf-8")).hexdigest()[:8], 16) % ANCHOR_EVERY == 0
+
+
+def _pack(units: List[str], size: int) -> List[str]:
+    """Birimleri sırayla en fazla `size` karakterlik parçalara toplar (çapalarda parça kapanır)."""
+    chunks, current, length = [], [], 0
+    for unit in units:
+        if current and length + len(unit) + 1 > size:
+            chunks.append("\n".join(current))
+            current, length = [], 0
+        current.append(unit)
+        length += len(unit) + 1
+        if _is_anchor(unit):
+            chunks.append("\n".join(current))
+            current, length = [], 0
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+
+def split_sections(text: str) -> List[str]:
+    """Metni SECTION_MARK ile başlayan satırlardan bölümlere ayırır (ilk başlıktan önceki kısım dahil)."""
+    sections, current = [], []
+    for line in text.splitlines():
+        if line.startswith(SECTION_MARK) and current:
+            sections.append("\n".join(current))
+            current = []
+        if line.strip():
+            current.append(line)
+    if current:
+        sections.append("\n".join(current))
+    return sections
+
+
+def split_into_chunks(text: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> List[str]:
+    """Metni bölüm sınırlarından parçalara ayırır; tek başına sığmayan bölümler satır sınırlarından bölünür."""
+    pieces = []
+    for section in split_sections(text):
+        if len(section) <= chunk_size:
+            pieces.append(section)
+            continue
+        lines = []
+        for line in section.splitlines():
+            # Tek satırı bile sığmayan metin (örn. satır sonu olmayan uzun paragraf) sert bölünür.
+            lines.extend(line[i:i + chunk_size] for i in range(0, len(line), chunk_size))
+        pieces.extend(_pack(lines, chunk_size))
+    return _pack(pieces, chunk_size)
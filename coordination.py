@@ -0,0 +1,130 @@
+# coordination.py (YENİ - Aynı makinedeki uvicorn worker'ları arasında koordinasyon)
+#
+# `uvicorn main:app --workers N` ile her worker R2'yi kendisi yoklar ve kendi
+# cache'ini ayrı ayrı bayatlatır. Koordinasyon modunda (COORDINATION_PATH):
+#   - host başına tek worker, dosya kilidi (flock) ile "poller" seçilir; kilit
+#     sahibi süreç ölürse çekirdek kilidi bırakır ve başka bir worker devralır,
+#   - poller tespit ettiği değişiklikleri paylaşılan bir SQLite bültenine yazar,
+#   - tüm worker'lar bülteni kısa aralıklarla okur, cache'lerini geçersiz kılar ve
+#     olayı kendi SSE abonelerine aynı olay ID'siyle yayınlar.
+# Olay ID'leri bültenden geldiği için Last-Event-ID farklı bir worker'a yeniden
+# bağlanıldığında da geçerlidir.
+
+import fcntl
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+BULLETIN_RETENTION = 500  # bültende tutulan son olay sayısı
+
+
+class HostCoordinator:
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+        self.lock_file = None
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=10, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS events (id INTEGER PRIMARY KEY, payload TEXT NOT NULL, created REAL NOT NULL)"
+        )
+        self.conn.execute("CREATE TABLE IF NOT EXISTS etags (game TEXT PRIMARY KEY, etag TEXT NOT NULL)")
+
+    # --- Poller seçimi ---
+
+    @property
+    def is_leader(self) -> bool:
+        return self.lock_file is not None
+
+    def try_acquire_leadership(self) -> bool:
+        """Kilit boştaysa bu süreci host'un poller'ı yapar. Kilit zaten bizdeyse True döner."""
+        if self.lock_file is not None:
+            return True
+        lock_file = open(f"{self.path}.lock", "a+")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        lock_file.seek(0)
+        lock_file.truncate()
+        lock_file.write(str(os.getpid()))
+        lock_file.flush()
+        self.lock_file = lock_file
+        return True
+
+    def release_leadership(self):
+        if self.lock_file is not None:
+            fcntl.flock(self.lock_file, fcntl.LOCK_UN)
+            self.lock_file.close()
+            self.lock_file = None
+
+    # --- Bülten ---
+
+    def load_etags(self) -> Dict[str, str]:
+        with self.lock:
+            return dict(self.conn.execute("SELECT game, etag FROM etags").fetchall())
+
+    def save_etags(self, etags: Dict[str, str]):
+        with self.lock:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO etags (game, etag) VALUES (?, ?)", list(etags.items())
+            )
+
+    def publish(self, payload: dict) -> int:
+        """Olayı bültene yazar ve ID'sini döner.
+
+        ID'ler milisaniye zaman damgasından türetilir (tek başına çalışan SSEHub ile aynı
+        sıralama) ve her zaman son ID'den büyüktür.
+        """
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                last_id = self.conn.execute("SELECT COALESCE(MAX(id), 0) FROM events").fetchone()[0]
+                event_id = max(int(time.time() * 1000), last_id + 1)
+                self.conn.execute(
+                    "INSERT INTO events (id, payload, created) VALUES (?, ?, ?)",
+                    (event_id, json.dumps(payload), time.time()),
+                )
+                self.conn.execute(
+                    "DELETE FROM events WHERE id NOT IN (SELECT id FROM events ORDER BY id DESC LIMIT ?)",
+                    (BULLETIN_RETENTION,),
+                )
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+        return event_id
+
+    def events_after(self, event_id: int) -> List[Tuple[int, dict]]:
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT id, payload FROM events WHERE id > ? ORDER BY id", (event_id,)
+            ).fetchall()
+        return [(row_id, json.loads(payload)) for row_id, payload in rows]
+
+    def recent_events(self, limit: int) -> List[Tuple[int, dict]]:
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT id, payload FROM events ORDER BY id DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [(row_id, json.loads(payload)) for row_id, payload in reversed(rows)]
+
+
+def open_coordinator(path: Optional[str]) -> Optional[HostCoordinator]:
+    """COORDINATION_PATH boşsa ya da bülten açılamazsa None döner (süreç başına poller)."""
+    if not path:
+        return None
+    try:
+        return HostCoordinator(path)
+    except (OSError, sqlite3.Error) as e:
+        logging.warning(f"KOORDİNASYON bülteni açılamadı ({path}), her worker kendi poller'ını çalıştıracak: {e}")
+        return None
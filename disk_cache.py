@@ -0,0 +1,100 @@
+# disk_cache.py (YENİ - Yerel kalıcı okuma katmanı)
+#
+# Bellek içi cache ile R2 arasında, nesne baytlarını anahtar + ETag ile
+# saklayan SQLite tabanlı disk katmanı. Süreç yeniden başladığında bellek
+# boşalsa da disk dolu kalır:
+#   - değişmez arşiv nesneleri doğrudan diskten sunulur,
+#   - değişebilen nesneler diskteki ETag ile If-None-Match yapılarak doğrulanır
+#     (304 yanıtında gövde R2'den tekrar indirilmez).
+# Aynı dosyayı birden fazla uvicorn worker'ı paylaşabilir (WAL modu).
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional, Tuple
+
+PRUNE_TARGET_RATIO = 0.9
+
+
+class DiskCache:
+    def __init__(self, path: str, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=10, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS objects ("
+            " key TEXT PRIMARY KEY, etag TEXT, body BLOB NOT NULL, size INTEGER NOT NULL, accessed REAL NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS objects_accessed ON objects (accessed)")
+        self.total_bytes = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM objects").fetchone()[0]
+
+    # Disk hataları okuma yolunu bozmaz: katman o işlem için atlanır ve R2'ye gidilir.
+
+    def get(self, key: str) -> Optional[Tuple[bytes, Optional[str]]]:
+        """(gövde, etag) döner; yoksa None."""
+        try:
+            with self.lock:
+                row = self.conn.execute("SELECT body, etag FROM objects WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    self.misses += 1
+                    return None
+                self.conn.execute("UPDATE objects SET accessed = ? WHERE key = ?", (time.time(), key))
+                self.hits += 1
+                return bytes(row[0]), row[1]
+        except sqlite3.Error as e:
+            logging.warning(f"DISK CACHE okuma hatası ({key}): {e}")
+            return None
+
+    def put(self, key: str, body: bytes, etag: Optional[str]):
+        if len(body) > self.max_bytes:
+            return
+        try:
+            with self.lock:
+                previous = self.conn.execute("SELECT size FROM objects WHERE key = ?", (key,)).fetchone()
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO objects (key, etag, body, size, accessed) VALUES (?, ?, ?, ?, ?)",
+                    (key, etag, body, len(body), time.time()),
+                )
+                self.total_bytes += len(body) - (previous[0] if previous else 0)
+                if self.total_bytes > self.max_bytes:
+                    self._prune()
+        except sqlite3.Error as e:
+            logging.warning(f"DISK CACHE yazma hatası ({key}): {e}")
+
+    def remove(self, key: str):
+        try:
+            with self.lock:
+                row = self.conn.execute("SELECT size FROM objects WHERE key = ?", (key,)).fetchone()
+                if row:
+                    self.conn.execute("DELETE FROM objects WHERE key = ?", (key,))
+                    self.total_bytes -= row[0]
+        except sqlite3.Error as e:
+            logging.warning(f"DISK CACHE silme hatası ({key}): {e}")
+
+    def _prune(self):
+        """En uzun süredir okunmayan nesneleri bütçenin altına inene kadar siler."""
+        # Diğer worker'ların yazdıklarıyla birlikte gerçek toplam yeniden okunur.
+        self.total_bytes = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM objects").fetchone()[0]
+        target = self.max_bytes * PRUNE_TARGET_RATIO
+        removed = 0
+        for key, size in self.conn.execute("SELECT key, size FROM objects ORDER BY accessed").fetchall():
+            if self.total_bytes <= target:
+                break
+            self.conn.execute("DELETE FROM objects WHERE key = ?", (key,))
+            self.total_bytes -= size
+            removed += 1
+        logging.info(f"DISK CACHE: {removed} nesne silindi ({self.total_bytes} bayt kaldı).")
+
+    def stats(self):
+        return {"path": self.path, "bytes": self.total_bytes, "max_bytes": self.max_bytes,
+                "hits": self.hits, "misses": self.misses}
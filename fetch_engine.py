@@ -0,0 +1,153 @@
+# fetch_engine.py (YENİ - Asenkron HTTP motoru)
+#
+# Scraper'ın html / rss stratejileri ve sağlık kontrolü tek bir httpx.AsyncClient
+# üzerinden, tek event loop'ta çalışır (kaynak başına thread yok):
+#   - ortak bağlantı havuzu (FETCH_MAX_CONNECTIONS); `h2` paketi kuruluysa HTTP/2,
+#   - host başına eşzamanlılık sınırı (FETCH_PER_HOST_LIMIT) ve aynı host'a
+#     ardışık istekler arasında en az FETCH_HOST_INTERVAL saniye (nezaket aralığı),
+#   - 429 / 5xx yanıtlarında ve bağlantı hatalarında artan beklemeli yeniden
+#     deneme (Retry-After başlığına uyulur),
+#   - tüm kaynaklar için ortak son tarih (FETCH_DEADLINE): süresi dolan kaynaklar
+#     iptal edilir ve başarısız sayılır.
+
+import asyncio
+import logging
+import os
+import time
+from email.utils import parsedate_to_datetime
+from typing import Awaitable, Dict, List, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+FETCH_MAX_CONNECTIONS = int(os.getenv("FETCH_MAX_CONNECTIONS", "20"))
+FETCH_PER_HOST_LIMIT = int(os.getenv("FETCH_PER_HOST_LIMIT", "2"))
+FETCH_HOST_INTERVAL = float(os.getenv("FETCH_HOST_INTERVAL", "0.5"))  # saniye
+FETCH_DEADLINE = float(os.getenv("FETCH_DEADLINE", "120"))  # saniye, tüm kaynaklar için
+FETCH_TIMEOUT = 15  # saniye, istek başına
+FETCH_RETRIES = 3
+FETCH_BACKOFF_FACTOR = 1.0
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/129.0 Safari/537.36"
+
+
+def http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _retry_after(response: httpx.Response) -> float:
+    """Retry-After başlığını (saniye ya da HTTP tarihi) saniyeye çevirir; yoksa 0."""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return 0.0
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class _HostGate:
+    """Bir host'a aynı anda en fazla `limit` istek ve istek başlangıçları arasında en az `interval` saniye."""
+
+    def __init__(self, limit: int, interval: float):
+        self.semaphore = asyncio.Semaphore(limit)
+        self.interval = interval
+        self.next_start = 0.0
+
+    async def wait_turn(self):
+        # Sıra await'ten önce ayrılır; bekleyen istekler aralıklı zaman dilimlerine dağılır.
+        now = time.monotonic()
+        start = max(now, self.next_start)
+        self.next_start = start + self.interval
+        if start > now:
+            await asyncio.sleep(start - now)
+
+
+class AsyncFetcher:
+    """Scraper fonksiyonlarının `session` yerine kullandığı asenkron HTTP istemcisi."""
+
+    def __init__(self, max_connections: int = FETCH_MAX_CONNECTIONS, per_host_limit: int = FETCH_PER_HOST_LIMIT,
+                 host_interval: float = FETCH_HOST_INTERVAL, retries: int = FETCH_RETRIES,
+                 backoff_factor: float = FETCH_BACKOFF_FACTOR, timeout: float = FETCH_TIMEOUT):
+        self.per_host_limit = per_host_limit
+        self.host_interval = host_interval
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.hosts: Dict[str, _HostGate] = {}
+        self.client = httpx.AsyncClient(
+            http2=http2_available(),
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            timeout=timeout,
+            follow_redirects=True,
+            headers={"User-Agent": USER_AGENT},
+        )
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def close(self):
+        await self.client.aclose()
+
+    def _gate(self, url: str) -> _HostGate:
+        host = urlsplit(url).netloc
+        gate = self.hosts.get(host)
+        if gate is None:
+            gate = self.hosts[host] = _HostGate(self.per_host_limit, self.host_interval)
+        return gate
+
+    async def get(self, url: str, headers: Optional[Dict[str, str]] = None) -> httpx.Response:
+        """GET isteği yapar; geçici hatalarda en fazla `retries` kez yeniden dener.
+
+        Son denemenin yanıtı (hata durum kodu olsa da) döner; durum kontrolü çağırana aittir.
+        """
+        gate = self._gate(url)
+        for attempt in range(self.retries + 1):
+            delay = self.backoff_factor * (2 ** attempt)
+            async with gate.semaphore:
+                await gate.wait_turn()
+                try:
+                    response = await self.client.get(url, headers=headers)
+                except httpx.TransportError as e:
+                    if attempt == self.retries:
+                        raise
+                    logging.info(f"FETCH: {url} bağlantı hatası ({e!r}), {delay:.1f} sn sonra yeniden denenecek.")
+                else:
+                    if response.status_code not in RETRY_STATUSES or attempt == self.retries:
+                        return response
+                    delay = max(delay, _retry_after(response))
+                    logging.info(f"FETCH: {url} {response.status_code} döndü, {delay:.1f} sn sonra yeniden denenecek.")
+            await asyncio.sleep(delay)
+
+
+async def run_with_deadline(coros: List[Awaitable], deadline: Optional[float] = FETCH_DEADLINE) -> List:
+    """Coroutine'leri eşzamanlı çalıştırır ve sonuçları aynı sırayla döner.
+
+    Hata fırlatanların yerine istisna nesnesi, son tarihe yetişmeyenlerin yerine
+    asyncio.TimeoutError döner (bu görevler iptal edilir). 'deadline' None ise süre sınırı yoktur.
+    """
+    tasks = [asyncio.ensure_future(coro) for coro in coros]
+    if not tasks:
+        return []
+    _, pending = await asyncio.wait(tasks, timeout=deadline)
+    for task in pending:
+        task.cancel()
+    await asyncio.gather(*pending, return_exceptions=True)
+
+    results = []
+    for task in tasks:
+        if task in pending:
+            results.append(asyncio.TimeoutError(f"{deadline} sn son tarihi aşıldı"))
+        elif task.exception() is not None:
+            results.append(task.exception())
+        else:
+            results.append(task.result())
+    return results
@@ -0,0 +1,122 @@
+# log_shipper.py (YENİ - Kullanım logu gönderimi)
+#
+# API istek loglarını bir asyncio kuyruğunda biriktirir ve adet ya da süre
+# eşiğine ulaşıldığında toplu olarak yazar. Kuyruk sınırlıdır: dolduğunda
+# yeni girdiler düşürülür, bellek sınırsız büyümez. Uygulama kapanırken
+# kuyrukta kalan her şey son bir kez yazılır.
+
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Dict, List
+
+
+class UsageLogShipper:
+    def __init__(
+        self,
+        write_batch: Callable[[List[Dict]], Awaitable[None]],
+        max_batch_size: int = 50,
+        flush_interval: float = 60.0,
+        max_queue_size: int = 10000,
+        retry_delay: float = 5.0,
+    ):
+        self.write_batch = write_batch
+        self.max_batch_size = max_batch_size
+        self.flush_interval = flush_interval
+        self.max_queue_size = max_queue_size
+        self.retry_delay = retry_delay
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue_size)
+        self.pending: List[Dict] = []  # Yazılamamış, yeniden denenecek girdiler
+        self.dropped = 0
+        self.shipped = 0
+        self._task = None
+        # Durdurma sinyali: görev iptal edilmez (Python 3.11'de wait_for içinde bekleyen bir
+        # görevin iptali, get() aynı adımda tamamlanırsa kaybolabiliyor; CPython gh-86296).
+        self._stopping = asyncio.Event()
+
+    @property
+    def depth(self) -> int:
+        return self.queue.qsize() + len(self.pending)
+
+    def submit(self, entry: Dict) -> bool:
+        """Girdiyi kuyruğa ekler. Kuyruk doluysa girdiyi düşürür ve False döner."""
+        try:
+            self.queue.put_nowait(entry)
+            return True
+        except asyncio.QueueFull:
+            self.dropped += 1
+            if self.dropped % 1000 == 1:
+                logging.warning(f"⚠️ Log kuyruğu dolu, girdiler düşürülüyor (toplam {self.dropped}).")
+            return False
+
+    def start(self):
+        self._stopping.clear()
+        self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        """Arka plan görevini durdurur ve kuyrukta kalanları son kez yazar."""
+        if self._task:
+            # Görev süren yazmayı bitirip kendiliğinden çıkar; aynı batch iki kez yazılmaz.
+            self._stopping.set()
+            await self._task
+            self._task = None
+        self._drain_queue(everything=True)
+        while self.pending:
+            if not await self._flush():
+                logging.error(f"❌ Kapanışta {len(self.pending)} log girdisi yazılamadı.")
+                break
+
+    async def _run(self):
+        while not self._stopping.is_set():
+            deadline = time.monotonic() + self.flush_interval
+            while len(self.pending) < self.max_batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0 or not await self._wait_for_entry(timeout):
+                    break
+                self._drain_queue()
+            if not self.pending:
+                continue
+            if not await self._flush():
+                await self._wait_for_stop(self.retry_delay)
+
+    async def _wait_for_entry(self, timeout: float) -> bool:
+        """En fazla `timeout` sn bir girdi bekler ve onu pending'e alır; süre dolar ya da durdurulursa False."""
+        getter = asyncio.ensure_future(self.queue.get())
+        stopper = asyncio.ensure_future(self._stopping.wait())
+        await asyncio.wait({getter, stopper}, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+        stopper.cancel()
+        if getter.done():
+            self.pending.append(getter.result())
+            return True
+        # Tamamlanmamış get() iptal edilir; girdi henüz kuyruktan alınmadığı için kaybolmaz.
+        getter.cancel()
+        return False
+
+    async def _wait_for_stop(self, timeout: float):
+        try:
+            await asyncio.wait_for(self._stopping.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    def _drain_queue(self, everything: bool = False):
+        while everything or len(self.pending) < self.max_batch_size:
+            try:
+                self.pending.append(self.queue.get_nowait())
+            except asyncio.QueueEmpty:
+                break
+
+    async def _flush(self) -> bool:
+        batch = self.pending[:self.max_batch_size]
+        try:
+            await self.write_batch(batch)
+        except Exception as e:
+            logging.error(f"❌ Log yazma hatası: {e}")
+            # Yeniden denenecek girdiler de bellek sınırına tabidir; en eskiler düşer.
+            overflow = len(self.pending) - self.max_queue_size
+            if overflow > 0:
+                del self.pending[:overflow]
+                self.dropped += overflow
+            return False
+        del self.pending[:len(batch)]
+        self.shipped += len(batch)
+        return True
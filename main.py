@@ -1,17 +1,34 @@
 import os
 import json
-import boto3
 import time
-import threading
+import gzip
+import zlib
+import uuid
 import logging
 import asyncio
-from fastapi import FastAPI, HTTPException, Header, Depends, Query, Request, BackgroundTasks
-from fastapi.responses import JSONResponse, StreamingResponse
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from botocore.exceptions import ClientError
+from fastapi import FastAPI, HTTPException, Header, Depends, Query, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, Gauge, generate_latest
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
-from datetime import datetime
-from functools import lru_cache
+from datetime import datetime, timedelta, timezone
 from typing import Optional
+import archive_index
+import metrics
+import patch_diff
+import search_index
+from log_shipper import UsageLogShipper
+from disk_cache import DiskCache
+from coordination import open_coordinator
+from cache import CacheEntry, CacheSegment, ObjectCache, PreparedBody
+from usage_stats import (
+    MAX_WINDOW, TOTAL_ROLLUP_KEY, apply_entries_to_rollups, summarize_rollups, window_keys,
+)
 
 # --- Ortam değişkenlerini yükle ---
 load_dotenv()
@@ -20,14 +37,42 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
 
 # --- S3 Client Kurulumu ---
-s3_client = boto3.client(
-    "s3",
-    endpoint_url=os.getenv("S3_ENDPOINT_URL"),
-    aws_access_key_id=os.getenv("S3_ACCESS_KEY_ID"),
-    aws_secret_access_key=os.getenv("S3_SECRET_ACCESS_KEY"),
-    region_name="auto",
-)
+# boto3 senkron çalışır; tüm çağrılar aşağıdaki sınırlı thread havuzunda yürütülür.
+# Bağlantı havuzu, havuzdaki thread sayısıyla aynı boyutta tutulur.
+# Client (ve boto3) ilk S3 işleminde oluşturulur; başlangıç ısıtması bunu ilk isteklerden önce yapar.
+S3_MAX_CONCURRENCY = int(os.getenv("S3_MAX_CONCURRENCY", "16"))
+_s3_client = None
+_s3_client_lock = threading.Lock()
+
+
+def get_s3_client():
+    global _s3_client
+    if _s3_client is None:
+        with _s3_client_lock:
+            if _s3_client is None:
+                import boto3
+                from botocore.config import Config
+
+                client = boto3.client(
+                    "s3",
+                    endpoint_url=os.getenv("S3_ENDPOINT_URL"),
+                    aws_access_key_id=os.getenv("S3_ACCESS_KEY_ID"),
+                    aws_secret_access_key=os.getenv("S3_SECRET_ACCESS_KEY"),
+                    region_name="auto",
+                    config=Config(
+                        max_pool_connections=S3_MAX_CONCURRENCY,
+                        connect_timeout=5,
+                        read_timeout=15,
+                        retries={"max_attempts": 3, "mode": "standard"},
+                    ),
+                )
+                metrics.instrument_s3_client(client, metrics.S3_REQUESTS, metrics.S3_REQUEST_DURATION)
+                _s3_client = client
+    return _s3_client
+
+
 S3_BUCKET_NAME = os.getenv("S3_BUCKET_NAME")
+s3_executor = ThreadPoolExecutor(max_workers=S3_MAX_CONCURRENCY, thread_name_prefix="s3")
 API_KEY = os.getenv("API_KEY")
 
 # --- API Anahtarı Doğrulama ---
@@ -37,8 +82,22 @@ async def verify_key(x_api_key: Optional[str] = Header(None)):
     if x_api_key != API_KEY:
         raise HTTPException(status_code=403, detail="Geçersiz API Anahtarı")
 
+# --- Uygulama Yaşam Döngüsü ---
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    poller_task = asyncio.create_task(coordinated_poller() if coordinator else sse_poller())
+    warmup_task = asyncio.create_task(warm_cache())
+    usage_log_shipper.start()
+    yield
+    warmup_task.cancel()
+    poller_task.cancel()
+    if coordinator:
+        coordinator.release_leadership()
+    await usage_log_shipper.close()
+    s3_executor.shutdown(wait=False, cancel_futures=True)
+
 # --- FastAPI Uygulaması ---
-app = FastAPI(title="Game Patch Notes Intelligence API", version="4.4")
+app = FastAPI(title="Game Patch Notes Intelligence API", version="4.4", lifespan=lifespan)
 
 # --- CORS Middleware ---
 app.add_middleware(
@@ -53,44 +112,58 @@ app.add_middleware(
 # ==========   KULLANIM LOG MIDDLEWARE (YENİ)  =========
 # ======================================================
 
-log_buffer = []
-log_lock = threading.Lock()
-MAX_LOG_BUFFER_SIZE = 50  # 50 istekte bir R2’ye yaz
+LOG_FLUSH_BATCH_SIZE = int(os.getenv("LOG_FLUSH_BATCH_SIZE", "50"))
+LOG_FLUSH_INTERVAL = float(os.getenv("LOG_FLUSH_INTERVAL", "60"))  # saniye
+LOG_MAX_QUEUE_SIZE = int(os.getenv("LOG_MAX_QUEUE_SIZE", "10000"))
 
-def write_logs_to_r2():
-    """Bellekteki logları R2'ye toplu halde yazar ve belleği temizler."""
-    global log_buffer
 
-    with log_lock:
-        if not log_buffer:
-            return
-        logs_to_write = log_buffer.copy()
-        log_buffer = []
+def write_log_batch_to_r2(logs_to_write: list):
+    """Log batch'ini gzip'li JSONL olarak R2'ye yazar ve istatistik rollup'larını günceller."""
+    log_content = "\n".join(json.dumps(log) for log in logs_to_write)
+    timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
+    # Birden fazla worker aynı saniyede yazabilir; anahtar süreç kimliğiyle ayrışır.
+    log_key = f"logs/usage_{timestamp}_{os.getpid()}_{uuid.uuid4().hex[:6]}.jsonl.gz"
 
+    s3_client = get_s3_client()
+    s3_client.put_object(
+        Bucket=S3_BUCKET_NAME,
+        Key=log_key,
+        Body=gzip.compress(log_content.encode("utf-8")),
+        ContentType="application/gzip",
+    )
+    logging.info(f"✅ {len(logs_to_write)} adet log R2'ye yazıldı: {log_key}")
+
+    # Log dosyası yazıldı; rollup hatası batch'i tekrar denetmez (çift sayımı önler).
     try:
-        log_content = "\n".join(json.dumps(log) for log in logs_to_write)
-        timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
-        log_key = f"logs/usage_{timestamp}.jsonl"
-
-        s3_client.put_object(
-            Bucket=S3_BUCKET_NAME,
-            Key=log_key,
-            Body=log_content.encode("utf-8"),
-            ContentType="application/jsonl",
-        )
-        logging.info(f"✅ {len(logs_to_write)} adet log R2'ye yazıldı: {log_key}")
+        apply_entries_to_rollups(s3_client, S3_BUCKET_NAME, logs_to_write)
     except Exception as e:
-        logging.error(f"❌ Log yazma hatası: {e}")
-        with log_lock:
-            log_buffer.extend(logs_to_write)  # Geri ekle, veri kaybı olmasın
+        logging.error(f"❌ İstatistik rollup güncelleme hatası: {e}")
+
+
+async def write_logs_to_r2(logs_to_write: list):
+    await run_s3(write_log_batch_to_r2, logs_to_write)
+
+
+usage_log_shipper = UsageLogShipper(
+    write_logs_to_r2,
+    max_batch_size=LOG_FLUSH_BATCH_SIZE,
+    flush_interval=LOG_FLUSH_INTERVAL,
+    max_queue_size=LOG_MAX_QUEUE_SIZE,
+)
 
 @app.middleware("http")
 async def log_api_usage(request: Request, call_next):
-    """Her API isteğini loglar ve gerekirse R2’ye flush eder."""
+    """Her API isteğini loglar; yazma işini arka plandaki log gönderici üstlenir."""
     start_time = time.time()
     response = await call_next(request)
     duration_ms = (time.time() - start_time) * 1000
 
+    # Route şablonu kullanılır (örn. /public/patches); eşleşmeyen yollar tek etikette toplanır.
+    route = request.scope.get("route")
+    metrics.HTTP_REQUEST_DURATION.labels(
+        route.path if route else "unmatched", request.method, str(response.status_code)
+    ).observe(duration_ms / 1000)
+
     path = request.url.path
     if path.startswith("/public/patches") or path == "/patches":
         game = request.query_params.get("game", "unknown")
@@ -104,12 +177,7 @@ async def log_api_usage(request: Request, call_next):
             "client_ip": request.client.host,
         }
 
-        with log_lock:
-            log_buffer.append(log_entry)
-            if len(log_buffer) >= MAX_LOG_BUFFER_SIZE:
-                if "background" not in response.__dict__:
-                    response.background = BackgroundTasks()
-                response.background.add_task(write_logs_to_r2)
+        usage_log_shipper.submit(log_entry)
 
     return response
 
@@ -118,118 +186,441 @@ async def log_api_usage(request: Request, call_next):
 # ==========   S3 OKUMA / CACHE MEKANİZMASI  ===========
 # ======================================================
 
-@lru_cache(maxsize=10)
-def fetch_from_s3(filename: str):
-    """Belirtilen dosyayı S3’ten çeker ve cache’ler."""
+def _is_not_found(error: ClientError) -> bool:
+    return error.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound")
+
+
+async def run_s3(func, *args):
+    """Bloklayan bir S3 işlemini event loop'u tutmadan S3 thread havuzunda çalıştırır."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(s3_executor, func, *args)
+
+
+NOT_MODIFIED = object()
+
+
+def _get_object_sync(key: str, if_none_match: Optional[str] = None):
+    """(gövde, etag) döner. Nesne yoksa None, ETag eşleşirse NOT_MODIFIED döner.
+
+    Gövde okuması da ağ I/O'su olduğu için aynı thread'de yapılır.
+    """
+    params = {"Bucket": S3_BUCKET_NAME, "Key": key}
+    if if_none_match:
+        params["IfNoneMatch"] = if_none_match
     try:
-        response = s3_client.get_object(Bucket=S3_BUCKET_NAME, Key=filename)
-        content = response["Body"].read()
-        return json.loads(content)
-    except s3_client.exceptions.NoSuchKey:
+        response = get_s3_client().get_object(**params)
+        return response["Body"].read(), response.get("ETag")
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") in ("304", "NotModified"):
+            return NOT_MODIFIED
+        if _is_not_found(e):
+            return None
+        raise
+
+
+def _get_object_bytes_sync(key: str) -> Optional[bytes]:
+    result = _get_object_sync(key)
+    return result[0] if result else None
+
+
+def _head_etag_sync(key: str) -> Optional[str]:
+    try:
+        response = get_s3_client().head_object(Bucket=S3_BUCKET_NAME, Key=key)
+        return response.get("ETag")
+    except ClientError as e:
+        if _is_not_found(e):
+            return None
+        raise
+
+
+async def s3_get_bytes(key: str) -> Optional[bytes]:
+    return await run_s3(_get_object_bytes_sync, key)
+
+
+async def s3_head_etag(key: str) -> Optional[str]:
+    return await run_s3(_head_etag_sync, key)
+
+
+# --- Cache: güncel yama / index girdileri ve arşivler ayrı bütçelerde tutulur ---
+object_cache = ObjectCache(
+    hot=CacheSegment(
+        "hot",
+        max_bytes=int(os.getenv("CACHE_HOT_MAX_BYTES", str(8 * 1024 * 1024))),
+        ttl=float(os.getenv("CACHE_HOT_TTL", "60")),
+    ),
+    archive=CacheSegment(
+        "archive",
+        max_bytes=int(os.getenv("CACHE_ARCHIVE_MAX_BYTES", str(16 * 1024 * 1024))),
+        ttl=float(os.getenv("CACHE_ARCHIVE_TTL", "3600")),
+    ),
+    # Arama index'leri büyüktür ve ham olarak sunulmaz; ayrı bütçede, ayrıştırılmış halde tutulur.
+    search=CacheSegment(
+        "search",
+        max_bytes=int(os.getenv("CACHE_SEARCH_MAX_BYTES", str(32 * 1024 * 1024))),
+        ttl=float(os.getenv("CACHE_SEARCH_TTL", "300")),
+    ),
+)
+_inflight_fetches = {}
+
+# --- Yerel disk katmanı: yeniden başlatma sonrası R2'ye giden ilk okuma dalgasını keser ---
+LOCAL_CACHE_PATH = os.getenv("LOCAL_CACHE_PATH", ".cache/objects.sqlite3")  # "off": kapalı
+disk_cache = None
+if LOCAL_CACHE_PATH != "off":
+    try:
+        disk_cache = DiskCache(LOCAL_CACHE_PATH, int(os.getenv("LOCAL_CACHE_MAX_BYTES", str(256 * 1024 * 1024))))
+    except Exception as e:
+        logging.warning(f"DISK CACHE açılamadı ({LOCAL_CACHE_PATH}), yalnızca bellek kullanılacak: {e}")
+
+
+def _read_through_sync(key: str, if_none_match: Optional[str]):
+    """_get_object_sync ile aynı sonuçları döner; bellekte girdi yoksa önce disk katmanına bakar.
+
+    Değişmez arşivler diskten doğrudan, diğer nesneler diskteki ETag ile doğrulanarak sunulur.
+    """
+    if disk_cache is None:
+        return _get_object_sync(key, if_none_match)
+
+    stored = disk_cache.get(key) if if_none_match is None else None
+    if stored is not None and archive_index.is_archive_key(key):
+        return stored
+
+    result = _get_object_sync(key, if_none_match or (stored[1] if stored else None))
+    if result is NOT_MODIFIED:
+        return stored if if_none_match is None else result
+    if result is None:
+        disk_cache.remove(key)
+    else:
+        disk_cache.put(key, *result)
+    return result
+
+
+async def _load_into_cache(filename: str, segment: CacheSegment, entry: Optional[CacheEntry], decode=None,
+                           cache_key: Optional[str] = None, cache_missing: bool = False):
+    """Girdiyi S3'ten yükler; eski bir girdi varsa If-None-Match ile ucuza doğrular.
+
+    `decode` verilirse içerik onunla dönüştürülerek saklanır ve hazır yanıt gövdeleri üretilmez.
+    `cache_missing` ile olmayan nesne de (değeri None) segmentin TTL'i boyunca cache'lenir.
+    """
+    cache_key = cache_key or filename
+    result = await run_s3(_read_through_sync, filename, entry.etag if entry else None)
+    if result is NOT_MODIFIED:
+        segment.touch(entry)
+        return entry
+
+    segment.misses += 1
+    if result is None:
+        if cache_missing:
+            return segment.put(cache_key, None, None, 0)
+        segment.remove(cache_key)
         return None
+    content, etag = result
+    if decode is not None:
+        return segment.put(cache_key, decode(content), etag, len(content))
+    value = json.loads(content)
+    return segment.put(cache_key, value, etag, len(content), prepared=PreparedBody(value))
+
+
+async def fetch_entry_from_s3(filename: str, decode=None, cache_key: Optional[str] = None,
+                              cache_missing: bool = False) -> Optional[CacheEntry]:
+    """Dosyayı cache girdisi olarak döner (ayrıştırılmış değer + hazır yanıt gövdeleri).
+
+    `decode` ile dönüştürülen değerler ham JSON ile karışmasın diye ayrı bir `cache_key` altında tutulmalıdır.
+    """
+    cache_key = cache_key or filename
+    segment = object_cache.segment_for(cache_key)
+    entry = segment.get(cache_key)
+    if entry is not None and entry.is_fresh():
+        segment.hits += 1
+        return entry
+
+    # Aynı anahtar için eşzamanlı istekler tek bir S3 okumasını paylaşır.
+    inflight_key = (cache_key, decode)
+    task = _inflight_fetches.get(inflight_key)
+    if task is None:
+        task = asyncio.ensure_future(_load_into_cache(filename, segment, entry, decode, cache_key, cache_missing))
+        _inflight_fetches[inflight_key] = task
+        task.add_done_callback(lambda _: _inflight_fetches.pop(inflight_key, None))
+
+    try:
+        return await asyncio.shield(task)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"S3 Okuma Hatası: {e}")
 
 
+async def fetch_from_s3(filename: str):
+    """Belirtilen dosyayı S3’ten çeker ve cache’ler."""
+    entry = await fetch_entry_from_s3(filename)
+    return entry.value if entry else None
+
+
+# --- Başlangıç ısıtması: /health, güncel yamalar ve index'ler belleğe alınana kadar hazır dönmez ---
+WARMUP_TIMEOUT = float(os.getenv("WARMUP_TIMEOUT", "30"))  # saniye
+cache_ready = asyncio.Event()
+
+
+async def warm_cache():
+    keys = [f"{safe_name}_latest.json" for safe_name in SUPPORTED_GAMES]
+    keys += [archive_index.head_key(safe_name) for safe_name in SUPPORTED_GAMES]
+    started = time.monotonic()
+    try:
+        results = await asyncio.wait_for(
+            asyncio.gather(*(fetch_entry_from_s3(key) for key in keys), return_exceptions=True),
+            timeout=WARMUP_TIMEOUT,
+        )
+        failed = [key for key, result in zip(keys, results) if isinstance(result, Exception)]
+        if failed:
+            logging.warning(f"WARMUP: {len(failed)} nesne yüklenemedi: {failed}")
+        logging.info(f"✅ WARMUP: {len(keys) - len(failed)} nesne {time.monotonic() - started:.2f} sn'de yüklendi.")
+    except asyncio.TimeoutError:
+        logging.warning(f"WARMUP: {WARMUP_TIMEOUT} sn içinde tamamlanamadı, soğuk cache ile devam ediliyor.")
+    finally:
+        cache_ready.set()
+
+
+def prepared_response(request: Request, prepared: PreparedBody, cache_control: str) -> Response:
+    """Hazır gövdeden yanıt üretir; If-None-Match eşleşirse 304 döner, JSON yeniden kodlanmaz."""
+    encoding, body, etag = prepared.select(request.headers.get("accept-encoding"))
+    headers = {"ETag": etag, "Cache-Control": cache_control, "Vary": "Accept-Encoding"}
+    if prepared.matches(request.headers.get("if-none-match")):
+        return Response(status_code=304, headers=headers)
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+# Güncel yama dosyaları her SSE olayında değişebilir: tarayıcı her seferinde ETag ile doğrular.
+LATEST_CACHE_CONTROL = "public, no-cache"
+# Arşiv dosyaları bir kez yazılır ve bir daha değişmez.
+ARCHIVE_CACHE_CONTROL = "public, max-age=86400, immutable"
+
+
 # ======================================================
 # =========   YENİ: SSE (Server-Sent Events)  ==========
 # ======================================================
 
+SUPPORTED_GAMES = [
+    "valorant", "roblox", "minecraft", "league_of_legends",
+    "counter_strike_2", "fortnite"
+]
+SSE_POLL_INTERVAL = int(os.getenv("SSE_POLL_INTERVAL", "30"))  # saniye
+SSE_HEARTBEAT_INTERVAL = 15  # saniye
+SSE_REPLAY_BUFFER_SIZE = 200
+SSE_SUBSCRIBER_QUEUE_SIZE = 50
+
 sse_latest_etags = {}
 sse_lock = asyncio.Lock()
 
+
+class SSEHub:
+    """Tek poller'ın ürettiği olayları tüm SSE abonelerine dağıtan bellek içi yayın merkezi.
+
+    Son olaylar bir halka tamponda tutulur; `Last-Event-ID` ile yeniden bağlanan
+    client kaçırdığı olayları buradan alır.
+    """
+
+    def __init__(self):
+        self.subscribers = set()
+        self.recent_events = deque(maxlen=SSE_REPLAY_BUFFER_SIZE)
+        # ID'ler süreç başlangıç zamanından türetilir; yeniden başlatma sonrası eski ID'lerle çakışmaz.
+        self.last_event_id = int(time.time() * 1000)
+
+    def subscribe(self) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=SSE_SUBSCRIBER_QUEUE_SIZE)
+        self.subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self.subscribers.discard(queue)
+
+    def publish(self, payload: dict, event_id: Optional[int] = None):
+        # Koordinasyon modunda ID bültenden gelir; tüm worker'larda aynıdır.
+        self.last_event_id = event_id if event_id is not None else self.last_event_id + 1
+        event = (self.last_event_id, json.dumps(payload))
+        self.recent_events.append(event)
+        for queue in list(self.subscribers):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # Yavaş client: bağlantısını kapat, Last-Event-ID ile geri dönüp kaçırdıklarını alır.
+                self.unsubscribe(queue)
+                queue.get_nowait()
+                queue.put_nowait(None)
+
+    def restore(self, events: list):
+        """Bültendeki geçmiş olayları abonelere göndermeden yeniden oynatma tamponuna alır."""
+        for event_id, payload in events:
+            self.recent_events.append((event_id, json.dumps(payload)))
+            self.last_event_id = max(self.last_event_id, event_id)
+
+    def events_since(self, last_event_id: int) -> list:
+        if last_event_id >= self.last_event_id:
+            return []
+        return [event for event in self.recent_events if event[0] > last_event_id]
+
+
+sse_hub = SSEHub()
+
+
+def invalidate_game_cache(safe_name: str):
+    """Oyunun yeni yamayla değişen nesnelerini cache'ten düşürür."""
+    object_cache.invalidate(f"{safe_name}_latest.json")
+    object_cache.invalidate(archive_index.head_key(safe_name))
+    object_cache.invalidate(archive_index.shard_key(safe_name, f"{datetime.utcnow():%Y%m}"))
+    object_cache.invalidate(search_index.cache_key(safe_name))
+
+
+async def _check_game_etag(safe_name: str):
+    """ETag değiştiyse oyun adını döner. İlk okuma (önceki ETag yok) değişiklik sayılmaz."""
+    latest_key = f"{safe_name}_latest.json"
+    try:
+        current_etag = await s3_head_etag(latest_key)
+    except Exception as e:
+        logging.warning(f"SSE R2 check hatası ({latest_key}): {e}")
+        return None
+
+    async with sse_lock:
+        last_etag = sse_latest_etags.get(safe_name)
+        if current_etag and current_etag != last_etag:
+            logging.info(f"SSE: '{safe_name}' için yeni ETag tespit edildi: {current_etag}")
+            sse_latest_etags[safe_name] = current_etag
+            if last_etag is not None:
+                return safe_name
+    return None
+
+
 async def check_r2_for_updates():
     """R2'deki _latest.json dosyalarını kontrol eder ve değişiklik varsa ETag'i günceller."""
-    global sse_latest_etags
-    supported_games_safe_names = [
-        "valorant", "roblox", "minecraft", "league_of_legends",
-        "counter_strike_2", "fortnite"
-    ]
-
-    updated_games = []
-    for safe_name in supported_games_safe_names:
-        latest_key = f"{safe_name}_latest.json"
+    results = await asyncio.gather(*(_check_game_etag(name) for name in SUPPORTED_GAMES))
+    return [name for name in results if name]
+
+
+async def sse_poller():
+    """Süreç başına tek arka plan görevi: R2'yi periyodik olarak kontrol eder ve değişiklikleri yayınlar."""
+    logging.info("SSE: Başlangıç ETag'leri R2'den okunuyor...")
+    await check_r2_for_updates()
+    logging.info(f"SSE: Başlangıç ETag'leri: {sse_latest_etags}")
+
+    while True:
+        await asyncio.sleep(SSE_POLL_INTERVAL)
         try:
-            response = s3_client.head_object(Bucket=S3_BUCKET_NAME, Key=latest_key)
-            current_etag = response.get("ETag")
+            for safe_name in await check_r2_for_updates():
+                logging.info(f"SSE: '{safe_name}' için değişiklik tespit edildi!")
+                invalidate_game_cache(safe_name)
+                sse_hub.publish({"type": "new_patch", "game": safe_name})
+        except Exception as e:
+            logging.warning(f"SSE poller hatası: {e}")
 
-            async with sse_lock:
-                last_etag = sse_latest_etags.get(safe_name)
-                if current_etag and current_etag != last_etag:
-                    logging.info(f"SSE: '{safe_name}' için yeni ETag tespit edildi: {current_etag}")
-                    sse_latest_etags[safe_name] = current_etag
-                    updated_games.append(safe_name)
 
-        except s3_client.exceptions.NoSuchKey:
-            continue
+# --- Çoklu worker koordinasyonu: host başına tek poller, olaylar paylaşılan bültenden dağıtılır ---
+COORDINATION_PATH = os.getenv("COORDINATION_PATH")  # ör. .cache/coordination.sqlite3; boş: kapalı
+COORDINATION_TAIL_INTERVAL = float(os.getenv("COORDINATION_TAIL_INTERVAL", "1"))  # saniye
+coordinator = open_coordinator(COORDINATION_PATH)
+
+
+async def _poll_as_leader():
+    """Kilidi alan worker R2'yi yoklar ve değişiklikleri bültene yazar; diğerleri kilidi bekler."""
+    while not await asyncio.to_thread(coordinator.try_acquire_leadership):
+        await asyncio.sleep(SSE_POLL_INTERVAL)
+
+    logging.info(f"SSE: Bu worker (pid {os.getpid()}) host poller'ı seçildi.")
+    # Önceki poller'ın gördüğü ETag'lerden devam edilir; devir sırasında gelen yamalar kaçmaz.
+    sse_latest_etags.update(await asyncio.to_thread(coordinator.load_etags))
+    while True:
+        try:
+            changed = await check_r2_for_updates()
+            for safe_name in changed:
+                logging.info(f"SSE: '{safe_name}' için değişiklik tespit edildi, bültene yazılıyor.")
+                await asyncio.to_thread(coordinator.publish, {"type": "new_patch", "game": safe_name})
+            await asyncio.to_thread(coordinator.save_etags, dict(sse_latest_etags))
+        except Exception as e:
+            logging.warning(f"SSE poller hatası: {e}")
+        await asyncio.sleep(SSE_POLL_INTERVAL)
+
+
+async def _tail_bulletin():
+    """Bültendeki yeni olaylarla cache'i geçersiz kılar ve olayları bu worker'ın abonelerine yayınlar."""
+    recent = await asyncio.to_thread(coordinator.recent_events, SSE_REPLAY_BUFFER_SIZE)
+    sse_hub.restore(recent)
+    last_seen = recent[-1][0] if recent else 0
+    while True:
+        await asyncio.sleep(COORDINATION_TAIL_INTERVAL)
+        try:
+            for event_id, payload in await asyncio.to_thread(coordinator.events_after, last_seen):
+                last_seen = event_id
+                if payload.get("type") == "new_patch":
+                    invalidate_game_cache(payload["game"])
+                sse_hub.publish(payload, event_id=event_id)
         except Exception as e:
-            logging.warning(f"SSE R2 check hatası ({latest_key}): {e}")
+            logging.warning(f"KOORDİNASYON bülten okuma hatası: {e}")
 
-    return updated_games
 
+async def coordinated_poller():
+    await asyncio.gather(_poll_as_leader(), _tail_bulletin())
 
-async def event_generator(request: Request):
-    """Client'a SSE olaylarını gönderir. Periyodik olarak R2'yi kontrol eder."""
-    global sse_latest_etags
 
-    async with sse_lock:
-        if not sse_latest_etags:
-            logging.info("SSE: İlk bağlantı, mevcut ETag'ler R2'den okunuyor...")
-            await check_r2_for_updates()
-            logging.info(f"SSE: Başlangıç ETag'leri: {sse_latest_etags}")
+def _format_sse_event(event) -> str:
+    event_id, event_data = event
+    return f"id: {event_id}\ndata: {event_data}\n\n"
 
-    last_check_time = time.time()
-    check_interval = 30  # saniye
 
+async def event_generator(request: Request, last_event_id: Optional[str] = None):
+    """Client'a SSE olaylarını gönderir. Olaylar ortak poller'dan yayın merkezi üzerinden gelir."""
+    queue = sse_hub.subscribe()
     try:
+        yield f"retry: {SSE_HEARTBEAT_INTERVAL * 1000}\n\n"
+
+        if last_event_id and last_event_id.isdigit():
+            for event in sse_hub.events_since(int(last_event_id)):
+                yield _format_sse_event(event)
+
         while True:
             if await request.is_disconnected():
                 logging.info("SSE: Client bağlantısı koptu.")
                 break
-
-            current_time = time.time()
-            if current_time - last_check_time >= check_interval:
-                last_check_time = current_time
-                local_copy_etags = {}
-                async with sse_lock:
-                    local_copy_etags = sse_latest_etags.copy()
-
-                supported_games_safe_names = list(local_copy_etags.keys()) or [
-                    "valorant", "roblox", "minecraft", "league_of_legends",
-                    "counter_strike_2", "fortnite"
-                ]
-
-                for safe_name in supported_games_safe_names:
-                    latest_key = f"{safe_name}_latest.json"
-                    try:
-                        response = s3_client.head_object(Bucket=S3_BUCKET_NAME, Key=latest_key)
-                        current_etag = response.get("ETag")
-                        last_etag = local_copy_etags.get(safe_name)
-
-                        if current_etag and current_etag != last_etag:
-                            logging.info(f"SSE: '{safe_name}' için değişiklik tespit edildi!")
-                            async with sse_lock:
-                                sse_latest_etags[safe_name] = current_etag
-                            event_data = json.dumps({"type": "new_patch", "game": safe_name})
-                            yield f"data: {event_data}\n\n"
-
-                    except s3_client.exceptions.NoSuchKey:
-                        continue
-                    except Exception as e:
-                        logging.warning(f"SSE R2 check hatası ({latest_key}): {e}")
-
-            await asyncio.sleep(5)
+            try:
+                event = await asyncio.wait_for(queue.get(), timeout=SSE_HEARTBEAT_INTERVAL)
+            except asyncio.TimeoutError:
+                yield ": heartbeat\n\n"
+                continue
+            if event is None:
+                logging.info("SSE: Yavaş client, bağlantı kapatılıyor.")
+                break
+            yield _format_sse_event(event)
 
     except asyncio.CancelledError:
         logging.info("SSE: Generator iptal edildi.")
     finally:
+        sse_hub.unsubscribe(queue)
         logging.info("SSE: Event generator sonlandı.")
 
 
 @app.get("/events")
-async def sse_endpoint(request: Request):
+async def sse_endpoint(request: Request, last_event_id: Optional[str] = Header(None)):
     """Client'ların SSE akışına abone olacağı endpoint."""
-    return StreamingResponse(event_generator(request), media_type="text/event-stream")
+    return StreamingResponse(
+        event_generator(request, last_event_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# ======================================================
+# ===========   METRİKLER (Prometheus)   ===============
+# ======================================================
+
+# Cache, SSE ve log gönderici durumları her /metrics isteğinde anlık okunur.
+Gauge("gpnai_sse_subscribers", "Aktif SSE abone sayısı").set_function(lambda: len(sse_hub.subscribers))
+Gauge("gpnai_sse_poller_leader", "Bu worker host'un R2 poller'ı mı (1/0)").set_function(
+    lambda: 1 if coordinator is None or coordinator.is_leader else 0
+)
+REGISTRY.register(metrics.CacheCollector(object_cache, disk_cache))
+REGISTRY.register(metrics.LogShipperCollector(usage_log_shipper))
+
+
+@app.get("/metrics")
+def metrics_endpoint():
+    """Prometheus metrikleri (bu worker sürecine ait)."""
+    return Response(content=generate_latest(REGISTRY), media_type=CONTENT_TYPE_LATEST)
 
 
 # ======================================================
@@ -242,99 +633,367 @@ def root():
 
 
 @app.get("/health")
-def health_check():
+async def health_check():
+    if not cache_ready.is_set():
+        return JSONResponse(status_code=503, content={"status": "warming", "timestamp": datetime.utcnow().isoformat()})
     return {"status": "ok", "timestamp": datetime.utcnow().isoformat()}
 
 
 @app.get("/public/patches")
-def get_public_patches(game: str = None):
+async def get_public_patches(request: Request, game: str = None):
     if not game:
         raise HTTPException(status_code=400, detail="Lütfen bir oyun adı belirtin.")
     safe_name = game.lower().replace(" ", "_").replace("-", "_").replace(".", "")
     filename = f"{safe_name}_latest.json"
 
-    data = fetch_from_s3(filename)
-    if data:
-        return JSONResponse(content=data)
+    entry = await fetch_entry_from_s3(filename)
+    if entry and entry.value:
+        return prepared_response(request, entry.prepared, LATEST_CACHE_CONTROL)
     raise HTTPException(status_code=404, detail=f"'{game}' için yama notu bulunamadı.")
 
 
+BATCH_MAX_GAMES = 25
+BATCH_MEMO_SIZE = 32
+# Aynı oyun / ETag bileşimi için birleştirilmiş gövde yeniden üretilip sıkıştırılmaz.
+_batch_bodies = OrderedDict()
+
+
+def _batch_signature(safe_name: str, outcome):
+    if isinstance(outcome, CacheEntry) and outcome.value:
+        return safe_name, outcome.prepared.etags["identity"]
+    return safe_name, _batch_part(safe_name, outcome)
+
+
+def _batch_part(safe_name: str, outcome) -> bytes:
+    """Oyunun batch gövdesindeki parçası. Yama verisi cache'teki hazır JSON baytlarından kopyalanır."""
+    key = json.dumps(safe_name).encode("utf-8")
+    if isinstance(outcome, CacheEntry) and outcome.value:
+        etag = json.dumps(outcome.prepared.etags["identity"]).encode("utf-8")
+        return b'%s:{"status":"ok","etag":%s,"data":%s}' % (key, etag, outcome.prepared.identity)
+    if isinstance(outcome, BaseException):
+        detail = outcome.detail if isinstance(outcome, HTTPException) else str(outcome)
+        status = {"status": "error", "detail": detail}
+    else:
+        status = {"status": "not_found"}
+    return key + b":" + json.dumps(status, ensure_ascii=False).encode("utf-8")
+
+
+@app.get("/public/patches/batch")
+async def get_public_patches_batch(
+    request: Request,
+    games: str = Query(..., description="Virgülle ayrılmış oyun adları ya da tüm oyunlar için '*'"),
+):
+    """Birden fazla oyunun güncel yamasını tek yanıtta, oyun başına durum bilgisiyle döner."""
+    if games.strip() == "*":
+        safe_names = list(SUPPORTED_GAMES)
+    else:
+        safe_names = list(dict.fromkeys(
+            game.strip().lower().replace(" ", "_").replace("-", "_").replace(".", "")
+            for game in games.split(",") if game.strip()
+        ))
+    if not safe_names:
+        raise HTTPException(status_code=400, detail="Lütfen en az bir oyun adı belirtin.")
+    if len(safe_names) > BATCH_MAX_GAMES:
+        raise HTTPException(status_code=400, detail=f"Tek istekte en fazla {BATCH_MAX_GAMES} oyun istenebilir.")
+
+    # Cache'te olmayan ya da süresi dolan girdiler eşzamanlı çekilir; tek oyunun hatası yanıtı bozmaz.
+    outcomes = await asyncio.gather(
+        *(fetch_entry_from_s3(f"{safe_name}_latest.json") for safe_name in safe_names),
+        return_exceptions=True,
+    )
+
+    signature = tuple(_batch_signature(name, outcome) for name, outcome in zip(safe_names, outcomes))
+    prepared = _batch_bodies.get(signature)
+    if prepared is None:
+        parts = b",".join(_batch_part(name, outcome) for name, outcome in zip(safe_names, outcomes))
+        prepared = PreparedBody.from_identity(b'{"games":{%s}}' % parts)
+        _batch_bodies[signature] = prepared
+        if len(_batch_bodies) > BATCH_MEMO_SIZE:
+            _batch_bodies.popitem(last=False)
+    else:
+        _batch_bodies.move_to_end(signature)
+    return prepared_response(request, prepared, LATEST_CACHE_CONTROL)
+
+
 @app.get("/public/patches/history")
-def get_public_patch_history(game: str = None):
+async def get_public_patch_history(
+    game: str = None,
+    limit: int = Query(50, ge=1, le=200, description="Sayfa başına arşiv sayısı"),
+    before: Optional[str] = Query(None, description="Önceki sayfanın next_cursor değeri"),
+):
     if not game:
         raise HTTPException(status_code=400, detail="Lütfen bir oyun adı belirtin.")
     safe_name = game.lower().replace(" ", "_").replace("-", "_").replace(".", "")
-    index_key = f"{safe_name}/index.json"
 
-    data = fetch_from_s3(filename=index_key)
-    if data and "history" in data:
-        archives = data.get("history", [])
-        return {"game": game, "archive_count": len(archives), "archives": archives}
-    elif data is None:
-        return {"game": game, "archive_count": 0, "archives": []}
-    raise HTTPException(status_code=500, detail=f"'{game}' için index dosyası okunamadı.")
+    head = await fetch_from_s3(filename=archive_index.head_key(safe_name))
+    if head is None:
+        return {"game": game, "archive_count": 0, "archives": [], "next_cursor": None}
+
+    if "history" in head:
+        # Henüz parçalı formata taşınmamış eski index
+        entries = archive_index.sort_entries(head["history"])
+        total = len(entries)
+        page = archive_index.page_entries(entries, limit + 1, before)
+    elif "shards" in head:
+        total = head.get("total", 0)
+        page = await _read_history_page(head, limit + 1, before)
+    else:
+        raise HTTPException(status_code=500, detail=f"'{game}' için index dosyası okunamadı.")
+
+    next_cursor = page[limit - 1]["key"] if len(page) > limit else None
+    return {"game": game, "archive_count": total, "archives": page[:limit], "next_cursor": next_cursor}
+
+
+async def _read_history_page(head: dict, limit: int, before: Optional[str]) -> list:
+    """Baş manifestteki son girdilerden, yetmezse aylık parçalardan bir sayfa toplar."""
+    recent = archive_index.page_entries(head.get("recent", []), limit, before)
+    if len(recent) >= limit or len(head.get("recent", [])) >= head.get("total", 0):
+        return recent
+
+    before_month = archive_index.archive_month(before) if before else None
+    page = []
+    for shard in head["shards"]:  # yeniden eskiye sıralı
+        if before_month and shard["month"] > before_month:
+            continue
+        data = await fetch_from_s3(filename=shard["key"])
+        if data:
+            page.extend(archive_index.page_entries(data.get("history", []), limit - len(page), before))
+        if len(page) >= limit:
+            break
+    return page
 
 
 @app.get("/public/patches/archive")
-def get_public_archive_detail(key: str = Query(..., description="S3'teki dosya anahtarı")):
-    if not key or "/" not in key:
-        raise HTTPException(status_code=400, detail="Geçerli bir S3 'key' gereklidir.")
-    data = fetch_from_s3(filename=key)
-    if data:
-        return JSONResponse(content=data)
+async def get_public_archive_detail(request: Request, key: str = Query(..., description="S3'teki dosya anahtarı")):
+    # Yalnızca arşiv nesneleri sunulur; index parçaları ve search.json bu uçtan okunamaz.
+    if not archive_index.is_archive_key(key):
+        raise HTTPException(status_code=400, detail="Geçerli bir arşiv 'key' değeri gereklidir ({oyun}/YYYYMMDD_HHMMSS.json).")
+    entry = await fetch_entry_from_s3(key)
+    if entry and entry.value:
+        return prepared_response(request, entry.prepared, ARCHIVE_CACHE_CONTROL)
     raise HTTPException(status_code=404, detail=f"'{key}' anahtarlı arşiv bulunamadı.")
 
 
+EXPORT_PREFETCH_WINDOW = int(os.getenv("EXPORT_PREFETCH_WINDOW", str(max(1, S3_MAX_CONCURRENCY // 2))))
+
+
+async def _iter_export_entries(head: dict):
+    """Index girdilerini yeniden eskiye döner; parçalar cache'e alınmadan tek tek okunur."""
+    if "history" in head:
+        for entry in archive_index.sort_entries(head["history"]):
+            yield entry
+        return
+    for shard in head.get("shards", []):
+        content = await s3_get_bytes(shard["key"])
+        if content:
+            for entry in json.loads(content).get("history", []):
+                yield entry
+
+
+async def _export_lines(safe_name: str, head: dict):
+    """Arşivleri en fazla EXPORT_PREFETCH_WINDOW eşzamanlı okumayla sırayla NDJSON satırı olarak üretir.
+
+    Paylaşılan okuma cache'i kullanılmaz; bellekte yalnızca pencere kadar arşiv bulunur.
+    """
+    window = deque()
+    try:
+        async for entry in _iter_export_entries(head):
+            window.append((entry, asyncio.ensure_future(s3_get_bytes(entry["key"]))))
+            if len(window) >= EXPORT_PREFETCH_WINDOW:
+                line = await _export_line(*window.popleft())
+                if line:
+                    yield line
+        while window:
+            line = await _export_line(*window.popleft())
+            if line:
+                yield line
+    except Exception as e:
+        logging.error(f"❌ Export hatası ({safe_name}): {e}")
+        yield json.dumps({"error": f"Export yarıda kesildi: {e}"}, ensure_ascii=False).encode("utf-8") + b"\n"
+    finally:
+        for _, task in window:
+            task.cancel()
+
+
+async def _export_line(entry: dict, task) -> Optional[bytes]:
+    content = await task
+    if content is None:
+        logging.warning(f"Export: index'teki arşiv bulunamadı, atlanıyor: {entry['key']}")
+        return None
+    record = {"key": entry["key"], "date": entry.get("date"), "patch": json.loads(content)}
+    return json.dumps(record, ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n"
+
+
+async def _gzip_stream(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31: gzip başlığı
+    async for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+@app.get("/public/patches/export")
+async def export_public_patch_history(
+    game: str = Query(..., description="Oyun adı"),
+    gzip_output: bool = Query(False, alias="gzip", description="Çıktıyı gzip ile sıkıştır"),
+):
+    """Oyunun tüm arşivlerini yeniden eskiye NDJSON olarak akıtır (satır başına bir arşiv)."""
+    safe_name = game.lower().replace(" ", "_").replace("-", "_").replace(".", "")
+    try:
+        content = await s3_get_bytes(archive_index.head_key(safe_name))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"S3 Okuma Hatası: {e}")
+    if content is None:
+        raise HTTPException(status_code=404, detail=f"'{game}' için arşiv bulunamadı.")
+
+    stream = _export_lines(safe_name, json.loads(content))
+    filename = f"{safe_name}_history.ndjson"
+    if gzip_output:
+        stream = _gzip_stream(stream)
+        filename += ".gz"
+    return StreamingResponse(
+        stream,
+        media_type="application/gzip" if gzip_output else "application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"', "Cache-Control": "no-store"},
+    )
+
+
+@app.get("/public/patches/diff")
+async def get_public_patch_diff(
+    request: Request,
+    game: str = Query(..., description="Oyun adı"),
+    from_key: str = Query(..., alias="from", description="Eski arşivin S3 anahtarı"),
+    to_key: str = Query(..., alias="to", description="Yeni arşivin S3 anahtarı"),
+):
+    """İki arşiv arasındaki yapısal farkı döner. Arşivler değişmediği için sonuç anahtar çiftine göre cache'lenir."""
+    safe_name = game.lower().replace(" ", "_").replace("-", "_").replace(".", "")
+    for key in (from_key, to_key):
+        if not key.startswith(f"{safe_name}/") or not archive_index.is_archive_key(key):
+            raise HTTPException(status_code=400, detail=f"'{key}' bu oyuna ait geçerli bir arşiv anahtarı değil.")
+
+    memo_key = f"diff:{from_key}:{to_key}"
+    segment = object_cache.archive
+    entry = segment.get(memo_key)
+    if entry is None or not entry.is_fresh():
+        old, new = await asyncio.gather(fetch_from_s3(from_key), fetch_from_s3(to_key))
+        for key, data in ((from_key, old), (to_key, new)):
+            if not data:
+                raise HTTPException(status_code=404, detail=f"'{key}' anahtarlı arşiv bulunamadı.")
+        segment.misses += 1
+        prepared = PreparedBody(patch_diff.diff_patches(old, new, from_key, to_key))
+        entry = segment.put(memo_key, None, None, 0, prepared=prepared)
+    else:
+        segment.hits += 1
+    return prepared_response(request, entry.prepared, ARCHIVE_CACHE_CONTROL)
+
+
+def _decode_search_index(content: bytes) -> search_index.SearchIndex:
+    return search_index.SearchIndex(json.loads(content))
+
+
+@app.get("/public/search")
+async def search_patch_changes(
+    q: Optional[str] = Query(None, description="Hedef, yetenek ve açıklamalarda aranacak kelimeler"),
+    game: Optional[str] = Query(None, description="Oyun adı (boşsa tüm oyunlar)"),
+    change_type: Optional[str] = Query(None, alias="type", description="Değişiklik türü: nerf, buff, new, fix, other"),
+    target: Optional[str] = Query(None, description="Hedef adı (tam eşleşme, büyük/küçük harf duyarsız)"),
+    ability: Optional[str] = Query(None, description="Yetenek adı (tam eşleşme)"),
+    since: Optional[datetime] = Query(None, description="Başlangıç (UTC, ISO 8601)"),
+    until: Optional[datetime] = Query(None, description="Bitiş (UTC, ISO 8601)"),
+    limit: int = Query(50, ge=1, le=200),
+):
+    """Scraper'ın ürettiği arama index'lerinden değişiklikleri yeniden eskiye sıralı döner."""
+    if not any((q, change_type, target, ability)):
+        raise HTTPException(status_code=400, detail="Lütfen 'q', 'type', 'target' ya da 'ability' belirtin.")
+    if game:
+        safe_names = [game.lower().replace(" ", "_").replace("-", "_").replace(".", "")]
+    else:
+        safe_names = SUPPORTED_GAMES
+
+    try:
+        entries = await asyncio.gather(*(
+            fetch_entry_from_s3(search_index.search_key(safe_name), decode=_decode_search_index,
+                                cache_key=search_index.cache_key(safe_name))
+            for safe_name in safe_names
+        ))
+    except HTTPException as e:
+        raise HTTPException(status_code=500, detail=f"Arama index'i okunamadı: {e.detail}")
+
+    since_str = _to_naive_utc(since).isoformat() if since else None
+    until_str = _to_naive_utc(until).isoformat() if until else None
+    results = []
+    for entry in entries:
+        if entry is not None:
+            results.extend(entry.value.search(q, change_type, target, ability, since_str, until_str))
+    results.sort(key=lambda result: (result["date"], result["archive"]), reverse=True)
+    return {
+        "query": {"q": q, "game": game, "type": change_type, "target": target, "ability": ability},
+        "total": len(results),
+        "results": results[:limit],
+    }
+
+
 @app.get("/patches", dependencies=[Depends(verify_key)])
-def get_patches(game: str = None):
+async def get_patches(request: Request, game: str = None):
     if not game:
         raise HTTPException(status_code=400, detail="Lütfen bir oyun adı belirtin.")
     safe_name = game.lower().replace(" ", "_").replace("-", "_").replace(".", "")
     filename = f"{safe_name}_latest.json"
 
-    data = fetch_from_s3(filename)
-    if data:
-        return JSONResponse(content=data)
+    entry = await fetch_entry_from_s3(filename)
+    if entry and entry.value:
+        return prepared_response(request, entry.prepared, "private, no-cache")
     raise HTTPException(status_code=404, detail=f"'{game}' için yama notu bulunamadı.")
 
 
-@app.get("/public/stats")
-def get_usage_stats():
-    """R2’deki loglardan özet istatistik döner."""
-    try:
-        paginator = s3_client.get_paginator("list_objects_v2")
-        pages = paginator.paginate(Bucket=S3_BUCKET_NAME, Prefix="logs/", MaxKeys=20)
+def _decode_rollup(content: bytes) -> dict:
+    # Rollup'lar yalnızca toplanır, ham olarak sunulmaz; hazır (sıkıştırılmış) yanıt gövdesi üretilmez.
+    return json.loads(content)
 
-        all_logs = []
-        for page in pages:
-            if "Contents" not in page:
-                continue
-            for obj in page["Contents"]:
-                try:
-                    response = s3_client.get_object(Bucket=S3_BUCKET_NAME, Key=obj["Key"])
-                    content = response["Body"].read().decode("utf-8")
-                    for line in content.splitlines():
-                        if line.strip():
-                            all_logs.append(json.loads(line))
-                except Exception:
-                    continue
-
-        if not all_logs:
-            return {"message": "Henüz yeterli istatistik yok."}
-
-        total_requests = len(all_logs)
-        errors = [log for log in all_logs if log["status_code"] >= 400]
-        game_counts = {}
-        for log in all_logs:
-            game = log.get("game_query", "unknown")
-            game_counts[game] = game_counts.get(game, 0) + 1
-
-        return {
-            "total_requests_analyzed": total_requests,
-            "total_errors": len(errors),
-            "most_popular_game": max(game_counts, key=game_counts.get) if game_counts else "N/A",
-            "requests_by_game": game_counts,
-        }
 
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"İstatistik okuma hatası: {e}")
+@app.get("/public/stats")
+async def get_usage_stats(
+    since: Optional[datetime] = Query(None, description="Başlangıç (UTC, ISO 8601)"),
+    until: Optional[datetime] = Query(None, description="Bitiş (UTC, ISO 8601)"),
+):
+    """R2’deki önceden hesaplanmış rollup nesnelerinden özet istatistik döner."""
+    window = None
+    if since is None and until is None:
+        keys = [TOTAL_ROLLUP_KEY]
+    else:
+        until = _to_naive_utc(until) if until else datetime.utcnow()
+        since = _to_naive_utc(since) if since else until - timedelta(days=7)
+        if since >= until or until - since > MAX_WINDOW:
+            raise HTTPException(status_code=400, detail="Geçersiz zaman aralığı (en fazla 366 gün).")
+        keys = window_keys(since, until)
+        window = {"since": since.isoformat(), "until": until.isoformat()}
+
+    try:
+        # Trafiksiz saatlerin rollup'ı hiç oluşmaz; bu anahtarlar her istekte yeniden sorgulanmasın.
+        entries = await asyncio.gather(*(
+            fetch_entry_from_s3(key, decode=_decode_rollup, cache_missing=True) for key in keys
+        ))
+        rollups = [entry.value if entry else None for entry in entries]
+    except HTTPException as e:
+        raise HTTPException(status_code=500, detail=f"İstatistik okuma hatası: {e.detail}")
+
+    total = summarize_rollups(rollups)
+    if not total["requests"]:
+        return {"message": "Henüz yeterli istatistik yok.", "window": window}
+
+    game_counts = total["by_game"]
+    return {
+        "window": window,
+        "total_requests_analyzed": total["requests"],
+        "total_errors": total["errors"],
+        "average_latency_ms": round(total["latency_ms_sum"] / total["requests"], 2),
+        "most_popular_game": max(game_counts, key=game_counts.get) if game_counts else "N/A",
+        "requests_by_game": game_counts,
+    }
+
+
+def _to_naive_utc(moment: datetime) -> datetime:
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return moment
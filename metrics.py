@@ -0,0 +1,176 @@
+# metrics.py (YENİ - Prometheus metrikleri)
+#
+# API süreci metriklerini varsayılan registry'de toplar; main.py bunları
+# /metrics üzerinden sunar. Her uvicorn worker'ı kendi sayaçlarını tutar.
+#
+# Scraper kısa ömürlü bir cron işi olduğu için ayrı bir registry kullanır ve
+# çalışma sonunda metrikleri bir textfile'a (node_exporter textfile collector)
+# ya da Pushgateway'e yazar:
+#   METRICS_TEXTFILE_PATH=/var/lib/node_exporter/gpnai_scrape.prom
+#   METRICS_PUSHGATEWAY_URL=http://pushgateway:9091
+
+import logging
+import os
+import time
+from contextlib import contextmanager
+
+from prometheus_client import (
+    CollectorRegistry, Counter, Gauge, Histogram, push_to_gateway, write_to_textfile,
+)
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STAGE_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+# --- API metrikleri ---
+HTTP_REQUEST_DURATION = Histogram(
+    "gpnai_http_request_duration_seconds", "HTTP isteklerinin route bazında süresi",
+    ["route", "method", "status"], buckets=LATENCY_BUCKETS,
+)
+S3_REQUESTS = Counter(
+    "gpnai_s3_requests_total", "API sürecinin yaptığı S3 çağrıları", ["operation", "status"],
+)
+S3_REQUEST_DURATION = Histogram(
+    "gpnai_s3_request_duration_seconds", "API sürecinin S3 çağrılarının süresi",
+    ["operation"], buckets=LATENCY_BUCKETS,
+)
+
+# --- Scraper metrikleri (ayrı registry) ---
+scrape_registry = CollectorRegistry()
+SCRAPE_STAGE_DURATION = Histogram(
+    "gpnai_scrape_stage_duration_seconds", "Scraper aşamalarının (fetch, parse, gemini, s3) süresi",
+    ["stage", "source"], buckets=STAGE_BUCKETS, registry=scrape_registry,
+)
+SCRAPE_STAGE_FAILURES = Counter(
+    "gpnai_scrape_stage_failures_total", "Hata ile biten scraper aşamaları",
+    ["stage", "source"], registry=scrape_registry,
+)
+SCRAPE_SOURCES = Counter(
+    "gpnai_scrape_sources_total", "Kaynakların çalışma sonucu (changed, unchanged, failed)",
+    ["outcome"], registry=scrape_registry,
+)
+SCRAPE_S3_REQUESTS = Counter(
+    "gpnai_scrape_s3_requests_total", "Scraper'ın yaptığı S3 çağrıları",
+    ["operation", "status"], registry=scrape_registry,
+)
+SCRAPE_S3_REQUEST_DURATION = Histogram(
+    "gpnai_scrape_s3_request_duration_seconds", "Scraper'ın S3 çağrılarının süresi",
+    ["operation"], buckets=LATENCY_BUCKETS, registry=scrape_registry,
+)
+SCRAPE_GEMINI_CACHE = Gauge(
+    "gpnai_scrape_gemini_cache_lookups", "Son çalışmadaki Gemini cache sorguları",
+    ["result"], registry=scrape_registry,
+)
+SCRAPE_NOTIFICATIONS = Counter(
+    "gpnai_scrape_notifications_total", "Bildirim gönderim denemeleri (sent / retried / dropped)",
+    ["channel", "outcome"], registry=scrape_registry,
+)
+SCRAPE_LAST_RUN_DURATION = Gauge(
+    "gpnai_scrape_last_run_duration_seconds", "Son scrape çalışmasının süresi", registry=scrape_registry,
+)
+SCRAPE_LAST_RUN_TIMESTAMP = Gauge(
+    "gpnai_scrape_last_run_timestamp_seconds", "Son scrape çalışmasının bitiş zamanı", registry=scrape_registry,
+)
+SCRAPE_LAST_RUN_SUCCESS = Gauge(
+    "gpnai_scrape_last_run_success", "Son scrape çalışması hatasız bitti mi (1/0)", registry=scrape_registry,
+)
+
+
+def instrument_s3_client(client, requests_counter, duration_histogram):
+    """boto3 client'ının olay kancalarıyla her S3 çağrısını operasyon bazında sayar ve ölçer.
+
+    Süre, yanıt başlıkları alınana kadar geçen süredir (yeniden denemeler dahil).
+    """
+    from botocore import xform_name
+
+    def before_call(model, context, **kwargs):
+        context["metrics_operation"] = xform_name(model.name)
+        context["metrics_start"] = time.perf_counter()
+
+    def observe(context, status):
+        operation = context.get("metrics_operation")
+        if operation is None:
+            return
+        requests_counter.labels(operation, status).inc()
+        duration_histogram.labels(operation).observe(time.perf_counter() - context["metrics_start"])
+
+    def after_call(http_response, context, **kwargs):
+        observe(context, str(http_response.status_code))
+
+    def after_call_error(context, **kwargs):
+        observe(context, "error")
+
+    client.meta.events.register("before-call.s3", before_call)
+    client.meta.events.register("after-call.s3", after_call)
+    client.meta.events.register("after-call-error.s3", after_call_error)
+    return client
+
+
+@contextmanager
+def stage_timer(stage, source):
+    """Scraper aşamasının süresini ölçer; istisna fırlarsa hata sayacını artırır."""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        SCRAPE_STAGE_FAILURES.labels(stage, source).inc()
+        raise
+    finally:
+        SCRAPE_STAGE_DURATION.labels(stage, source).observe(time.perf_counter() - start)
+
+
+def export_scrape_metrics(job="gpnai_scraper"):
+    """Scraper registry'sini yapılandırılmış hedeflere yazar; hedef yoksa hiçbir şey yapmaz."""
+    textfile_path = os.getenv("METRICS_TEXTFILE_PATH")
+    pushgateway_url = os.getenv("METRICS_PUSHGATEWAY_URL")
+    try:
+        if textfile_path:
+            write_to_textfile(textfile_path, scrape_registry)
+        if pushgateway_url:
+            push_to_gateway(pushgateway_url, job=job, registry=scrape_registry, timeout=10)
+    except Exception as e:
+        logging.warning(f"Scraper metrikleri yazılamadı: {e}")
+
+
+class CacheCollector:
+    """ObjectCache segmentlerinin (ve varsa disk katmanının) sayaçlarını scrape anında okuyarak sunar."""
+
+    def __init__(self, object_cache, disk_cache=None):
+        self.object_cache = object_cache
+        self.disk_cache = disk_cache
+
+    def collect(self):
+        counters = {
+            name: CounterMetricFamily(f"gpnai_cache_{name}", f"Cache {name} sayısı", labels=["segment"])
+            for name in ("hits", "misses", "revalidations", "evictions")
+        }
+        entries = GaugeMetricFamily("gpnai_cache_entries", "Cache'teki girdi sayısı", labels=["segment"])
+        size = GaugeMetricFamily("gpnai_cache_bytes", "Cache'teki girdilerin toplam boyutu", labels=["segment"])
+        for segment, stats in self.object_cache.stats().items():
+            for name, family in counters.items():
+                family.add_metric([segment], stats[name])
+            entries.add_metric([segment], stats["entries"])
+            size.add_metric([segment], stats["bytes"])
+        yield from counters.values()
+        yield entries
+        yield size
+        if self.disk_cache is not None:
+            stats = self.disk_cache.stats()
+            yield CounterMetricFamily("gpnai_disk_cache_hits", "Disk katmanı isabetleri", value=stats["hits"])
+            yield CounterMetricFamily("gpnai_disk_cache_misses", "Disk katmanı ıskaları", value=stats["misses"])
+            yield GaugeMetricFamily("gpnai_disk_cache_bytes", "Disk katmanındaki toplam bayt", value=stats["bytes"])
+
+
+class LogShipperCollector:
+    """Kullanım log göndericisinin kuyruk derinliğini ve sayaçlarını sunar."""
+
+    def __init__(self, shipper):
+        self.shipper = shipper
+
+    def collect(self):
+        yield GaugeMetricFamily("gpnai_usage_log_queue_depth", "Gönderilmeyi bekleyen log girdileri",
+                                value=self.shipper.depth)
+        yield CounterMetricFamily("gpnai_usage_log_shipped", "R2'ye yazılan log girdileri",
+                                  value=self.shipper.shipped)
+        yield CounterMetricFamily("gpnai_usage_log_dropped", "Kuyruk dolu olduğu için düşürülen log girdileri",
+                                  value=self.shipper.dropped)
@@ -0,0 +1,388 @@
+# notifier.py (YENİ - Arka planda, kalıcı kuyruklu bildirim gönderimi)
+#
+# Telegram / Slack bildirimleri scrape akışında doğrudan gönderilmez; bir giden
+# kutusuna (outbox) eklenir ve tek bir arka plan thread'i tarafından gönderilir:
+#   - kanal başına hız sınırı (iki gönderim arasında en az 'interval' saniye)
+#     ve kanal içinde sıra korunur (bölünmüş mesajın parçaları sırayla gider),
+#   - ağ hatası, 429 ve 5xx yanıtlarında artan beklemeli yeniden deneme
+#     (Telegram'ın retry_after / Slack'in Retry-After değerine uyulur),
+#   - kanal sınırını aşan mesajlar satır sınırlarından parçalara bölünür,
+#   - HTML biçimi reddedilen (400) mesaj etiketsiz düz metin olarak yeniden denenir,
+#   - uyarılar tek tek gönderilmez; bir özet (digest) halinde birleştirilir.
+# Cron çalışmaları her seferinde boş bir dosya sisteminde başladığı için outbox,
+# scrape durum manifesti gibi bucket'ta tutulur (_state/notify_outbox/<iş>.json).
+# Süreç çökse de kuyruktaki bildirimler kaybolmaz; aynı işin bir sonraki
+# çalışması açılışta bunları gönderir. S3'e hiç dokunmayan health işi bellekteki
+# outbox'u (MemoryOutbox) kullanır.
+
+import html
+import json
+import logging
+import os
+import re
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+import metrics
+
+TELEGRAM_MAX_LENGTH = 4096
+SLACK_MAX_LENGTH = 3900  # Slack'in tek 'text' alanı için güvenli sınır
+OUTBOX_PREFIX = "_state/notify_outbox/"
+NOTIFY_DRAIN_TIMEOUT = float(os.getenv("NOTIFY_DRAIN_TIMEOUT", "30"))  # saniye, kapanışta
+NOTIFY_DIGEST_WINDOW = float(os.getenv("NOTIFY_DIGEST_WINDOW", "300"))  # saniye
+NOTIFY_MAX_AGE_HOURS = float(os.getenv("NOTIFY_MAX_AGE_HOURS", "24"))
+NOTIFY_MAX_BACKOFF = 60.0
+REQUEST_TIMEOUT = 10
+_HTML_TAG = re.compile(r"<[^>]+>")
+
+
+class DeliveryError(Exception):
+    """Kanalın hata durum koduyla yanıt verdiği gönderim."""
+
+    def __init__(self, message: str, status: int, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+def _session():
+    import requests
+    return requests.Session()
+
+
+class TelegramChannel:
+    name = "telegram"
+    max_length = TELEGRAM_MAX_LENGTH
+
+    def __init__(self, token: str, chat_id: str, interval: float = 1.0):
+        self.api_url = f"https://api.telegram.org/bot{token}/sendMessage"
+        self.chat_id = chat_id
+        self.interval = interval
+        self.session = _session()
+
+    def send(self, text: str, parse_mode: Optional[str]):
+        payload = {"chat_id": self.chat_id, "text": text}
+        if parse_mode:
+            payload["parse_mode"] = parse_mode
+        res = self.session.post(self.api_url, json=payload, timeout=REQUEST_TIMEOUT)
+        if res.ok:
+            return
+        try:
+            body = res.json()
+        except ValueError:
+            body = {}
+        raise DeliveryError(f"HTTP {res.status_code}: {body.get('description') or res.text[:200]}",
+                            res.status_code, (body.get("parameters") or {}).get("retry_after"))
+
+
+class SlackChannel:
+    name = "slack"
+    max_length = SLACK_MAX_LENGTH
+
+    def __init__(self, webhook_url: str, interval: float = 1.0):
+        self.webhook_url = webhook_url
+        self.interval = interval
+        self.session = _session()
+
+    def send(self, text: str, parse_mode: Optional[str]):
+        res = self.session.post(self.webhook_url, json={"text": text}, timeout=REQUEST_TIMEOUT)
+        if res.ok:
+            return
+        retry_after = res.headers.get("Retry-After")
+        raise DeliveryError(f"HTTP {res.status_code}: {res.text[:200]}", res.status_code,
+                            float(retry_after) if retry_after and retry_after.isdigit() else None)
+
+
+def split_message(text: str, limit: int) -> List[str]:
+    """Metni en fazla `limit` karakterlik parçalara böler; önce boş satır, sonra satır sınırı aranır.
+
+    Satır içi HTML etiketleri satır sonunda kapandığı için satır sınırından bölmek biçimi bozmaz.
+    """
+    parts = []
+    while len(text) > limit:
+        cut = text.rfind("\n\n", 0, limit + 1)
+        if cut < limit // 2:
+            cut = text.rfind("\n", 0, limit + 1)
+        if cut <= 0:
+            cut = limit
+        parts.append(text[:cut].rstrip())
+        text = text[cut:].lstrip("\n")
+    if text.strip():
+        parts.append(text)
+    return parts
+
+
+def build_digest(messages: List[str]) -> str:
+    """Uyarıları tek mesajda birleştirir; aynı uyarı birden fazla geldiyse bir kez ve adediyle yazılır."""
+    if len(messages) == 1:
+        return messages[0]
+    counts: Dict[str, int] = {}
+    for message in messages:
+        counts[message] = counts.get(message, 0) + 1
+    lines = [f"{len(messages)} uyarı ({len(counts)} farklı):"]
+    lines.extend(f"• {message}" + (f" (×{count})" if count > 1 else "") for message, count in counts.items())
+    return "\n\n".join(lines)
+
+
+class MemoryOutbox:
+    """Kalıcı olmayan outbox (bucket tanımlı değilse ya da testlerde)."""
+
+    def load(self) -> Dict:
+        return {}
+
+    def save(self, data: Dict):
+        pass
+
+
+class S3Outbox:
+    """Outbox'u bucket'ta tek bir JSON nesnesi olarak tutar. Anahtar iş başınadır
+    (scrape / backfill); aynı işin çalışmaları çakışmadığı için koşulsuz yazılır."""
+
+    def __init__(self, get_s3_client: Callable, bucket: str, job: str):
+        self.get_s3_client = get_s3_client  # boto3 yalnızca ilk kullanımda yüklensin
+        self.bucket = bucket
+        self.key = f"{OUTBOX_PREFIX}{job}.json"
+
+    def load(self) -> Dict:
+        s3_client = self.get_s3_client()
+        try:
+            return json.loads(s3_client.get_object(Bucket=self.bucket, Key=self.key)["Body"].read())
+        except s3_client.exceptions.NoSuchKey:
+            return {}
+
+    def save(self, data: Dict):
+        self.get_s3_client().put_object(
+            Bucket=self.bucket, Key=self.key,
+            Body=json.dumps(data, ensure_ascii=False).encode("utf-8"), ContentType="application/json",
+        )
+
+
+class NotificationDispatcher:
+    # Uyarı özetinin kanal başına şablonu ve biçimi
+    ALERT_TEMPLATES = {
+        "slack": ("🚨 **GPNAI Servis Uyarısı** 🚨\n\n```{message}```", None),
+        "telegram": ("🚨 GPNAI Servis Uyarısı 🚨\n\n{message}", None),
+    }
+
+    def __init__(self, channels: List, outbox=None, digest_window: float = NOTIFY_DIGEST_WINDOW,
+                 drain_timeout: float = NOTIFY_DRAIN_TIMEOUT, max_age_hours: float = NOTIFY_MAX_AGE_HOURS):
+        self.channels = {channel.name: channel for channel in channels}
+        self.outbox = outbox or MemoryOutbox()
+        self.digest_window = digest_window
+        self.drain_timeout = drain_timeout
+        self.max_age_hours = max_age_hours
+        self.cond = threading.Condition()
+        self.items: List[Dict] = []   # {"id", "channel", "text", "parse_mode", "attempts", "next_attempt", "created"}
+        self.alerts: List[Dict] = []  # {"message", "created"}
+        self.next_id = 1
+        self.loaded = False
+        self.dirty = False
+        self.thread = None
+        self.stopping = False
+        self.next_slot = {name: 0.0 for name in self.channels}
+
+    # --- Outbox ---
+
+    def _load_locked(self):
+        if self.loaded:
+            return
+        self.loaded = True
+        try:
+            data = self.outbox.load()
+        except Exception as e:
+            logging.warning(f"NOTIFY: Outbox okunamadı, önceki çalışmadan kalan bildirimler atlanıyor: {e}")
+            data = {}
+        cutoff = time.time() - self.max_age_hours * 3600
+        items = data.get("items", [])
+        # Bayatlamış ya da artık yapılandırılmamış kanallara ait bildirimler gönderilmez.
+        kept = [item for item in items if item["created"] >= cutoff and item["channel"] in self.channels]
+        if len(kept) < len(items):
+            logging.warning(f"NOTIFY: {len(items) - len(kept)} eski / kanalı olmayan bildirim outbox'tan silindi.")
+            self.dirty = True
+        self.items = kept
+        self.alerts = data.get("alerts", [])
+        self.next_id = max([data.get("next_id", 1)] + [item["id"] + 1 for item in kept])
+        if kept or data.get("alerts"):
+            logging.info(f"NOTIFY: Önceki çalışmadan {len(kept)} bildirim ve {len(data.get('alerts', []))} uyarı kuyrukta, gönderilecek.")
+
+    def _persist(self):
+        """Değişiklik varsa outbox'un anlık görüntüsünü yazar (kilit dışında çağrılır)."""
+        with self.cond:
+            if not self.dirty:
+                return
+            self.dirty = False
+            snapshot = {"items": [dict(item) for item in self.items], "alerts": list(self.alerts),
+                        "next_id": self.next_id, "updated_at": time.time()}
+        try:
+            self.outbox.save(snapshot)
+        except Exception as e:
+            logging.warning(f"NOTIFY: Outbox yazılamadı: {e}")
+
+    def _enqueue_locked(self, channel_name: str, text: str, parse_mode: Optional[str], template: str = "{message}"):
+        channel = self.channels[channel_name]
+        limit = channel.max_length - len(template.format(message=""))
+        now = time.time()
+        for part in split_message(text, limit):
+            self.items.append({"id": self.next_id, "channel": channel_name, "text": template.format(message=part),
+                               "parse_mode": parse_mode, "attempts": 0, "next_attempt": now, "created": now})
+            self.next_id += 1
+        self.dirty = True
+
+    def _find_locked(self, item_id: int) -> Optional[Dict]:
+        return next((item for item in self.items if item["id"] == item_id), None)
+
+    def _remove_locked(self, item_id: int):
+        self.items = [item for item in self.items if item["id"] != item_id]
+        self.dirty = True
+
+    # --- Genel arayüz ---
+
+    def start(self):
+        """Gönderim thread'ini başlatır; önceki çalışmadan outbox'ta kalanlar da gönderilir."""
+        with self.cond:
+            self._load_locked()
+            if self.thread is not None:
+                return
+            self.stopping = False
+            self.thread = threading.Thread(target=self._run, name="notifier", daemon=True)
+            self.thread.start()
+
+    def send(self, channel_name: str, text: str, parse_mode: Optional[str] = None) -> bool:
+        """Mesajı kanalın kuyruğuna ekler. Kanal yapılandırılmamışsa False döner."""
+        if channel_name not in self.channels:
+            logging.warning(f"NOTIFY: '{channel_name}' kanalı yapılandırılmamış, bildirim atlanıyor.")
+            return False
+        self.start()
+        with self.cond:
+            self._enqueue_locked(channel_name, text, parse_mode)
+            self.cond.notify_all()
+        return True
+
+    def alert(self, message: str):
+        """Uyarıyı özete ekler; özet 'digest_window' dolduğunda ya da close() ile gönderilir."""
+        if not self.channels:
+            logging.warning("NOTIFY: Hiçbir bildirim kanalı tanımlı değil. Uyarı atlanıyor.")
+            return
+        self.start()
+        with self.cond:
+            self.alerts.append({"message": message, "created": time.time()})
+            self.dirty = True
+            self.cond.notify_all()
+
+    def flush_alerts(self):
+        """Biriken uyarıları tek bir özet mesajı olarak tüm kanalların kuyruğuna taşır."""
+        with self.cond:
+            self._flush_alerts_locked()
+            self.cond.notify_all()
+
+    def _flush_alerts_locked(self):
+        if not self.alerts:
+            return
+        digest = build_digest([alert["message"] for alert in self.alerts])
+        for name in self.channels:
+            template, parse_mode = self.ALERT_TEMPLATES.get(name, ("{message}", None))
+            self._enqueue_locked(name, digest, parse_mode, template)
+        self.alerts = []
+
+    def close(self, timeout: Optional[float] = None):
+        """Uyarı özetini kuyruğa ekler ve kuyruk boşalana kadar (en fazla 'timeout' sn) bekler.
+        Gönderilemeyenler outbox'ta kalır ve bir sonraki çalışmada gönderilir.
+        Gönderim thread'i çalışmıyorsa (hiç başlamadı ya da zaten kapatıldı) hemen döner."""
+        if self.thread is None:
+            return
+        self.flush_alerts()
+        deadline = time.monotonic() + (self.drain_timeout if timeout is None else timeout)
+        with self.cond:
+            while self.items and time.monotonic() < deadline:
+                self.cond.wait(timeout=min(0.5, max(0.0, deadline - time.monotonic())))
+            remaining = len(self.items)
+            self.stopping = True
+            self.cond.notify_all()
+        self.thread.join(timeout=REQUEST_TIMEOUT + 1)
+        self.thread = None
+        self._persist()
+        if remaining:
+            logging.warning(f"NOTIFY: {remaining} bildirim gönderilemedi, bir sonraki çalışmaya bırakıldı.")
+
+    # --- Gönderim thread'i ---
+
+    def _next_item_locked(self):
+        """Zamanı gelmiş ilk bildirimi ya da (None, bekleme süresi) döner. Her kanalda yalnızca en eski bildirim adaydır."""
+        now = time.time()
+        wait = None
+        heads = {}
+        for item in self.items:
+            heads.setdefault(item["channel"], item)
+        for name, item in heads.items():
+            due = max(item["next_attempt"], self.next_slot[name])
+            if due <= now:
+                return dict(item), 0.0
+            wait = due - now if wait is None else min(wait, due - now)
+        if self.alerts:
+            digest_due = self.alerts[0]["created"] + self.digest_window - now
+            wait = digest_due if wait is None else min(wait, digest_due)
+        return None, wait
+
+    def _run(self):
+        while True:
+            # Kuyruk değişiklikleri gönderimden önce kalıcı hale getirilir.
+            self._persist()
+            with self.cond:
+                if self.stopping:
+                    return
+                item, wait = self._next_item_locked()
+                if item is None:
+                    if wait is not None and wait <= 0:
+                        self._flush_alerts_locked()
+                        continue
+                    self.cond.wait(timeout=wait)
+                    continue
+            self._deliver(item)
+            with self.cond:
+                self.cond.notify_all()
+
+    def _deliver(self, item: Dict):
+        channel = self.channels[item["channel"]]
+        try:
+            channel.send(item["text"], item["parse_mode"])
+        except Exception as e:
+            self._handle_failure(item, e)
+        else:
+            with self.cond:
+                self._remove_locked(item["id"])
+            metrics.SCRAPE_NOTIFICATIONS.labels(item["channel"], "sent").inc()
+        finally:
+            self.next_slot[item["channel"]] = time.time() + channel.interval
+
+    def _handle_failure(self, item: Dict, error: Exception):
+        import requests
+
+        channel_name = item["channel"]
+        status = getattr(error, "status", None)
+        if status == 400 and item["parse_mode"]:
+            # Biçim hatası (örn. sert bölünmüş bir HTML etiketi): etiketsiz düz metin olarak tekrar dene.
+            logging.warning(f"NOTIFY: {channel_name} biçimi reddetti ({error}), düz metin olarak gönderilecek.")
+            with self.cond:
+                stored = self._find_locked(item["id"])
+                if stored is not None:
+                    stored.update(text=html.unescape(_HTML_TAG.sub("", item["text"])), parse_mode=None)
+                    self.dirty = True
+            return
+        transient = isinstance(error, requests.RequestException) or status == 429 or (status or 0) >= 500
+        if not transient:
+            logging.error(f"NOTIFY: {channel_name} bildirimi kalıcı hatayla düşürüldü: {error}")
+            with self.cond:
+                self._remove_locked(item["id"])
+            metrics.SCRAPE_NOTIFICATIONS.labels(channel_name, "dropped").inc()
+            return
+        attempts = item["attempts"]
+        delay = getattr(error, "retry_after", None) or min(NOTIFY_MAX_BACKOFF, 2 ** attempts)
+        logging.warning(f"NOTIFY: {channel_name} gönderimi başarısız ({error}), {delay:.0f} sn sonra yeniden denenecek "
+                        f"({attempts + 1}. deneme).")
+        with self.cond:
+            stored = self._find_locked(item["id"])
+            if stored is not None:
+                stored.update(attempts=attempts + 1, next_attempt=time.time() + delay)
+                self.dirty = True
+        metrics.SCRAPE_NOTIFICATIONS.labels(channel_name, "retried").inc()
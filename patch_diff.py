@@ -0,0 +1,77 @@
+# patch_diff.py (YENİ - İki yama arşivi arasındaki yapısal fark)
+#
+# Değişiklikler (target, ability) çiftine göre eşleştirilir:
+#   added   -> yalnızca yeni yamada olanlar
+#   removed -> yalnızca eski yamada olanlar
+#   changed -> iki yamada da olup türü ya da açıklaması farklı olanlar
+#              (tür değiştiyse "type_flip": "buff→nerf")
+# Aynı anahtarla birden fazla değişiklik varsa sırayla eşleştirilir.
+
+from typing import Dict, List, Tuple
+
+
+def _change_key(change: Dict) -> Tuple[str, str]:
+    target = " ".join(str(change.get("target", "")).casefold().split())
+    ability = " ".join(str(change.get("ability", "")).casefold().split())
+    return target, ability
+
+
+def _group(changes: List[Dict]) -> Dict[Tuple[str, str], List[Dict]]:
+    groups: Dict[Tuple[str, str], List[Dict]] = {}
+    for change in changes:
+        groups.setdefault(_change_key(change), []).append(change)
+    return groups
+
+
+def _summary(patch: Dict, key: str) -> Dict:
+    return {
+        "key": key,
+        "patch_version": patch.get("patch_version", "unknown"),
+        "date": patch.get("date", "unknown"),
+        "impact_score": patch.get("impact_score", 0),
+        "impact_label": patch.get("impact_label", "Küçük"),
+    }
+
+
+def diff_patches(old: Dict, new: Dict, old_key: str, new_key: str) -> Dict:
+    """İki yama JSON'unun `changes` listelerini ve etki skorlarını karşılaştırır."""
+    old_groups = _group(old.get("changes", []))
+    new_groups = _group(new.get("changes", []))
+
+    added, removed, changed = [], [], []
+    unchanged = 0
+    for key in list(old_groups) + [key for key in new_groups if key not in old_groups]:
+        old_items = old_groups.get(key, [])
+        new_items = new_groups.get(key, [])
+        for before, after in zip(old_items, new_items):
+            old_type = str(before.get("type", "other")).lower()
+            new_type = str(after.get("type", "other")).lower()
+            if old_type == new_type and before.get("details") == after.get("details"):
+                unchanged += 1
+                continue
+            changed.append({
+                "target": after.get("target", before.get("target")),
+                "ability": after.get("ability", before.get("ability")),
+                "type_flip": f"{old_type}→{new_type}" if old_type != new_type else None,
+                "from": before,
+                "to": after,
+            })
+        removed.extend(old_items[len(new_items):])
+        added.extend(new_items[len(old_items):])
+
+    return {
+        "game": new.get("game") or old.get("game"),
+        "from": _summary(old, old_key),
+        "to": _summary(new, new_key),
+        "impact_delta": new.get("impact_score", 0) - old.get("impact_score", 0),
+        "summary": {
+            "added": len(added),
+            "removed": len(removed),
+            "changed": len(changed),
+            "type_flips": sum(1 for item in changed if item["type_flip"]),
+            "unchanged": unchanged,
+        },
+        "added": added,
+        "removed": removed,
+        "changed": changed,
+    }
@@ -1,35 +1,66 @@
 import os
 import json
-import time
-import random
 import logging
-import boto3
 import requests
 import yaml 
 import scrapers 
+import archive_index
+import metrics
+import search_index
+import time
+import asyncio
 import concurrent.futures
+import threading
 import hashlib
 import sys
-from datetime import datetime
+from datetime import datetime, timedelta
 from dotenv import load_dotenv
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
-from bs4 import BeautifulSoup
-from utils import analyze_with_gemini 
+from chunking import DEFAULT_CHUNK_SIZE
+from notifier import NotificationDispatcher, S3Outbox, SlackChannel, TelegramChannel
+from fetch_engine import AsyncFetcher, FETCH_DEADLINE, run_with_deadline
+from utils import analyze_chunked, analyze_with_gemini, AnalysisCache, GEMINI_MAX_CONCURRENCY
 
 # --- Ortam Değişkenlerini Yükle ---
 load_dotenv()
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 
 # --- S3 Client Kurulumu ---
-s3_client = boto3.client(
-    "s3",
-    endpoint_url=os.getenv("S3_ENDPOINT_URL"),
-    aws_access_key_id=os.getenv("S3_ACCESS_KEY_ID"),
-    aws_secret_access_key=os.getenv("S3_SECRET_ACCESS_KEY"),
-    region_name="auto", 
-)
+# boto3 ilk S3 işleminde yüklenir; health modu S3'e hiç dokunmaz.
 S3_BUCKET_NAME = os.getenv("S3_BUCKET_NAME")
+_s3_client = None
+_s3_client_lock = threading.Lock()
+
+def get_s3_client():
+    global _s3_client
+    if _s3_client is None:
+        with _s3_client_lock:
+            if _s3_client is None:
+                import boto3
+                client = boto3.client(
+                    "s3",
+                    endpoint_url=os.getenv("S3_ENDPOINT_URL"),
+                    aws_access_key_id=os.getenv("S3_ACCESS_KEY_ID"),
+                    aws_secret_access_key=os.getenv("S3_SECRET_ACCESS_KEY"),
+                    region_name="auto", 
+                )
+                metrics.instrument_s3_client(client, metrics.SCRAPE_S3_REQUESTS, metrics.SCRAPE_S3_REQUEST_DURATION)
+                _s3_client = client
+    return _s3_client
+
+# --- Gemini Sonuç Cache'i ---
+# "s3" (varsayılan): sonuçlar _cache/gemini/ altında saklanır; "disk": yerel dizin; "off": kapalı
+GEMINI_CACHE_BACKEND = os.getenv("GEMINI_CACHE_BACKEND", "s3")
+
+def create_analysis_cache():
+    max_age_days = int(os.getenv("GEMINI_CACHE_MAX_AGE_DAYS", "90"))
+    if GEMINI_CACHE_BACKEND == "s3":
+        return AnalysisCache(s3_client=get_s3_client(), bucket=S3_BUCKET_NAME, max_age_days=max_age_days)
+    if GEMINI_CACHE_BACKEND == "disk":
+        return AnalysisCache(local_dir=os.getenv("GEMINI_CACHE_DIR", ".gemini_cache"),
+                             max_entries=int(os.getenv("GEMINI_CACHE_MAX_ENTRIES", "500")))
+    return None
 
 # --- Bildirim Anahtarları ---
 SLACK_WEBHOOK_URL = os.getenv("SLACK_WEBHOOK_URL")
@@ -58,29 +89,37 @@ def get_impact_label(score):
         return "Küçük"
 
 # --- Bildirim Fonksiyonları ---
+# Bildirimler notifier.py'deki kuyruğa yazılır ve arka planda gönderilir (outbox bucket'ta tutulur);
+# scrape akışı Telegram / Slack'i beklemez. Uyarılar çalışma sonunda tek özet halinde gider.
+def create_notification_dispatcher():
+    """Tanımlı kanallarla dağıtıcıyı kurar; tanımsız kanala gönderim uyarıyla atlanır."""
+    channels = []
+    if TELEGRAM_BOT_TOKEN and TELEGRAM_CHAT_ID:
+        channels.append(TelegramChannel(TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID,
+                                        interval=float(os.getenv("NOTIFY_TELEGRAM_INTERVAL", "1.0"))))
+    if SLACK_WEBHOOK_URL:
+        channels.append(SlackChannel(SLACK_WEBHOOK_URL, interval=float(os.getenv("NOTIFY_SLACK_INTERVAL", "1.0"))))
+    return NotificationDispatcher(channels)
+
+notifications = create_notification_dispatcher()
+
+# Outbox yalnızca zaten S3 kullanan işlerde bucket'ta tutulur; health modu boto3'ü hiç yüklemez,
+# onun bildirimleri bellekteki outbox ile çalışma sonunda gönderilir.
+PERSISTENT_OUTBOX_MODES = ("scrape", "backfill")
+
+def start_notifications(run_mode):
+    """Çalışma moduna göre outbox'u bağlar ve gönderimi başlatır; önceki (çökmüş) çalışmadan kalanlar da gider."""
+    if run_mode in PERSISTENT_OUTBOX_MODES:
+        notifications.outbox = S3Outbox(get_s3_client, S3_BUCKET_NAME, run_mode)
+    notifications.start()
+
 def send_telegram_message(message_text, parse_mode="HTML"):
-    if not TELEGRAM_BOT_TOKEN or not TELEGRAM_CHAT_ID:
-        logging.warning("TELEGRAM_BOT_TOKEN veya TELEGRAM_CHAT_ID tanımlı değil. Telegram bildirimi atlanıyor.")
-        return
-    api_url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
-    payload = {'chat_id': TELEGRAM_CHAT_ID, 'text': message_text, 'parse_mode': parse_mode}
-    try:
-        requests.post(api_url, json=payload, timeout=10)
-    except Exception as e:
-        logging.error(f"Telegram bildirimi gönderilemedi: {e}")
+    """Mesajı Telegram kuyruğuna ekler (4096 karakteri aşan mesajlar parçalanır)."""
+    notifications.send("telegram", message_text, parse_mode=parse_mode)
 
 def send_alert(message):
-    if SLACK_WEBHOOK_URL:
-        try:
-            payload = {"text": f"🚨 **GPNAI Servis Uyarısı** 🚨\n\n```{message}```"}
-            requests.post(SLACK_WEBHOOK_URL, json=payload, timeout=5)
-        except Exception as e:
-            logging.error(f"Slack bildirimi gönderilemedi: {e}")
-    else:
-        logging.warning("SLACK_WEBHOOK_URL tanımlı değil. Slack bildirimi atlanıyor.")
-
-    telegram_error_message = f"🚨 GPNAI Servis Uyarısı 🚨\n\n{message}"
-    send_telegram_message(telegram_error_message, parse_mode=None)
+    """Uyarıyı Slack + Telegram özetine ekler; özet çalışma sonunda (ya da NOTIFY_DIGEST_WINDOW dolunca) gider."""
+    notifications.alert(message)
 
 # --- Telegram Mesaj Formatlama ---
 def format_patch_notes_for_telegram(json_data):
@@ -134,6 +173,7 @@ def format_patch_notes_for_telegram(json_data):
 if not GEMINI_API_KEY or not S3_BUCKET_NAME:
     error_msg = "❌ .env dosyasında GEMINI_API_KEY veya S3 bilgileri eksik!"
     send_alert(error_msg)
+    notifications.close()
     raise ValueError(error_msg)
 
 # --- Loglama ---
@@ -147,6 +187,8 @@ logging.basicConfig(
 )
 
 # --- Yardımcı Fonksiyonlar ---
+# html / rss stratejileri fetch_engine.AsyncFetcher ile çalışır; requests session'ı yalnızca
+# eski (senkron) fetch_function'lar için kullanılır.
 def create_session():
     session = requests.Session()
     retries = Retry(total=3, backoff_factor=1, status_forcelist=[429, 500, 502, 503, 504])
@@ -156,40 +198,45 @@ def create_session():
     })
     return session
 
-def get_hash_from_s3(safe_name):
-    hash_key = f"{safe_name}_latest.hash"
+def get_json_from_s3(key):
+    s3_client = get_s3_client()
     try:
-        response = s3_client.get_object(Bucket=S3_BUCKET_NAME, Key=hash_key)
-        return response['Body'].read().decode('utf-8')
+        response = s3_client.get_object(Bucket=S3_BUCKET_NAME, Key=key)
+        return json.loads(response['Body'].read())
     except s3_client.exceptions.NoSuchKey:
         return None
-    except Exception as e:
-        logging.warning(f"S3'ten hash okuma hatası ({hash_key}): {e}")
-        return None
 
-def save_hash_to_s3(safe_name, new_hash):
-    hash_key = f"{safe_name}_latest.hash"
-    try:
-        s3_client.put_object(
-            Bucket=S3_BUCKET_NAME, Key=hash_key, Body=new_hash.encode('utf-8'), ContentType="text/plain"
-        )
-    except Exception as e:
-        logging.error(f"S3'e hash yazma hatası ({hash_key}): {e}")
-        send_alert(f"❌ S3'e hash yazma hatası ({hash_key}): {e}")
+def put_json_to_s3(key, data):
+    get_s3_client().put_object(
+        Bucket=S3_BUCKET_NAME, Key=key, Body=json.dumps(data, indent=2, ensure_ascii=False), ContentType="application/json"
+    )
 
-# --- YENİ: INDEX GÜNCELLEME ---
+# --- YENİ: PARÇALI INDEX GÜNCELLEME ---
 def update_index_file_in_s3(safe_name, archive_key, patch_data, timestamp_str):
-    index_key = f"{safe_name}/index.json"
+    """Yeni arşivi ilgili ayın index parçasına ekler ve baş manifesti günceller.
+
+    Her çalışmada yalnızca bir aylık parça ve küçük manifest yazılır; geçmişin
+    tamamı yeniden yazılmaz.
+    """
+    index_key = archive_index.head_key(safe_name)
     try:
         try:
-            response = s3_client.get_object(Bucket=S3_BUCKET_NAME, Key=index_key)
-            content = response['Body'].read()
-            index_data = json.loads(content)
-        except s3_client.exceptions.NoSuchKey:
-            index_data = {"game": patch_data.get("game"), "history": []}
+            head = get_json_from_s3(index_key)
         except Exception as e:
             logging.warning(f"S3 Index okuma hatası ({index_key}): {e}. Yeni index oluşturulacak.")
-            index_data = {"game": patch_data.get("game"), "history": []}
+            head = None
+
+        shards = {}
+        if head is None:
+            head = archive_index.new_head(patch_data.get("game"))
+        elif "history" in head:
+            # Eski tek dosyalı index: tüm geçmiş bir kez aylık parçalara taşınır.
+            logging.info(f"INDEX: {index_key} parçalı formata taşınıyor ({len(head['history'])} girdi)...")
+            history = head["history"]
+            shards = archive_index.split_into_shards(history)
+            head = archive_index.new_head(head.get("game") or patch_data.get("game"))
+            # İlk sayfa taşımadan hemen sonra da baş manifestten sunulsun.
+            head["recent"] = archive_index.sort_entries(history)[:archive_index.HEAD_RECENT_SIZE]
 
         new_entry = {
             "key": archive_key,
@@ -199,95 +246,259 @@ def update_index_file_in_s3(safe_name, archive_key, patch_data, timestamp_str):
             "impact_label": patch_data.get("impact_label", "Küçük")
         }
 
-        index_data["history"] = [entry for entry in index_data["history"] if entry["key"] != archive_key]
-        index_data["history"].insert(0, new_entry)
-
-        index_string = json.dumps(index_data, indent=2, ensure_ascii=False)
-        s3_client.put_object(
-            Bucket=S3_BUCKET_NAME, Key=index_key, Body=index_string, ContentType="application/json"
+        month = archive_index.archive_month(archive_key)
+        month_shard_key = archive_index.shard_key(safe_name, month)
+        if month not in shards:
+            existing_shard = get_json_from_s3(month_shard_key) if any(
+                shard["month"] == month for shard in head["shards"]) else None
+            shards[month] = existing_shard["history"] if existing_shard else []
+        shards[month] = archive_index.sort_entries(
+            [entry for entry in shards[month] if entry["key"] != archive_key] + [new_entry]
         )
-        logging.info(f"✅ INDEX S3'e kaydedildi: {S3_BUCKET_NAME}/{index_key}")
+
+        shard_counts = {shard["month"]: shard["count"] for shard in head["shards"]}
+        for shard_month, entries in shards.items():
+            put_json_to_s3(archive_index.shard_key(safe_name, shard_month),
+                           {"game": head["game"], "month": shard_month, "history": entries})
+            shard_counts[shard_month] = len(entries)
+
+        recent = [entry for entry in head["recent"] if entry["key"] != archive_key] + [new_entry]
+        head["recent"] = archive_index.sort_entries(recent)[:archive_index.HEAD_RECENT_SIZE]
+        head["shards"] = [
+            {"month": shard_month, "key": archive_index.shard_key(safe_name, shard_month), "count": count}
+            for shard_month, count in sorted(shard_counts.items(), reverse=True)
+        ]
+        head["total"] = sum(shard_counts.values())
+        head["updated_at"] = timestamp_str
+
+        put_json_to_s3(index_key, head)
+        logging.info(f"✅ INDEX S3'e kaydedildi: {S3_BUCKET_NAME}/{index_key} (+ {month_shard_key})")
     except Exception as e:
         logging.error(f"❌ S3 Index yazma hatası ({index_key}): {e}")
         send_alert(f"❌ S3 Index yazma hatası ({index_key}): {e}")
 
+# --- YENİ: ARAMA INDEX'İ GÜNCELLEME ---
+def update_search_index_in_s3(safe_name, archive_key, patch_data, timestamp_str):
+    """Yeni arşivin değişikliklerini oyunun arama index'ine ekler."""
+    key = search_index.search_key(safe_name)
+    try:
+        index = get_json_from_s3(key) or search_index.new_index(patch_data.get("game"))
+        if not search_index.add_patch(index, archive_key, timestamp_str, patch_data):
+            return
+        index["updated_at"] = timestamp_str
+        get_s3_client().put_object(
+            Bucket=S3_BUCKET_NAME, Key=key, Body=search_index.dumps(index), ContentType="application/json"
+        )
+        logging.info(f"✅ ARAMA INDEX'İ S3'e kaydedildi: {S3_BUCKET_NAME}/{key} ({len(index['changes'])} değişiklik)")
+    except Exception as e:
+        logging.error(f"❌ Arama index'i yazma hatası ({key}): {e}")
+
 # --- Güncellenmiş S3 Kaydetme Fonksiyonu ---
-def save_json_to_s3_and_archive(data, base_name):
+def save_json_to_s3_and_archive(data, base_name, timestamp=None, update_latest=True):
+    """Yamayı arşivler ve index'lere ekler. 'update_latest' False ise (geçmiş makaleler) _latest.json'a dokunmaz."""
     try:
         json_string = json.dumps(data, indent=2, ensure_ascii=False)
-        timestamp = datetime.utcnow()
+        timestamp = timestamp or datetime.utcnow()
         timestamp_str_file = timestamp.strftime('%Y%m%d_%H%M%S')
         timestamp_str_iso = timestamp.isoformat()
 
         archive_filename = f"{base_name}/{timestamp_str_file}.json"
-        s3_client.put_object(
+        get_s3_client().put_object(
             Bucket=S3_BUCKET_NAME, Key=archive_filename, Body=json_string, ContentType="application/json"
         )
         logging.info(f"✅ ARŞİV S3'e kaydedildi: {S3_BUCKET_NAME}/{archive_filename}")
 
-        latest_filename = f"{base_name}_latest.json"
-        s3_client.put_object(
-            Bucket=S3_BUCKET_NAME, Key=latest_filename, Body=json_string, ContentType="application/json"
-        )
-        logging.info(f"✅ GÜNCEL S3'e kaydedildi: {S3_BUCKET_NAME}/{latest_filename}")
+        if update_latest:
+            latest_filename = f"{base_name}_latest.json"
+            get_s3_client().put_object(
+                Bucket=S3_BUCKET_NAME, Key=latest_filename, Body=json_string, ContentType="application/json"
+            )
+            logging.info(f"✅ GÜNCEL S3'e kaydedildi: {S3_BUCKET_NAME}/{latest_filename}")
 
         try:
             update_index_file_in_s3(base_name, archive_filename, data, timestamp_str_iso)
         except Exception as e:
             logging.error(f"Index güncelleme fonksiyonu çağrılırken hata: {e}")
 
+        update_search_index_in_s3(base_name, archive_filename, data, timestamp_str_iso)
+
     except Exception as e:
         logging.error(f"❌ S3'e yazma hatası ({base_name}): {e}")
         send_alert(f"❌ S3'e yazma hatası ({base_name}): {e}")
 
-# --- Veri Çekme (GÜNCELLENDİ) ---
-def fetch_game_data(game_config, session):
+# --- Veri Çekme (GÜNCELLENDİ: asenkron motor, çoklu makale) ---
+# Her kaynak için işlenen makalelerin kimlikleri manifestte ('seen_articles', yeniden eskiye)
+# tutulur; yalnızca yeni makaleler analiz edilir. Takip başladığında listede zaten olan eski
+# makaleler 'baseline_articles' içindedir: normal çalışma onları atlar, backfill işleyebilir.
+SEEN_ARTICLES_LIMIT = 500
+DEFAULT_MAX_ARTICLES = int(os.getenv("SCRAPE_MAX_ARTICLES", "5"))  # çalışma başına kaynaktaki aday sayısı
+BACKFILL_DEFAULT_LIMIT = 10
+
+def resolve_fetch_function(config):
+    """Kaynağın stratejisine göre scraper fonksiyonunu döner; bulunamazsa None."""
+    strategy = config.get('strategy')
+    if strategy == 'html':
+        return scrapers.fetch_html_generic
+    if strategy == 'rss':
+        return scrapers.fetch_rss_generic
+    # Eski fonksiyon adlarını destekleyebilirsiniz (opsiyonel)
+    fetch_function_name = config.get('fetch_function')
+    if fetch_function_name and hasattr(scrapers, fetch_function_name):
+        return getattr(scrapers, fetch_function_name)
+    return None
+
+def call_legacy_fetch(fetch_function, config):
+    """Eski senkron fetch_function'ları kendi requests session'larıyla çalıştırır (thread içinde)."""
+    with create_session() as session:
+        return fetch_function(session, config)
+
+def text_hash(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+async def collect_new_articles(game_config, fetcher, fetch_state, backfill=0):
+    """
+    html / rss kaynağındaki yeni makaleleri eskiden yeniye döner (metinleriyle birlikte).
+
+    En yeni makale daha önce işlenmiş olsa da içeriği sonradan düzenlenmiş olabilir;
+    detay sayfası koşullu GET ile doğrulanır ve metin hash'i değiştiyse yeniden işlenir.
+    'backfill' verilirse listedeki en fazla 'backfill' makaleye bakılır ve ana sayfa
+    koşulsuz çekilir. Kaynak değişmediyse NOT_MODIFIED döner.
+    """
+    seen = fetch_state.get('seen_articles')
+    candidates = await scrapers.list_articles(
+        fetcher, game_config, fetch_state, revalidate=seen is not None and not backfill
+    )
+    if candidates == scrapers.NOT_MODIFIED:
+        return scrapers.NOT_MODIFIED
+    if not candidates:
+        return None
+    candidates = candidates[:backfill or game_config.get('max_articles', DEFAULT_MAX_ARTICLES)]
+    newest = candidates[0]
+    if seen is None:
+        # İlk çalışma (tek makaleli eski durumdan geçiş dahil): listedeki eski makaleler taban
+        # çizgisine alınır, en yenisi kayıtlı içerik hash'iyle karşılaştırılır.
+        seen = []
+        fetch_state['baseline_articles'] = [article['id'] for article in candidates[1:]]
+    fetch_state['seen_articles'] = seen
+    seen_ids = set(seen) if backfill else set(seen) | set(fetch_state.get('baseline_articles', []))
+
+    older = [article for article in candidates[1:] if article['id'] not in seen_ids]
+    revalidate_newest = newest.get('url') == fetch_state.get('detail_url')
+    texts = await asyncio.gather(
+        scrapers.fetch_article_text(fetcher, game_config, newest, fetch_state, revalidate=revalidate_newest),
+        *(scrapers.fetch_article_text(fetcher, game_config, article) for article in older),
+        return_exceptions=True,  # Tek bir ölü detay linki kaynağın tamamını düşürmesin
+    )
+
+    listing_url = game_config['url']
+    # Yalnızca ana sayfanın ve en yeni makalenin doğrulayıcıları tutulur
+    fetch_state['validators'] = {
+        url: validators for url, validators in fetch_state.get('validators', {}).items()
+        if url in (listing_url, newest.get('url'))
+    }
+    if newest.get('url') != listing_url:
+        fetch_state['detail_url'] = newest.get('url')
+
+    articles = []
+    for article, text in zip([newest] + older, texts):
+        if isinstance(text, Exception) or not text:
+            # Ana sayfa (ve en yeni makalenin) doğrulayıcısı bırakılır; makale bir sonraki
+            # çalışmada 304 ile atlanmadan yeniden denenir.
+            reason = f" ({text})" if isinstance(text, Exception) else ""
+            logging.warning(f"FETCH ⚠️: {game_config.get('game')} makalesinin metni alınamadı: {article['id']}{reason}")
+            fetch_state['validators'].pop(listing_url, None)
+            if article is newest:
+                fetch_state['validators'].pop(newest.get('url'), None)
+            continue
+        if text == scrapers.NOT_MODIFIED or (article is newest and text_hash(text) == fetch_state.get('content_hash')):
+            # En yeni makale değişmemiş (304 ya da aynı hash): işlenmiş sayılır.
+            if article['id'] not in seen_ids:
+                seen.insert(0, article['id'])
+            continue
+        articles.append(dict(article, text=text, hash=text_hash(text), latest=article is newest))
+    # Sayfadaki sıra yeniden eskiye; yayın sırası eskiden yeniye.
+    return articles[::-1]
+
+async def fetch_game_data(game_config, fetcher, source_state=None, backfill=0):
+    """
+    Kaynağın yeni makalelerini çeker ve 'source_state' (manifestteki kaynak durumunun
+    kopyası) ile karşılaştırır. (oyun, makaleler, config, durum, fetch_state) döner;
+    durum "NEW", "SKIPPED" ya da hata için None'dır. Makaleler analiz edilip
+    yayınlandıkça 'fetch_state' manifeste işlenir.
+    """
     game_name = game_config.get('game')
-    safe_name = game_config.get('safe_name')
-    
-    # --- YENİ Strateji Tabanlı Yönlendirme ---
     strategy = game_config.get('strategy')
-    fetch_function = None
-    
-    if strategy == 'html':
-        fetch_function = getattr(scrapers, 'fetch_html_generic', None)
-    elif strategy == 'rss':
-        fetch_function = getattr(scrapers, 'fetch_rss_generic', None)
-    else:
-        # Eski fonksiyon adlarını destekleyebilirsiniz (opsiyonel)
-        fetch_function_name = game_config.get('fetch_function')
-        if fetch_function_name and hasattr(scrapers, fetch_function_name):
-            fetch_function = getattr(scrapers, fetch_function_name)
-        else:
-            logging.error(f"THREAD ❌: {game_name} için 'strategy' (html/rss) tanımlanmamış ve fetch_function bulunamadı. Atlanıyor.")
-            return game_name, None, game_config, None
-    # --- Yönlendirme Sonu ---
+    fetch_function = resolve_fetch_function(game_config)
+    if fetch_function is None:
+        logging.error(f"FETCH ❌: {game_name} için 'strategy' (html/rss) tanımlanmamış ve fetch_function bulunamadı. Atlanıyor.")
+        return game_name, None, game_config, None, None
 
     try:
-        logging.info(f"THREAD 🔍: {game_name} için veri çekiliyor (Strateji: {strategy})...")
+        logging.info(f"FETCH 🔍: {game_name} için veri çekiliyor (Strateji: {strategy})...")
         
-        # Genel fonksiyona 'session' ve tüm 'config' objesini gönderiyoruz
-        raw_data = fetch_function(session, game_config) 
-        
-        if not raw_data:
-            logging.warning(f"THREAD ⚠️: {game_name} için veri bulunamadı.")
-            return game_name, None, game_config, None
-            
-        new_hash = hashlib.sha256(raw_data.encode('utf-8')).hexdigest()
-        old_hash = get_hash_from_s3(safe_name)
+        # Generic stratejiler koşullu istek yapar; doğrulayıcılar 'fetch_state' içinde güncellenir
+        fetch_state = source_state if source_state is not None else {}
+        if strategy in ('html', 'rss'):
+            articles = await collect_new_articles(game_config, fetcher, fetch_state, backfill)
+        else:
+            raw_data = await asyncio.to_thread(call_legacy_fetch, fetch_function, game_config)
+            articles = None
+            if raw_data:
+                new_hash = text_hash(raw_data)
+                articles = [] if new_hash == fetch_state.get('content_hash') else [
+                    {"id": scrapers.content_id(raw_data), "text": raw_data, "hash": new_hash, "latest": True}
+                ]
         
-        if new_hash == old_hash:
-            logging.info(f"THREAD ⏩: {game_name} verisi değişmemiş. Gemini analizi atlanıyor.")
-            return game_name, raw_data, game_config, "SKIPPED"
+        if articles == scrapers.NOT_MODIFIED:
+            logging.info(f"FETCH ⏩: {game_name} kaynağı değişmemiş (HTTP 304). Gemini analizi atlanıyor.")
+            return game_name, None, game_config, "SKIPPED", fetch_state
+
+        if articles is None:
+            logging.warning(f"FETCH ⚠️: {game_name} için veri bulunamadı.")
+            return game_name, None, game_config, None, None
+
+        if not articles:
+            logging.info(f"FETCH ⏩: {game_name} için yeni makale yok. Gemini analizi atlanıyor.")
+            return game_name, None, game_config, "SKIPPED", fetch_state
             
-        # Değişiklik var, yeni hash ile devam et
-        return game_name, raw_data, game_config, new_hash
+        # Yeni makaleler var. Durum ancak analiz başarılı olursa (makale makale) manifeste işlenir.
+        logging.info(f"FETCH 🆕: {game_name} için {len(articles)} yeni makale bulundu.")
+        return game_name, articles, game_config, "NEW", fetch_state
         
     except Exception as e:
-        logging.error(f"THREAD ❌: {game_name} veri çekme hatası (Strateji: {strategy}): {e}", exc_info=True)
-        return game_name, None, game_config, None
+        logging.error(f"FETCH ❌: {game_name} veri çekme hatası (Strateji: {strategy}): {e}", exc_info=True)
+        return game_name, None, game_config, None, None
+
+async def fetch_all_sources(games_config, scrape_state, backfill=0):
+    """Tüm kaynakları tek event loop'ta, host sınırları ve ortak son tarihle çeker.
+
+    Backfill'de çok sayıda detay sayfası çekildiği için son tarih uygulanmaz.
+    """
+    async with AsyncFetcher() as fetcher:
+        results = await run_with_deadline([
+            fetch_game_data(config, fetcher, scrape_state.source(config.get('safe_name')), backfill)
+            for config in games_config
+        ], None if backfill else FETCH_DEADLINE)
+
+    fetched_data = []
+    for config, result in zip(games_config, results):
+        if isinstance(result, BaseException):
+            logging.error(f"FETCH ❌: {config.get('game')} çekilemedi: {result}")
+            result = (config.get('game'), None, config, None, None)
+        fetched_data.append(result)
+    return fetched_data
+
+# --- Sağlık Kontrolü (GÜNCELLENDİ: tüm kaynaklar eşzamanlı) ---
+async def probe_source(config, fetcher):
+    fetch_function = resolve_fetch_function(config)
+    if asyncio.iscoroutinefunction(fetch_function):
+        return await fetch_function(fetcher, config)
+    return await asyncio.to_thread(call_legacy_fetch, fetch_function, config)
+
+async def probe_sources(games_config):
+    async with AsyncFetcher() as fetcher:
+        return await run_with_deadline([probe_source(config, fetcher) for config in games_config], FETCH_DEADLINE)
 
-# --- Sağlık Kontrolü (GÜNCELLENDİ) ---
 def run_health_check():
     logging.info("🩺 Proaktif Sağlık Kontrolü başlıyor...")
     try:
@@ -297,102 +508,210 @@ def run_health_check():
         send_alert("CRITICAL (Health Check): `sources.yaml` dosyası bulunamadı!")
         return
         
-    broken_scrapers = []
-    session = create_session()
-    
+    probeable = []
     for config in games_config:
+        if resolve_fetch_function(config) is None:
+            logging.warning(f"HEALTH ⚠️: {config.get('game')} için 'strategy' yok ve fetch_function tanımlı değil. Atlanıyor.")
+        else:
+            probeable.append(config)
+
+    broken_scrapers = []
+    for config, data in zip(probeable, asyncio.run(probe_sources(probeable))):
         game_name = config.get('game')
         strategy = config.get('strategy')
-        fetch_function = None
-        
-        if strategy == 'html':
-            fetch_function = getattr(scrapers, 'fetch_html_generic', None)
-        elif strategy == 'rss':
-            fetch_function = getattr(scrapers, 'fetch_rss_generic', None)
-        else:
-            # Fallback: eski fetch_function adı
-            fetch_function_name = config.get('fetch_function')
-            if fetch_function_name and hasattr(scrapers, fetch_function_name):
-                fetch_function = getattr(scrapers, fetch_function_name)
-            else:
-                logging.warning(f"HEALTH ⚠️: {game_name} için 'strategy' yok ve fetch_function tanımlı değil. Atlanıyor.")
-                continue
-            
-        try:
-            # Genel fonksiyona 'session' ve 'config' gönder
-            data = fetch_function(session, config)
-            if data is None:
-                broken_scrapers.append(f"{game_name} (Strateji: {strategy} - Veri 'None' döndü)")
-        except Exception as e:
-            logging.error(f"HEALTH ❌: {game_name} (Strateji: {strategy}) scraper'ı çöktü: {e}")
+        if isinstance(data, asyncio.TimeoutError):
+            broken_scrapers.append(f"{game_name} (Strateji: {strategy} - {FETCH_DEADLINE:.0f} sn içinde yanıt yok)")
+        elif isinstance(data, Exception):
+            logging.error(f"HEALTH ❌: {game_name} (Strateji: {strategy}) scraper'ı çöktü: {data}")
             broken_scrapers.append(f"{game_name} (Strateji: {strategy} - Çöktü)")
-            
-    session.close()
+        elif data is None:
+            broken_scrapers.append(f"{game_name} (Strateji: {strategy} - Veri 'None' döndü)")
     
     if broken_scrapers:
         send_alert("❌ PROAKTİF UYARI: Şu scraper'lar bozulmuş olabilir:\n- " + "\n- ".join(broken_scrapers))
     else:
         logging.info("✅ Sağlık Kontrolü tamamlandı. Tüm (generic) scraper'lar çalışıyor.")
 
-# --- Ana Scraper ---
-def run_scrape():
-    logging.info("🚀 Tam Kapsamlı Yama Analizi başlıyor...")
-    try:
-        with open("sources.yaml", "r", encoding="utf-8") as f:
-            games_config = yaml.safe_load(f)
-        session = create_session()
-        fetched_data = []
-        with concurrent.futures.ThreadPoolExecutor(max_workers=len(games_config)) as executor:
-            futures = [executor.submit(fetch_game_data, config, session) for config in games_config]
-            for future in concurrent.futures.as_completed(futures):
-                fetched_data.append(future.result())
-        session.close()
-
-        for i, (game_name, raw_data, config, hash_or_flag) in enumerate(fetched_data):
-            if hash_or_flag == "SKIPPED":
-                continue
-            safe_name = config.get('safe_name')
-            if not raw_data:
-                raw_data = f"{game_name} received balance changes and new content."
-                logging.warning(f"⚠️  {game_name} için veri yok. Fallback metin kullanılıyor.")
-            else:
-                logging.info(f"ANALİZ 🧠: {game_name} verisi işleniyor (Hash: {str(hash_or_flag)[:7]}...).")
+# --- Analiz Aşaması (YENİ: eşzamanlı, hız sınırlı) ---
+def chunk_size_for(config):
+    """'analysis: chunked' kaynakları için parça boyutu; diğer kaynaklar tek parça analiz edilir (None)."""
+    if not scrapers.is_chunked(config):
+        return None
+    return config.get('chunk_size', DEFAULT_CHUNK_SIZE)
 
-            result = analyze_with_gemini(raw_data, game_name, send_alert)
-            if result:
-                changes = result.get("changes", [])
-                score = calculate_impact_score(changes)
-                label = get_impact_label(score)
-                result["impact_score"] = score
-                result["impact_label"] = label
+def analyze_article(game_name, safe_name, article, analysis_cache=None, chunk_size=None):
+    """Tek bir makaleyi analiz eder ve etki skoruyla birlikte sonucu döner; başarısızsa None.
 
-                save_json_to_s3_and_archive(result, safe_name)
+    'chunk_size' verilirse ('analysis: chunked' kaynakları) metin parçalara bölünerek analiz edilir.
+    """
+    logging.info(f"ANALİZ 🧠: {game_name} makalesi işleniyor ({article['id']}, Hash: {article['hash'][:7]}...).")
 
-                if hash_or_flag not in [None, "SKIPPED"]:
-                    save_hash_to_s3(safe_name, hash_or_flag)
+    # Hız sınırı ve kota yeniden denemeleri analyze_with_gemini içinde yönetilir
+    with metrics.stage_timer("gemini", safe_name):
+        if chunk_size:
+            result = analyze_chunked(article['text'], game_name, send_alert, cache=analysis_cache, chunk_size=chunk_size)
+        else:
+            result = analyze_with_gemini(article['text'], game_name, send_alert, cache=analysis_cache)
+    if not result:
+        metrics.SCRAPE_STAGE_FAILURES.labels("gemini", safe_name).inc()
+        logging.error(f"❌ {game_name} analizi başarısız ({article['id']}).")
+        return None
 
-                formatted_message = format_patch_notes_for_telegram(result)
-                send_telegram_message(formatted_message, parse_mode="HTML")
-            else:
-                logging.error(f"❌ {game_name} analizi başarısız.")
+    changes = result.get("changes", [])
+    score = calculate_impact_score(changes)
+    result["impact_score"] = score
+    result["impact_label"] = get_impact_label(score)
+    return result
+
+def archive_timestamp(article, fetch_state, previous, backfill=0):
+    """Arşiv zaman damgası: normalde şimdiki zaman, backfill'de (varsa) makalenin yayın tarihi.
 
-            if i < len(fetched_data) - 1:
-                delay = random.uniform(5, 12)
-                logging.info(f"⏳ Bekleniyor ({delay:.1f}s)...")
-                time.sleep(delay)
+    Arşiv anahtarları saniye çözünürlüklüdür; çakışmasın diye şimdiki zaman kaynağın son
+    arşivinden, her damga da bu çalışmadaki bir öncekinden en az bir saniye sonraya kaydırılır.
+    """
+    if backfill and article.get('published'):
+        timestamp = datetime.fromisoformat(article['published'])
+    else:
+        timestamp = datetime.utcnow().replace(microsecond=0)
+        if fetch_state.get('last_archived'):
+            timestamp = max(timestamp, datetime.fromisoformat(fetch_state['last_archived']) + timedelta(seconds=1))
+    if previous is not None and timestamp <= previous:
+        timestamp = previous + timedelta(seconds=1)
+    if timestamp.isoformat() > fetch_state.get('last_archived', ""):
+        fetch_state['last_archived'] = timestamp.isoformat()
+    return timestamp
+
+def publish_articles(item, futures, scrape_state, backfill=0):
+    """
+    Kaynağın analiz sonuçlarını eskiden yeniye sırayla yayınlar ve her makaleyi manifestte
+    işlenmiş olarak işaretler. Bir makale başarısız olursa sıra bozulmasın diye sonrakiler
+    bir sonraki çalışmaya bırakılır.
+    """
+    game_name, articles, config, _, fetch_state = item
+    safe_name = config.get('safe_name')
+    previous = None
+    for published, (article, future) in enumerate(zip(articles, futures)):
+        try:
+            result = future.result()
+        except Exception as e:
+            logging.error(f"❌ {game_name} analiz aşamasında hata: {e}", exc_info=True)
+            send_alert(f"❌ {game_name} analiz aşamasında hata: {e}")
+            result = None
+        if not result:
+            logging.warning(f"⏸️ {game_name}: {len(articles) - published} makale bir sonraki çalışmaya bırakıldı.")
+            if published:
+                # Ana sayfa ya da en yeni makale 304 dönüp kalan makaleler kaybolmasın diye
+                # doğrulayıcılar saklanmaz.
+                fetch_state['validators'] = {}
+                scrape_state.commit(safe_name, fetch_state)
+            return published
+
+        previous = archive_timestamp(article, fetch_state, previous, backfill)
+        # Yalnızca kaynaktaki en yeni makale _latest.json'ı günceller; daha önce atlanıp sonradan
+        # yayınlanan eski bir makale güncel yamanın yerine geçmez.
+        with metrics.stage_timer("s3", safe_name):
+            save_json_to_s3_and_archive(result, safe_name, timestamp=previous, update_latest=article['latest'])
+
+        seen = [article['id']] + [i for i in fetch_state.get('seen_articles', []) if i != article['id']]
+        fetch_state['seen_articles'] = seen[:max(SEEN_ARTICLES_LIMIT, backfill)]
+        if article['latest']:
+            fetch_state['content_hash'] = article['hash']
+        scrape_state.commit(safe_name, fetch_state)
+
+        if not backfill:
+            send_telegram_message(format_patch_notes_for_telegram(result), parse_mode="HTML")
+    return len(articles)
+
+# --- Ana Scraper ---
+def run_scrape(backfill=0, only_games=None):
+    """
+    Kaynakları çeker, yeni makaleleri analiz edip yayınlar. 'backfill' > 0 ise her
+    kaynaktaki en fazla 'backfill' geçmiş makale işlenir (bildirim gönderilmez);
+    'only_games' verilirse yalnızca o safe_name'ler çalışır.
+    """
+    mode = f"Backfill (kaynak başına {backfill} makale)" if backfill else "Tam Kapsamlı Yama Analizi"
+    logging.info(f"🚀 {mode} başlıyor...")
+    run_started = time.time()
+    metrics.SCRAPE_LAST_RUN_SUCCESS.set(0)
+    try:
+        with open("sources.yaml", "r", encoding="utf-8") as f:
+            games_config = yaml.safe_load(f)
+        if only_games:
+            games_config = [config for config in games_config if config.get('safe_name') in only_games]
+        # Tüm kaynakların durumu tek manifestten bir kez okunur
+        from scrape_state import ScrapeState
+        scrape_state = ScrapeState(get_s3_client(), S3_BUCKET_NAME)
+        scrape_state.load([config.get('safe_name') for config in games_config])
+
+        fetched_data = asyncio.run(fetch_all_sources(games_config, scrape_state, backfill))
+
+        # Değişmeyen (304 / yeni makale yok) kaynakların yeni doğrulayıcıları hemen manifeste işlenir
+        for game_name, _, config, status, fetch_state in fetched_data:
+            if status == "SKIPPED":
+                scrape_state.commit(config.get('safe_name'), fetch_state)
+            outcome = {"SKIPPED": "unchanged", None: "failed"}.get(status, "changed")
+            metrics.SCRAPE_SOURCES.labels(outcome).inc()
+
+        analysis_cache = create_analysis_cache()
+        to_analyze = [item for item in fetched_data if item[3] == "NEW"]
+        total = sum(len(item[1]) for item in to_analyze)
+        logging.info(f"ANALİZ 🧠: {len(to_analyze)} oyundan {total} makale analiz edilecek (en fazla {GEMINI_MAX_CONCURRENCY} eşzamanlı).")
+        # Analizler tüm kaynaklar için eşzamanlı yürür; yayın her kaynakta eskiden yeniye sıralıdır.
+        published = 0
+        with concurrent.futures.ThreadPoolExecutor(max_workers=GEMINI_MAX_CONCURRENCY) as executor:
+            jobs = [
+                (item, [executor.submit(analyze_article, item[0], item[2].get('safe_name'), article,
+                                        analysis_cache, chunk_size_for(item[2]))
+                        for article in item[1]])
+                for item in to_analyze
+            ]
+            for item, futures in jobs:
+                published += publish_articles(item, futures, scrape_state, backfill)
+        logging.info(f"✅ {published}/{total} makale yayınlandı.")
+
+        try:
+            scrape_state.save()
+        except Exception as e:
+            logging.error(f"❌ Scrape durum manifesti yazma hatası: {e}")
+            send_alert(f"❌ Scrape durum manifesti yazma hatası: {e}")
+
+        if analysis_cache is not None:
+            stats = analysis_cache.stats()
+            logging.info(f"♻️ Gemini cache: {stats['hits']} isabet, {stats['misses']} ıska.")
+            metrics.SCRAPE_GEMINI_CACHE.labels("hit").set(stats['hits'])
+            metrics.SCRAPE_GEMINI_CACHE.labels("miss").set(stats['misses'])
+            try:
+                analysis_cache.prune()
+            except Exception as e:
+                logging.warning(f"Gemini cache temizleme hatası: {e}")
 
         logging.info("✅ Tüm oyunların yama analizi tamamlandı.")
+        metrics.SCRAPE_LAST_RUN_SUCCESS.set(1)
     except Exception as e:
         logging.error(f"CRITICAL: Cron Job'da hata: {e}", exc_info=True)
         send_alert(f"CRITICAL: Cron Job çöktü: {e}")
+    finally:
+        metrics.SCRAPE_LAST_RUN_DURATION.set(time.time() - run_started)
+        metrics.SCRAPE_LAST_RUN_TIMESTAMP.set_to_current_time()
+        metrics.export_scrape_metrics()
 
 # --- Giriş Noktası ---
 if __name__ == "__main__":
     args = dict(arg.split('=') for arg in sys.argv[1:] if '=' in arg)
     run_mode = args.get('--run', 'scrape')
-    if run_mode == 'health':
-        run_health_check()
-    elif run_mode == 'scrape':
-        run_scrape()
-    else:
-        logging.error(f"Geçersiz çalışma modu: {run_mode}. '--run=scrape' veya '--run=health' kullanın.")
+    start_notifications(run_mode)
+    try:
+        if run_mode == 'health':
+            run_health_check()
+        elif run_mode == 'scrape':
+            run_scrape()
+        elif run_mode == 'backfill':
+            # python scrape.py --run=backfill --limit=20 --games=valorant,roblox
+            games = args.get('--games')
+            run_scrape(backfill=int(args.get('--limit', BACKFILL_DEFAULT_LIMIT)),
+                       only_games=games.split(',') if games else None)
+        else:
+            logging.error(f"Geçersiz çalışma modu: {run_mode}. '--run=scrape', '--run=backfill' veya '--run=health' kullanın.")
+    finally:
+        # Kuyruktaki bildirimler ve uyarı özeti gönderilir; gönderilemeyenler outbox'ta kalır.
+        notifications.close()
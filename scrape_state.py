@@ -0,0 +1,108 @@
+# scrape_state.py (YENİ - Tek scrape durum manifesti)
+#
+# Tüm kaynakların scraper durumu tek bir S3 nesnesinde tutulur:
+#   _state/scrape_state.json
+#   {"version": 1, "updated_at": ..., "sources": {
+#       "<safe_name>": {"content_hash": ..., "detail_url": ..., "validators": {url: {...}},
+#                       "seen_articles": [...], "baseline_articles": [...], "last_archived": ...,
+#                       "last_success": ...}}}
+# Manifest çalışma başında bir kez okunur, bellekte güncellenir ve sonunda
+# ETag koşullu yazma ile bir kez yazılır.
+
+import copy
+import json
+import logging
+import threading
+from datetime import datetime
+
+from botocore.exceptions import ClientError
+
+STATE_KEY = "_state/scrape_state.json"
+STATE_FORMAT_VERSION = 1
+MAX_WRITE_ATTEMPTS = 3
+
+
+def _error_code(error: ClientError) -> str:
+    return error.response.get("Error", {}).get("Code", "")
+
+
+class ScrapeState:
+    def __init__(self, s3_client, bucket):
+        self.s3_client = s3_client
+        self.bucket = bucket
+        self.data = {"version": STATE_FORMAT_VERSION, "sources": {}}
+        self.etag = None
+        self.changed = {}  # Bu çalışmada güncellenen kaynaklar
+        self.lock = threading.Lock()
+
+    def _read(self):
+        response = self.s3_client.get_object(Bucket=self.bucket, Key=STATE_KEY)
+        return json.loads(response["Body"].read()), response["ETag"]
+
+    def load(self, safe_names):
+        """Manifesti okur. Henüz yoksa eski kaynak başına hash / fetch nesnelerinden bir kez oluşturur."""
+        try:
+            self.data, self.etag = self._read()
+            return
+        except ClientError as e:
+            if _error_code(e) not in ("404", "NoSuchKey"):
+                raise
+
+        logging.info("STATE: Manifest bulunamadı, eski kaynak başına durum nesneleri taşınıyor...")
+        for safe_name in safe_names:
+            source = self._read_legacy_source(safe_name)
+            if source:
+                self.data["sources"][safe_name] = source
+
+    def _read_legacy_source(self, safe_name):
+        source = {}
+        try:
+            response = self.s3_client.get_object(Bucket=self.bucket, Key=f"{safe_name}_latest.hash")
+            source["content_hash"] = response["Body"].read().decode("utf-8")
+        except ClientError:
+            pass
+        try:
+            response = self.s3_client.get_object(Bucket=self.bucket, Key=f"{safe_name}_latest.fetch.json")
+            source.update(json.loads(response["Body"].read()))
+        except ClientError:
+            pass
+        return source
+
+    def source(self, safe_name):
+        """Kaynağın durumunun bağımsız bir kopyasını döner (scraper'lar bunu yerinde günceller)."""
+        with self.lock:
+            return copy.deepcopy(self.data["sources"].get(safe_name, {}))
+
+    def commit(self, safe_name, source_state):
+        """Başarıyla işlenen kaynağın durumunu manifeste işler."""
+        source_state = dict(source_state or {})
+        source_state["last_success"] = datetime.utcnow().isoformat()
+        with self.lock:
+            self.data["sources"][safe_name] = source_state
+            self.changed[safe_name] = source_state
+
+    def save(self):
+        """Manifesti koşullu yazar. Başka bir çalışma araya girdiyse güncel manifest okunur,
+        bu çalışmada değişen kaynaklar üzerine işlenir ve tekrar denenir."""
+        if not self.changed:
+            return
+        for _ in range(MAX_WRITE_ATTEMPTS):
+            self.data["version"] = STATE_FORMAT_VERSION
+            self.data["updated_at"] = datetime.utcnow().isoformat()
+            condition = {"IfMatch": self.etag} if self.etag else {"IfNoneMatch": "*"}
+            try:
+                response = self.s3_client.put_object(
+                    Bucket=self.bucket, Key=STATE_KEY,
+                    Body=json.dumps(self.data, indent=2, ensure_ascii=False).encode("utf-8"),
+                    ContentType="application/json", **condition,
+                )
+                self.etag = response.get("ETag")
+                logging.info(f"✅ STATE: Manifest kaydedildi ({len(self.changed)} kaynak güncellendi).")
+                return
+            except ClientError as e:
+                if _error_code(e) not in ("PreconditionFailed", "412", "ConditionalRequestConflict", "409"):
+                    raise
+            logging.warning("STATE: Manifest başka bir çalışma tarafından değiştirilmiş, birleştiriliyor...")
+            self.data, self.etag = self._read()
+            self.data.setdefault("sources", {}).update(self.changed)
+        raise RuntimeError(f"Scrape durum manifesti yazılamadı: {STATE_KEY}")
@@ -1,99 +1,313 @@
 # scrapers.py (YENİ - Modüler)
 
+import os
+import asyncio
+import hashlib
 import logging
-from bs4 import BeautifulSoup
-from urllib.parse import urljoin # Göreceli URL'leri birleştirmek için
+from datetime import timezone
+from email.utils import parsedate_to_datetime
+from functools import lru_cache
+import lxml.html
+from lxml import etree
+from lxml.cssselect import CSSSelector
+from urllib.parse import urljoin, urldefrag # Göreceli URL'leri birleştirmek için
+from metrics import stage_timer
+from chunking import SECTION_MARK
 
-def fetch_html_generic(session, config):
+# --- HTML Ayrıştırma Motoru ---
+# "lxml" (varsayılan): C tabanlı lxml ağacı + derlenmiş CSS seçiciler, doğrudan bayt üzerinde.
+# "bs4": eski BeautifulSoup(html.parser) yolu (karşılaştırma / geri dönüş için).
+# RSS akışları da aynı ayarla lxml.etree (ya da eski BeautifulSoup lxml-xml) ile bayt üzerinden okunur.
+HTML_ENGINE = os.getenv("HTML_PARSER_ENGINE", "lxml")
+# bs4'ün get_text()'inde olduğu gibi bu etiketlerin içeriği metne dahil edilmez
+NON_TEXT_TAGS = ("script", "style", "noscript", "template")
+HEADING_TAGS = ("h1", "h2", "h3", "h4")
+# 'analysis: chunked' kaynaklarında text_limit yerine uygulanan varsayılan üst sınır
+CHUNKED_MAX_TEXT = 60000
+
+@lru_cache(maxsize=64)
+def _compile_selector(selector):
+    return CSSSelector(selector)
+
+def declared_encoding(res):
+    """Yalnızca sunucu charset bildirdiyse onu döner; aksi halde lxml <meta> etiketinden bulur."""
+    return res.encoding if 'charset=' in res.headers.get('Content-Type', '').lower() else None
+
+def parse_html(content, encoding=None, engine=None):
+    """Ham HTML baytlarını seçilen motorla ayrıştırır."""
+    if (engine or HTML_ENGINE) == "bs4":
+        from bs4 import BeautifulSoup  # yalnızca eski motor seçilirse yüklenir
+        return BeautifulSoup(content, 'html.parser', from_encoding=encoding)
+    parser = lxml.html.HTMLParser(encoding=encoding, remove_comments=True, remove_pis=True)
+    document = lxml.html.document_fromstring(content, parser=parser)
+    etree.strip_elements(document, *NON_TEXT_TAGS, with_tail=False)
+    return document
+
+def select_one(document, selector):
+    """Belge sırasına göre seçiciyle eşleşen ilk elemanı döner (yoksa None)."""
+    if not isinstance(document, etree._Element):  # bs4 belgesi
+        return document.select_one(selector)
+    matches = _compile_selector(selector)(document)
+    return matches[0] if matches else None
+
+def select_all(document, selector):
+    """Seçiciyle eşleşen elemanları belge sırasıyla döner; başka bir eşleşmenin içindekiler atlanır."""
+    if not isinstance(document, etree._Element):  # bs4 belgesi
+        matches = document.select(selector)
+        matched = {id(element) for element in matches}
+        return [element for element in matches if not any(id(parent) in matched for parent in element.parents)]
+    matches = _compile_selector(selector)(document)
+    matched = set(matches)
+    return [element for element in matches if not any(parent in matched for parent in element.iterancestors())]
+
+def parse_feed(content, engine=None):
+    """RSS/XML baytlarını ayrıştırır; kodlama XML bildiriminden okunur. Bozuk akışlar da (recover) okunur,
+    hiç okunamayan (örn. boş) yanıtta None döner."""
+    if (engine or HTML_ENGINE) == "bs4":
+        from bs4 import BeautifulSoup  # yalnızca eski motor seçilirse yüklenir
+        return BeautifulSoup(content, "lxml-xml")
+    parser = etree.XMLParser(recover=True, remove_comments=True, remove_pis=True,
+                             resolve_entities=False, no_network=True)
+    try:
+        return etree.fromstring(content, parser=parser)
+    except etree.XMLSyntaxError:
+        return None
+
+def feed_find_all(node, tag):
+    """`tag` adlı (öneksiz, varsayılan ad alanındaki) tüm alt elemanlar; bs4'ün find_all(tag) davranışı."""
+    if node is None:
+        return []
+    if not isinstance(node, etree._Element):  # bs4 belgesi
+        return node.find_all(tag)
+    return [element for element in node.iter("{*}" + tag) if element.prefix is None and element is not node]
+
+def feed_find(node, tag):
+    matches = feed_find_all(node, tag)
+    return matches[0] if matches else None
+
+def feed_text(element):
+    """Elemanın metni; parçalar kırpılıp boşluksuz birleştirilir (bs4 get_text(strip=True) ile aynı)."""
+    if not isinstance(element, etree._Element):
+        return element.get_text(strip=True)
+    return "".join(text.strip() for text in element.itertext())
+
+def mark_headings(element):
+    """Başlıkları (h1-h4) tek satıra indirip SECTION_MARK ile işaretler (parçalı analiz bölüm sınırları için)."""
+    if isinstance(element, etree._Element):
+        for heading in element.iter(*HEADING_TAGS):
+            title = " ".join(text.strip() for text in heading.itertext() if text.strip())
+            tail = heading.tail
+            heading.clear()
+            heading.text, heading.tail = SECTION_MARK + title, tail
+    else:
+        for heading in element.find_all(HEADING_TAGS):
+            heading.string = SECTION_MARK + heading.get_text(" ", strip=True)
+
+def element_text(element, sections=False):
+    """Elemanın metnini satır satır, boşlukları kırpılmış olarak döner ('sections' ile başlıklar işaretlenir)."""
+    if sections:
+        mark_headings(element)
+    if isinstance(element, etree._Element):
+        return "\n".join(text.strip() for text in element.itertext() if text.strip())
+    return element.get_text(separator="\n", strip=True)
+
+def is_chunked(config):
+    return config.get('analysis') == 'chunked'
+
+def text_limit(config, default):
+    """AI'a gönderilecek metnin üst sınırı. Parçalı analizde metin kırpılmak yerine bölünür;
+    yalnızca aşırı uzun sayfalara karşı 'max_text' uygulanır."""
+    if is_chunked(config):
+        return config.get('max_text', CHUNKED_MAX_TEXT)
+    return config.get('text_limit', default)
+
+# Kaynak bir önceki çalışmadan beri değişmediğinde (HTTP 304) döndürülür.
+NOT_MODIFIED = "__NOT_MODIFIED__"
+
+async def conditional_get(fetcher, url, state=None, revalidate=True):
     """
-    sources.yaml'dan gelen 'html' stratejisine göre veri çeker.
-    
-    İki modu destekler:
-    1. 'link' seçicisi varsa (List-Detail): Ana sayfadan linki bulur, o linke gider, içeriği çeker.
-    2. 'link' seçicisi yoksa (Direct): Ana sayfadan doğrudan içeriği çeker.
+    'state' içinde kayıtlı ETag / Last-Modified doğrulayıcılarıyla koşullu GET yapar.
+    İstek 'fetcher' (fetch_engine.AsyncFetcher) üzerinden, host sınırlarına uyularak gider.
+
+    Sunucu 304 dönerse None döner. Aksi halde yanıtı döner ve yeni doğrulayıcıları
+    'state["validators"]' içine yazar. 'revalidate' False ise doğrulayıcılar
+    gönderilmez (yalnızca kaydedilir); 'state' None ise normal bir GET yapılır.
     """
+    headers = {}
+    if state is not None and revalidate:
+        validators = state.get('validators', {}).get(url, {})
+        if validators.get('etag'):
+            headers['If-None-Match'] = validators['etag']
+        if validators.get('last_modified'):
+            headers['If-Modified-Since'] = validators['last_modified']
+
+    res = await fetcher.get(url, headers=headers)
+    if res.status_code == 304:
+        return None
+    res.raise_for_status() # Hatalı yanıt (4xx, 5xx) varsa exception fırlat
+
+    if state is not None:
+        validators = {}
+        if res.headers.get('ETag'):
+            validators['etag'] = res.headers['ETag']
+        if res.headers.get('Last-Modified'):
+            validators['last_modified'] = res.headers['Last-Modified']
+        state.setdefault('validators', {})[url] = validators
+    return res
+
+def content_id(text):
+    """Linki ya da GUID'i olmayan makaleler için metinden türetilen kimlik."""
+    return "sha256:" + hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def _published_at(element):
+    """RSS <pubDate> değerini UTC ISO 8601'e çevirir; yoksa ya da okunamazsa None."""
+    if element is None:
+        return None
+    try:
+        moment = parsedate_to_datetime(feed_text(element))
+    except (TypeError, ValueError):
+        return None
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return moment.isoformat()
+
+# --- Çoklu makale ---
+# list_articles, kaynaktaki aday makaleleri sayfadaki sırayla (yeniden eskiye) döner:
+#   {"id": ..., "url": ..., ["text": ..., "published": ...]}
+# html List-Detail modunda kimlik detay linkidir ve metin fetch_article_text ile ayrıca
+# çekilir; Direct modda ve RSS'te metin listeyle birlikte gelir. Kaynak bir önceki
+# çalışmadan beri değişmediyse (HTTP 304) NOT_MODIFIED döner. Hatalar çağırana fırlatılır.
+
+async def list_html_articles(fetcher, config, state=None, revalidate=True):
     url = config['url']
     selectors = config['selectors']
     base_url = config.get('base_url', url) # base_url yoksa, ana url'i kullan
-    text_limit = config.get('text_limit', 3500)
-    
-    try:
-        res = session.get(url, timeout=15)
-        res.raise_for_status() # Hatalı yanıt (4xx, 5xx) varsa exception fırlat
-        soup = BeautifulSoup(res.text, 'html.parser')
-        
-        content_text = None
-        
-        # Mod 1: List-Detail (örn: Valorant, Minecraft, LoL, Fortnite)
-        if 'link' in selectors and selectors['link']:
-            link_element = soup.select_one(selectors['link'])
-            
-            if link_element and link_element.get('href'):
-                # Göreceli linkleri (örn: "/en-us/news/...") tam URL'ye çevir
-                detail_url = urljoin(base_url, link_element['href'])
-                
-                logging.info(f"  -> Detay sayfasına gidiliyor: {detail_url}")
-                detail_res = session.get(detail_url, timeout=15)
-                detail_res.raise_for_status()
-                detail_soup = BeautifulSoup(detail_res.text, 'html.parser')
-                
-                content_element = detail_soup.select_one(selectors['content'])
-                if content_element:
-                    content_text = content_element.get_text(separator="\n", strip=True)
-                else:
-                    logging.warning(f"({config['game']}) Detay sayfasında 'content' seçicisi bulunamadı: {selectors['content']}")
-            else:
-                 logging.warning(f"({config['game']}) Ana sayfada 'link' seçicisi bulunamadı: {selectors['link']}")
-
-        # Mod 2: Direct (örn: Counter-Strike 2)
-        else:
-            content_element = soup.select_one(selectors['content'])
-            if content_element:
-                content_text = content_element.get_text(separator="\n", strip=True)
-            else:
-                logging.warning(f"({config['game']}) Ana sayfada 'content' seçicisi bulunamadı: {selectors['content']}")
-
-        if content_text:
-            return content_text[:text_limit] # Metni AI'a göndermeden önce kırp
-            
-        logging.warning(f"({config['game']}) İçin {url} adresinden veri çekilemedi.")
-        return None
+    limit = text_limit(config, 3500)
+    source = config.get('safe_name', config['game'])
 
-    except Exception as e:
-        logging.warning(f"({config['game']}) scraping hatası (generic_html): {e}")
-        return None
+    with stage_timer("fetch", source):
+        res = await conditional_get(fetcher, url, state, revalidate=revalidate)
+    if res is None:
+        logging.info(f"({config['game']}) Ana sayfa değişmemiş (304), ayrıştırma atlanıyor.")
+        return NOT_MODIFIED
+    # Ayrıştırma CPU işidir; diğer kaynakların istekleri beklemesin diye thread'de yapılır.
+    with stage_timer("parse", source):
+        document = await asyncio.to_thread(parse_html, res.content, declared_encoding(res))
 
-def fetch_rss_generic(session, config):
-    """
-    sources.yaml'dan gelen 'rss' stratejisine göre veri çeker.
-    (Örn: Roblox)
-    """
+    articles = []
+    # Mod 1: List-Detail (örn: Valorant, Minecraft, LoL, Fortnite)
+    if selectors.get('link'):
+        for link_element in select_all(document, selectors['link']):
+            if not link_element.get('href'):
+                continue
+            # Göreceli linkleri (örn: "/en-us/news/...") tam URL'ye çevir
+            detail_url = urldefrag(urljoin(base_url, link_element.get('href')))[0]
+            if all(article['id'] != detail_url for article in articles):
+                articles.append({"id": detail_url, "url": detail_url})
+        if not articles:
+            logging.warning(f"({config['game']}) Ana sayfada 'link' seçicisi bulunamadı: {selectors['link']}")
+
+    # Mod 2: Direct (örn: Counter-Strike 2) - her 'content' eşleşmesi ayrı bir makaledir
+    else:
+        for content_element in select_all(document, selectors['content']):
+            text = element_text(content_element, sections=is_chunked(config))[:limit]
+            if text:
+                articles.append({"id": content_id(text), "url": url, "text": text})
+        if not articles:
+            logging.warning(f"({config['game']}) Ana sayfada 'content' seçicisi bulunamadı: {selectors['content']}")
+    return articles
+
+async def list_rss_articles(fetcher, config, state=None, revalidate=True):
     url = config['url']
     selectors = config['selectors']
-    text_limit = config.get('text_limit', 1000)
-    
-    try:
-        res = session.get(url, timeout=15)
-        res.raise_for_status()
-        soup = BeautifulSoup(res.text, "lxml-xml") # RSS/XML için lxml parser
-        
-        item = soup.find("item") # Genellikle ilk 'item' en yenisidir
-        if not item:
-            logging.warning(f"({config['game']}) RSS akışında <item> bulunamadı: {url}")
-            return None
-            
+    limit = text_limit(config, 1000)
+    source = config.get('safe_name', config['game'])
+
+    with stage_timer("fetch", source):
+        res = await conditional_get(fetcher, url, state, revalidate=revalidate)
+    if res is None:
+        logging.info(f"({config['game']}) RSS akışı değişmemiş (304), ayrıştırma atlanıyor.")
+        return NOT_MODIFIED
+    with stage_timer("parse", source):
+        document = await asyncio.to_thread(parse_feed, res.content)
+
+    items = feed_find_all(document, "item")
+    if not items:
+        logging.warning(f"({config['game']}) RSS akışında <item> bulunamadı: {url}")
+        return []
+
+    articles = []
+    for item in items:
         content_parts = []
         for tag in selectors['content']: # ['title', 'description']
-            element = item.find(tag)
-            if element:
-                content_parts.append(element.get_text(strip=True))
-        
-        if content_parts:
-            return "\n".join(content_parts)[:text_limit]
-            
+            element = feed_find(item, tag)
+            if element is not None and feed_text(element):
+                content_parts.append(feed_text(element))
+        if not content_parts:
+            continue
+        text = "\n".join(content_parts)[:limit]
+        guid, link = feed_find(item, "guid"), feed_find(item, "link")
+        link_url = feed_text(link) if link is not None else ""
+        article_id = (feed_text(guid) if guid is not None else "") or link_url or content_id(text)
+        articles.append({"id": article_id, "url": link_url or url, "text": text,
+                         "published": _published_at(feed_find(item, "pubDate"))})
+    if not articles:
         logging.warning(f"({config['game']}) RSS akışında seçiciler bulunamadı: {selectors['content']}")
+    return articles
+
+async def list_articles(fetcher, config, state=None, revalidate=True):
+    """Kaynağın stratejisine göre aday makaleleri döner."""
+    if config.get('strategy') == 'rss':
+        return await list_rss_articles(fetcher, config, state, revalidate)
+    return await list_html_articles(fetcher, config, state, revalidate)
+
+async def fetch_article_text(fetcher, config, article, state=None, revalidate=False):
+    """
+    Makalenin (AI'a gönderilecek, text_limit ile kırpılmış) metnini döner. Metin listeyle geldiyse
+    istek yapılmaz. 'state' verilirse detay sayfası koşullu çekilir ve 304'te NOT_MODIFIED döner.
+    """
+    if article.get('text'):
+        return article['text']
+    selectors = config['selectors']
+    source = config.get('safe_name', config['game'])
+    logging.info(f"  -> Detay sayfasına gidiliyor: {article['url']}")
+    with stage_timer("fetch", source):
+        detail_res = await conditional_get(fetcher, article['url'], state, revalidate=revalidate)
+    if detail_res is None:
+        logging.info(f"({config['game']}) Detay sayfası değişmemiş (304), ayrıştırma atlanıyor.")
+        return NOT_MODIFIED
+    with stage_timer("parse", source):
+        detail_document = await asyncio.to_thread(
+            parse_html, detail_res.content, declared_encoding(detail_res)
+        )
+
+    content_element = select_one(detail_document, selectors['content'])
+    if content_element is None:
+        logging.warning(f"({config['game']}) Detay sayfasında 'content' seçicisi bulunamadı: {selectors['content']}")
         return None
+    text = element_text(content_element, sections=is_chunked(config))
+    return text[:text_limit(config, 3500)] or None
 
+# --- Tek makale (sağlık kontrolü) ---
+
+async def fetch_latest_article(fetcher, config):
+    """Kaynaktaki en yeni makalenin metnini döner; bulunamazsa ya da hata olursa None."""
+    try:
+        articles = await list_articles(fetcher, config)
+        if articles:
+            text = await fetch_article_text(fetcher, config, articles[0])
+            if text:
+                return text
+        logging.warning(f"({config['game']}) İçin {config['url']} adresinden veri çekilemedi.")
+        return None
     except Exception as e:
-        logging.warning(f"({config['game']}) scraping hatası (generic_rss): {e}")
-        return None
\ No newline at end of file
+        logging.warning(f"({config['game']}) scraping hatası ({config.get('strategy')}): {e}")
+        return None
+
+async def fetch_html_generic(fetcher, config):
+    """sources.yaml'dan gelen 'html' stratejisine göre en yeni makalenin metnini çeker."""
+    return await fetch_latest_article(fetcher, config)
+
+async def fetch_rss_generic(fetcher, config):
+    """sources.yaml'dan gelen 'rss' stratejisine göre en yeni öğenin metnini çeker (Örn: Roblox)."""
+    return await fetch_latest_article(fetcher, config)
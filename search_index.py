@@ -0,0 +1,178 @@
+# search_index.py (YENİ - Yama değişiklikleri için ters index)
+#
+# Her oyun için tek bir kompakt arama index'i tutulur:
+#   {safe_name}/search.json
+#   {"game": ..., "version": 1, "docs": [[arşiv anahtarı, tarih, patch_version], ...],
+#    "changes": [[doc no, type, target, ability, details], ...],
+#    "terms": {"token": [change no, ...], "type:nerf": [...], "target:jett": [...], ...}}
+# Scraper her yeni arşivde index'e yalnızca o yamanın değişikliklerini ekler;
+# API index'i belleğe alır ve /public/search sorgularını arşiv okumadan yanıtlar.
+#
+# Mevcut arşivlerden index'leri yeniden üretmek için (bir kez, deploy sırasında):
+#     python search_index.py --rebuild
+
+import json
+import logging
+import re
+import sys
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+import archive_index
+
+SEARCH_FORMAT_VERSION = 1
+MIN_TOKEN_LENGTH = 2
+STOPWORDS = frozenset({
+    "the", "and", "for", "from", "with", "to", "of", "in", "on", "is", "now", "by", "an",
+    "ve", "ile", "bir", "bu", "için", "da", "de", "artık", "olarak", "daha",
+})
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+# Alan filtreleri bu öneklerle ayrı terimler olarak saklanır
+FILTER_FIELDS = ("type", "target", "ability")
+
+
+def search_key(safe_name: str) -> str:
+    return f"{safe_name}/search.json"
+
+
+def cache_key(safe_name: str) -> str:
+    """Ayrıştırılmış index'in API cache anahtarı; ham search.json ile aynı anahtarı paylaşmaz."""
+    return f"search:{safe_name}"
+
+
+def normalize(text: str) -> str:
+    return " ".join(str(text).casefold().split())
+
+
+def tokenize(text: str) -> List[str]:
+    return [
+        token for token in TOKEN_PATTERN.findall(str(text).casefold())
+        if len(token) >= MIN_TOKEN_LENGTH and token not in STOPWORDS
+    ]
+
+
+def new_index(game: Optional[str]) -> Dict:
+    return {"game": game, "version": SEARCH_FORMAT_VERSION, "docs": [], "changes": [], "terms": {}}
+
+
+def _change_terms(change_type: str, target: str, ability: str, details) -> set:
+    texts = [target, ability]
+    if isinstance(details, dict):
+        texts.extend([details.get("en", ""), details.get("tr", "")])
+    else:
+        texts.append(details)
+    terms = {token for text in texts if text for token in tokenize(text)}
+    for field, value in zip(FILTER_FIELDS, (change_type, target, ability)):
+        if value:
+            terms.add(f"{field}:{normalize(value)}")
+    return terms
+
+
+def add_patch(index: Dict, archive_key: str, date: str, patch: Dict) -> bool:
+    """Arşivlenen yamanın değişikliklerini index'e ekler. Arşiv zaten varsa False döner."""
+    if any(doc[0] == archive_key for doc in index["docs"]):
+        return False
+    doc_no = len(index["docs"])
+    index["docs"].append([archive_key, date, patch.get("patch_version", "unknown")])
+    terms = index["terms"]
+    for change in patch.get("changes", []):
+        change_type = str(change.get("type", "other")).lower()
+        target = change.get("target", "")
+        ability = change.get("ability", "")
+        details = change.get("details", "")
+        change_no = len(index["changes"])
+        index["changes"].append([doc_no, change_type, target, ability, details])
+        for term in _change_terms(change_type, target, ability, details):
+            terms.setdefault(term, []).append(change_no)
+    return True
+
+
+def dumps(index: Dict) -> bytes:
+    return json.dumps(index, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class SearchIndex:
+    """API tarafında belleğe alınmış, sorgulanabilir index."""
+
+    def __init__(self, data: Dict):
+        self.game = data.get("game")
+        self.docs = data.get("docs", [])
+        self.changes = data.get("changes", [])
+        self.terms = data.get("terms", {})
+
+    def search(self, query: Optional[str] = None, change_type: Optional[str] = None,
+               target: Optional[str] = None, ability: Optional[str] = None,
+               since: Optional[str] = None, until: Optional[str] = None) -> List[Dict]:
+        """Tüm koşulları sağlayan değişiklikleri yeniden eskiye sıralı döner.
+
+        Sorgu metnindeki her kelime (VE), tür / hedef / yetenek filtreleri (tam eşleşme)
+        ve tarih aralığı ([since, until), ISO 8601) uygulanır.
+        """
+        terms = tokenize(query) if query else []
+        for field, value in zip(FILTER_FIELDS, (change_type, target, ability)):
+            if value:
+                terms.append(f"{field}:{normalize(value)}")
+        if not terms:
+            return []
+
+        postings = sorted((self.terms.get(term, []) for term in terms), key=len)
+        matches = set(postings[0])
+        for posting in postings[1:]:
+            if not matches:
+                break
+            matches.intersection_update(posting)
+
+        results = []
+        for change_no in matches:
+            doc_no, change_type_, target_, ability_, details = self.changes[change_no]
+            archive_key, date, patch_version = self.docs[doc_no]
+            if (since and date < since) or (until and date >= until):
+                continue
+            results.append({
+                "game": self.game, "archive": archive_key, "date": date, "patch_version": patch_version,
+                "type": change_type_, "target": target_, "ability": ability_, "details": details,
+            })
+        results.sort(key=lambda result: (result["date"], result["archive"]), reverse=True)
+        return results
+
+
+def iter_archive_keys(s3_client, bucket: str, safe_name: str) -> Iterable[Dict]:
+    """Oyunun arşiv index'indeki girdileri (eski ya da parçalı format) eskiden yeniye döner."""
+    def read(key):
+        try:
+            return json.loads(s3_client.get_object(Bucket=bucket, Key=key)["Body"].read())
+        except s3_client.exceptions.NoSuchKey:
+            return None
+
+    head = read(archive_index.head_key(safe_name))
+    if not head:
+        return []
+    if "history" in head:
+        entries = head["history"]
+    else:
+        entries = []
+        for shard in head.get("shards", []):
+            entries.extend((read(shard["key"]) or {}).get("history", []))
+    return sorted(entries, key=lambda entry: entry["key"])
+
+
+def rebuild_index(s3_client, bucket: str, safe_name: str):
+    """Oyunun tüm arşivlerini okuyup arama index'ini sıfırdan yazar."""
+    index = new_index(None)
+    for entry in iter_archive_keys(s3_client, bucket, safe_name):
+        patch = json.loads(s3_client.get_object(Bucket=bucket, Key=entry["key"])["Body"].read())
+        index["game"] = index["game"] or patch.get("game")
+        add_patch(index, entry["key"], entry.get("date", ""), patch)
+    index["updated_at"] = datetime.utcnow().isoformat()
+    s3_client.put_object(Bucket=bucket, Key=search_key(safe_name), Body=dumps(index), ContentType="application/json")
+    logging.info(f"✅ {safe_name}: {len(index['docs'])} arşivden {len(index['changes'])} değişiklik index'lendi.")
+
+
+if __name__ == "__main__":
+    if "--rebuild" in sys.argv[1:]:
+        import main
+        logging.basicConfig(level=logging.INFO)
+        for game in main.SUPPORTED_GAMES:
+            rebuild_index(main.get_s3_client(), main.S3_BUCKET_NAME, game)
+    else:
+        print("Kullanım: python search_index.py --rebuild")
@@ -0,0 +1,23 @@
+# tests/test_import_time.py
+#
+# benchmarks/check_import_time.py'deki kontrollerin pytest sürümü: her modül ayrı
+# bir süreçte import edilir ve ağır bağımlılıkların (boto3, google.genai, bs4)
+# import sırasında yüklenmediği doğrulanır. `scrape --run=health` kontrolü
+# __main__'daki yolu çalıştırır; boto3 / botocore süreç boyunca yüklenmemelidir.
+
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+from check_import_time import CHECKS, profile_import  # noqa: E402
+
+
+@pytest.mark.parametrize("name, statement, forbidden", CHECKS, ids=[check[0] for check in CHECKS])
+def test_heavy_modules_are_loaded_lazily(name, statement, forbidden):
+    _, modules = profile_import(statement)
+    loaded = [module for module in forbidden if module in modules]
+    assert not loaded, f"{name}: yüklenmemesi gerekenler yüklendi: {', '.join(loaded)}"
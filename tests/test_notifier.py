@@ -0,0 +1,185 @@
+# tests/test_notifier.py
+#
+# notifier.py: mesaj bölme, uyarı özeti ve outbox davranışı (önceki
+# çalışmadan kalanların yeniden yüklenmesi, yeniden deneme, biçim hatasında
+# düz metin, kapanışta gönderilemeyenlerin outbox'ta kalması).
+# Kanallar sahtedir; ağa çıkılmaz.
+
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from notifier import DeliveryError, NotificationDispatcher, build_digest, split_message  # noqa: E402
+
+
+class FakeChannel:
+    def __init__(self, name="telegram", max_length=100, failures=()):
+        self.name = name
+        self.max_length = max_length
+        self.interval = 0.0
+        self.failures = list(failures)  # sırayla fırlatılacak hatalar; None = başarılı gönderim
+        self.sent = []
+        self.lock = threading.Lock()
+
+    def send(self, text, parse_mode):
+        with self.lock:
+            error = self.failures.pop(0) if self.failures else None
+        if error is not None:
+            raise error
+        self.sent.append((text, parse_mode))
+
+
+class DownChannel(FakeChannel):
+    def send(self, text, parse_mode):
+        raise DeliveryError("HTTP 503", 503, retry_after=0.05)
+
+
+class FakeOutbox:
+    def __init__(self, data=None):
+        self.data = data or {}
+        self.saves = []
+
+    def load(self):
+        return self.data
+
+    def save(self, data):
+        self.saves.append(data)
+        self.data = data
+
+
+def dispatcher(channels, outbox=None, **kwargs):
+    kwargs.setdefault("digest_window", 60)
+    kwargs.setdefault("drain_timeout", 5)
+    return NotificationDispatcher(channels, outbox=outbox, **kwargs)
+
+
+# --- split_message / build_digest ---
+
+def test_split_message_keeps_short_text():
+    assert split_message("kısa", 10) == ["kısa"]
+
+
+def test_split_message_prefers_paragraph_then_line_boundaries():
+    # Sınırın ikinci yarısındaki paragraf sonu, ondan sonraki satır sonuna tercih edilir.
+    text = "a" * 40 + "\n\n" + "b" * 10 + "\n" + "c" * 30
+    assert split_message(text, 70) == ["a" * 40, "b" * 10 + "\n" + "c" * 30]
+    assert split_message("x" * 30 + "\n" + "y" * 30, 40) == ["x" * 30, "y" * 30]
+
+
+def test_split_message_hard_splits_long_lines():
+    parts = split_message("z" * 95, 40)
+    assert parts == ["z" * 40, "z" * 40, "z" * 15]
+    assert all(len(part) <= 40 for part in split_message(("w" * 13 + "\n") * 50, 40))
+
+
+def test_build_digest_counts_repeated_alerts():
+    assert build_digest(["tek uyarı"]) == "tek uyarı"
+    digest = build_digest(["A", "B", "A"])
+    assert digest.startswith("3 uyarı (2 farklı):")
+    assert "• A (×2)" in digest and "• B" in digest and "B (×" not in digest
+
+
+# --- Kuyruk ve outbox ---
+
+def test_long_message_is_sent_in_order_as_parts():
+    channel = FakeChannel(max_length=50)
+    notifications = dispatcher([channel])
+    notifications.send("telegram", "\n".join(f"satır {i:02d} " + "." * 20 for i in range(6)), parse_mode="HTML")
+    notifications.close()
+    assert len(channel.sent) > 1
+    assert all(len(text) <= 50 for text, _ in channel.sent)
+    assert "\n".join(text for text, _ in channel.sent).startswith("satır 00")
+    assert channel.sent[-1][0].startswith("satır 05")
+
+
+def test_alerts_are_sent_as_one_digest_on_close():
+    channel = FakeChannel(max_length=4096)
+    notifications = dispatcher([channel])
+    notifications.alert("S3 hatası")
+    notifications.alert("S3 hatası")
+    notifications.alert("Gemini kotası")
+    notifications.close()
+    assert len(channel.sent) == 1
+    assert "3 uyarı (2 farklı)" in channel.sent[0][0]
+
+
+def test_leftovers_from_previous_run_are_reloaded_and_pruned():
+    now = time.time()
+    outbox = FakeOutbox({
+        "items": [
+            {"id": 7, "channel": "telegram", "text": "kalan", "parse_mode": None, "attempts": 2,
+             "next_attempt": now, "created": now - 60},
+            {"id": 8, "channel": "telegram", "text": "bayat", "parse_mode": None, "attempts": 0,
+             "next_attempt": now, "created": now - 48 * 3600},
+            {"id": 9, "channel": "slack", "text": "kanalsız", "parse_mode": None, "attempts": 0,
+             "next_attempt": now, "created": now},
+        ],
+        "alerts": [], "next_id": 10,
+    })
+    channel = FakeChannel()
+    notifications = dispatcher([channel], outbox)
+    notifications.send("telegram", "yeni")
+    notifications.close()
+    assert [text for text, _ in channel.sent] == ["kalan", "yeni"]
+    # Yeni bildirim önceki çalışmanın kimlikleriyle çakışmaz.
+    assert any(item["id"] == 10 for save in outbox.saves for item in save["items"])
+    assert outbox.data["items"] == []
+
+
+def test_transient_errors_are_retried():
+    channel = FakeChannel(failures=[DeliveryError("HTTP 429", 429, retry_after=0.05), None])
+    notifications = dispatcher([channel])
+    notifications.send("telegram", "mesaj")
+    notifications.close()
+    assert channel.sent == [("mesaj", None)]
+
+
+def test_rejected_html_is_resent_as_plain_text():
+    channel = FakeChannel(failures=[DeliveryError("HTTP 400: can't parse entities", 400)])
+    notifications = dispatcher([channel])
+    notifications.send("telegram", "<b>Yama</b> &amp; notlar", parse_mode="HTML")
+    notifications.close()
+    assert channel.sent == [("Yama & notlar", None)]
+
+
+def test_permanent_errors_are_dropped():
+    channel = FakeChannel(failures=[DeliveryError("HTTP 403", 403)])
+    outbox = FakeOutbox()
+    notifications = dispatcher([channel], outbox)
+    notifications.send("telegram", "mesaj")
+    notifications.close()
+    assert channel.sent == []
+    assert outbox.data["items"] == []
+
+
+def test_undelivered_items_survive_into_the_next_run():
+    outbox = FakeOutbox()
+    notifications = dispatcher([DownChannel()], outbox)
+    notifications.send("telegram", "mesaj")
+    notifications.alert("uyarı")
+    notifications.close(timeout=0.2)
+    assert [item["text"] for item in outbox.data["items"]] == ["mesaj", "🚨 GPNAI Servis Uyarısı 🚨\n\nuyarı"]
+    assert outbox.data["items"][0]["attempts"] >= 1
+
+    channel = FakeChannel(max_length=4096)
+    notifications = dispatcher([channel], outbox)
+    notifications.start()
+    notifications.close()
+    assert [text for text, _ in channel.sent] == ["mesaj", "🚨 GPNAI Servis Uyarısı 🚨\n\nuyarı"]
+    assert outbox.data["items"] == []
+
+
+@pytest.mark.parametrize("started", [True, False], ids=["closed-twice", "never-started"])
+def test_close_returns_immediately_when_not_running(started):
+    notifications = dispatcher([FakeChannel()])
+    if started:
+        notifications.send("telegram", "mesaj")
+        notifications.close()
+    begin = time.monotonic()
+    notifications.close()
+    assert time.monotonic() - begin < 0.1
@@ -0,0 +1,173 @@
+# tests/test_scrape_articles.py
+#
+# Çoklu makale akışı: collect_new_articles yeni makaleleri eskiden yeniye
+# döner (taban çizgisi, hash karşılaştırması, tek bir ölü linkin kaynağı
+# düşürmemesi) ve publish_articles onları sırayla yayınlar (yalnızca en yeni
+# makale _latest.json'ı günceller, hata olursa sonrakiler bekler).
+# Ağ ve S3 kullanılmaz; scrapers ve S3 yazma fonksiyonları sahteleriyle değiştirilir.
+
+import asyncio
+import concurrent.futures
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+LISTING_URL = "https://example.com/news/"
+
+
+@pytest.fixture(scope="module")
+def scrape(tmp_path_factory):
+    # scrape.py import sırasında bu değişkenleri kontrol eder ve çalışma dizinine scraper.log açar.
+    os.environ.setdefault("GEMINI_API_KEY", "test")
+    os.environ.setdefault("S3_BUCKET_NAME", "test")
+    cwd = os.getcwd()
+    os.chdir(tmp_path_factory.mktemp("scrape"))
+    try:
+        import scrape
+    finally:
+        os.chdir(cwd)
+    return scrape
+
+
+@pytest.fixture
+def source(scrape, monkeypatch):
+    """Listesi ve makale metinleri testte belirlenen sahte bir html kaynağı."""
+    listing, texts = [], {}
+
+    async def list_articles(fetcher, config, state=None, revalidate=True):
+        return listing
+
+    async def fetch_article_text(fetcher, config, article, state=None, revalidate=False):
+        text = texts[article["id"]]
+        if isinstance(text, Exception):
+            raise text
+        return text
+
+    monkeypatch.setattr(scrape.scrapers, "list_articles", list_articles)
+    monkeypatch.setattr(scrape.scrapers, "fetch_article_text", fetch_article_text)
+    config = {"game": "Test", "safe_name": "test", "strategy": "html", "url": LISTING_URL}
+
+    def collect(fetch_state, ids, backfill=0, **article_texts):
+        listing[:] = [{"id": article_id, "url": f"https://example.com/{article_id}"} for article_id in ids]
+        texts.clear()
+        texts.update(article_texts)
+        return asyncio.run(scrape.collect_new_articles(config, None, fetch_state, backfill))
+
+    return collect
+
+
+def validators(*urls):
+    return {url: {"etag": f'"{url}"'} for url in urls}
+
+
+def test_first_run_takes_older_articles_as_baseline(source):
+    state = {}
+    articles = source(state, ["c", "b", "a"], c="C", b="B", a="A")
+    assert [article["id"] for article in articles] == ["c"]
+    assert articles[0]["latest"] is True
+    assert state["baseline_articles"] == ["b", "a"]
+    assert state["seen_articles"] == []
+
+
+def test_new_articles_are_returned_oldest_first(source):
+    state = {"seen_articles": ["a"], "baseline_articles": [], "content_hash": "old"}
+    articles = source(state, ["c", "b", "a"], c="C", b="B")
+    assert [article["id"] for article in articles] == ["b", "c"]
+    assert [article["latest"] for article in articles] == [False, True]
+
+
+def test_unchanged_newest_is_marked_seen(scrape, source):
+    state = {"seen_articles": [], "content_hash": scrape.text_hash("C")}
+    assert source(state, ["c"], c="C") == []
+    assert state["seen_articles"] == ["c"]
+
+
+def test_dead_older_link_does_not_fail_the_source(source):
+    newest_url = "https://example.com/c"
+    state = {"seen_articles": ["a"], "detail_url": newest_url,
+             "validators": validators(LISTING_URL, newest_url, "https://example.com/stale")}
+    articles = source(state, ["c", "b", "a"], c="C", b=RuntimeError("404"))
+    assert [article["id"] for article in articles] == ["c"]
+    # Ana sayfa bir sonraki çalışmada 304 dönmesin; 'b' yeniden denenir.
+    assert set(state["validators"]) == {newest_url}
+
+
+def test_failed_newest_drops_its_own_validators(source):
+    newest_url = "https://example.com/c"
+    state = {"seen_articles": ["a"], "detail_url": newest_url, "validators": validators(LISTING_URL, newest_url)}
+    articles = source(state, ["c", "b", "a"], c=RuntimeError("timeout"), b="B")
+    assert [article["id"] for article in articles] == ["b"]
+    assert state["validators"] == {}
+
+
+def test_backfill_ignores_the_baseline(source):
+    state = {"seen_articles": [], "baseline_articles": ["b", "a"]}
+    articles = source(state, ["c", "b", "a"], backfill=3, c="C", b="B", a="A")
+    assert [article["id"] for article in articles] == ["a", "b", "c"]
+
+
+@pytest.fixture
+def publisher(scrape, monkeypatch):
+    """publish_articles'ı sahte S3 yazma ve bildirimlerle çalıştırır; yapılan çağrıları kaydeder."""
+    from scrape_state import ScrapeState
+
+    calls = {"saved": [], "telegram": [], "alerts": []}
+    monkeypatch.setattr(scrape, "save_json_to_s3_and_archive",
+                        lambda data, base_name, timestamp=None, update_latest=True:
+                        calls["saved"].append((data["id"], timestamp, update_latest)))
+    monkeypatch.setattr(scrape, "send_telegram_message", lambda text, parse_mode="HTML": calls["telegram"].append(text))
+    monkeypatch.setattr(scrape, "send_alert", lambda message: calls["alerts"].append(message))
+    monkeypatch.setattr(scrape, "format_patch_notes_for_telegram", lambda result: result["id"])
+    state = ScrapeState(s3_client=None, bucket="test")
+
+    def publish(ids, results, fetch_state, backfill=0):
+        articles = [{"id": article_id, "hash": f"hash-{article_id}", "latest": article_id == ids[-1]} for article_id in ids]
+        futures = []
+        for result in results:
+            future = concurrent.futures.Future()
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+            futures.append(future)
+        item = ("Test", articles, {"safe_name": "test"}, "NEW", fetch_state)
+        published = scrape.publish_articles(item, futures, state, backfill)
+        return published, state.data["sources"].get("test")
+
+    return publish, calls
+
+
+def test_publish_in_order_and_only_newest_updates_latest(publisher):
+    publish, calls = publisher
+    published, committed = publish(["a", "b", "c"], [{"id": "a"}, {"id": "b"}, {"id": "c"}], {"seen_articles": ["z"]})
+    assert published == 3
+    assert [(article_id, latest) for article_id, _, latest in calls["saved"]] == [("a", False), ("b", False), ("c", True)]
+    timestamps = [timestamp for _, timestamp, _ in calls["saved"]]
+    assert timestamps == sorted(timestamps) and len(set(timestamps)) == 3
+    assert calls["telegram"] == ["a", "b", "c"]
+    assert committed["seen_articles"] == ["c", "b", "a", "z"]
+    assert committed["content_hash"] == "hash-c"
+
+
+def test_failed_analysis_holds_back_later_articles(publisher):
+    publish, calls = publisher
+    fetch_state = {"seen_articles": [], "validators": validators(LISTING_URL)}
+    published, committed = publish(["a", "b", "c"], [{"id": "a"}, RuntimeError("quota"), {"id": "c"}], fetch_state)
+    assert published == 1
+    assert [article_id for article_id, _, _ in calls["saved"]] == ["a"]
+    assert committed["seen_articles"] == ["a"]
+    assert "content_hash" not in committed
+    # Kalan makaleler bir sonraki çalışmada 304 ile kaybolmasın.
+    assert committed["validators"] == {}
+    assert len(calls["alerts"]) == 1
+
+
+def test_backfill_sends_no_notifications(publisher):
+    publish, calls = publisher
+    published, _ = publish(["a", "b"], [{"id": "a"}, {"id": "b"}], {"seen_articles": []}, backfill=5)
+    assert published == 2
+    assert calls["telegram"] == []
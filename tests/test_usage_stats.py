@@ -0,0 +1,61 @@
+# tests/test_usage_stats.py
+#
+# /public/stats'ın okuduğu rollup anahtarları: pencereyi boşluksuz ve çakışmasız
+# kapsamalı, sayıları da MAX_WINDOW içinde MAX_WINDOW_KEYS'i aşmamalıdır.
+
+import os
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from usage_stats import MAX_WINDOW, MAX_WINDOW_KEYS, _next_month, window_keys  # noqa: E402
+
+
+def key_span(key):
+    """Rollup anahtarının kapsadığı [başlangıç, bitiş) aralığı."""
+    kind, name = key.split("/")[1:]
+    stamp = name[:-len(".json")]
+    if kind == "monthly":
+        start = datetime.strptime(stamp, "%Y%m")
+        return start, _next_month(start)
+    if kind == "daily":
+        start = datetime.strptime(stamp, "%Y%m%d")
+        return start, start + timedelta(days=1)
+    start = datetime.strptime(stamp, "%Y%m%d%H")
+    return start, start + timedelta(hours=1)
+
+
+def assert_tiles(since, until, keys):
+    cursor = since.replace(minute=0, second=0, microsecond=0)
+    for key in keys:
+        start, end = key_span(key)
+        assert start == cursor, f"{key}: boşluk ya da çakışma ({cursor} bekleniyordu)"
+        cursor = end
+    assert cursor >= until > cursor - timedelta(hours=1)
+
+
+def test_example_year_window():
+    # 1 Ocak 01:00 → 31 Aralık 01:00: 23 saat + 30 gün + 10 ay + 30 gün + 1 saat
+    keys = window_keys(datetime(2025, 1, 1, 1), datetime(2025, 12, 31, 1))
+    assert len(keys) == 94
+    assert sum(key.startswith("stats/monthly/") for key in keys) == 10
+    assert_tiles(datetime(2025, 1, 1, 1), datetime(2025, 12, 31, 1), keys)
+
+
+@pytest.mark.parametrize("length", [timedelta(days=7), timedelta(days=90), timedelta(days=365, hours=22), MAX_WINDOW],
+                         ids=["7d", "90d", "365d22h", "max"])
+def test_window_keys_are_bounded_and_tile_the_window(length):
+    # Artık yıl dahil iki yıl boyunca her gün, saat sınırına en uzak iki başlangıç denenir.
+    worst = 0
+    for day in range(2 * 366):
+        for hour in (1, 23):
+            since = datetime(2023, 1, 1, hour, 30) + timedelta(days=day)
+            keys = window_keys(since, since + length)
+            assert_tiles(since, since + length, keys)
+            worst = max(worst, len(keys))
+    assert worst <= MAX_WINDOW_KEYS
+    if length <= timedelta(days=7):
+        assert worst <= length // timedelta(hours=1) + 1
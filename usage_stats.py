@@ -0,0 +1,167 @@
+# usage_stats.py (YENİ - Kullanım istatistiği rollup'ları)
+#
+# API kullanım logları R2'ye yazılırken saatlik, günlük, aylık ve toplam özet
+# (rollup) nesneleri de artımlı olarak güncellenir. /public/stats böylece
+# tüm logs/ önekini taramak yerine birkaç küçük nesne okur: pencerenin tam
+# ayları aylık, kenarlarındaki tam günler günlük, kalan saatler saatlik nesneden.
+#
+# Mevcut loglardan rollup'ları yeniden üretmek için (bir kez, deploy sırasında;
+# aylık rollup'lar eklenmeden önceki aylar için de gereklidir):
+#     python usage_stats.py --rebuild
+
+import gzip
+import json
+import logging
+import sys
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+
+from botocore.exceptions import ClientError
+
+STATS_PREFIX = "stats/"
+TOTAL_ROLLUP_KEY = f"{STATS_PREFIX}total.json"
+MAX_WINDOW = timedelta(days=366)
+# MAX_WINDOW içindeki bir pencere için window_keys'in döndürebileceği en fazla anahtar:
+# baştaki ≤23 saat ve ≤30 gün, en fazla 12 tam ay, sondaki ≤30 gün ve ≤24 saat (yarım saat dahil).
+MAX_WINDOW_KEYS = 23 + 30 + 12 + 30 + 24
+MAX_WRITE_ATTEMPTS = 5
+
+
+def hourly_key(moment: datetime) -> str:
+    return f"{STATS_PREFIX}hourly/{moment:%Y%m%d%H}.json"
+
+
+def daily_key(moment: datetime) -> str:
+    return f"{STATS_PREFIX}daily/{moment:%Y%m%d}.json"
+
+
+def monthly_key(moment: datetime) -> str:
+    return f"{STATS_PREFIX}monthly/{moment:%Y%m}.json"
+
+
+def _next_month(moment: datetime) -> datetime:
+    return moment.replace(year=moment.year + moment.month // 12, month=moment.month % 12 + 1)
+
+
+def empty_rollup() -> Dict:
+    return {"requests": 0, "errors": 0, "latency_ms_sum": 0.0, "by_game": {}}
+
+
+def merge_rollup(target: Dict, source: Dict) -> Dict:
+    target["requests"] += source.get("requests", 0)
+    target["errors"] += source.get("errors", 0)
+    target["latency_ms_sum"] = round(target["latency_ms_sum"] + source.get("latency_ms_sum", 0.0), 2)
+    for game, count in source.get("by_game", {}).items():
+        target["by_game"][game] = target["by_game"].get(game, 0) + count
+    return target
+
+
+def rollup_entries(entries: Iterable[Dict]) -> Dict[str, Dict]:
+    """Log girdilerini saatlik, günlük, aylık ve toplam rollup anahtarlarına göre gruplar."""
+    rollups: Dict[str, Dict] = {}
+    for entry in entries:
+        try:
+            moment = datetime.fromisoformat(entry["timestamp"])
+        except (KeyError, ValueError):
+            continue
+        delta = {
+            "requests": 1,
+            "errors": 1 if entry.get("status_code", 0) >= 400 else 0,
+            "latency_ms_sum": entry.get("process_time_ms", 0.0),
+            "by_game": {entry.get("game_query", "unknown"): 1},
+        }
+        for key in (hourly_key(moment), daily_key(moment), monthly_key(moment), TOTAL_ROLLUP_KEY):
+            merge_rollup(rollups.setdefault(key, empty_rollup()), delta)
+    return rollups
+
+
+def _merge_into_object(s3_client, bucket: str, key: str, delta: Dict):
+    """Rollup nesnesini koşullu yazma ile günceller; başka bir worker araya girerse yeniden dener."""
+    for _ in range(MAX_WRITE_ATTEMPTS):
+        try:
+            response = s3_client.get_object(Bucket=bucket, Key=key)
+            current = json.loads(response["Body"].read())
+            condition = {"IfMatch": response["ETag"]}
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") not in ("404", "NoSuchKey"):
+                raise
+            current = empty_rollup()
+            condition = {"IfNoneMatch": "*"}
+
+        merged = merge_rollup(current, delta)
+        try:
+            s3_client.put_object(
+                Bucket=bucket, Key=key, Body=json.dumps(merged).encode("utf-8"),
+                ContentType="application/json", **condition,
+            )
+            return
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") not in ("PreconditionFailed", "412", "ConditionalRequestConflict", "409"):
+                raise
+    raise RuntimeError(f"Rollup güncellenemedi, çok fazla eşzamanlı yazma: {key}")
+
+
+def apply_entries_to_rollups(s3_client, bucket: str, entries: List[Dict]):
+    """Yeni yazılan log girdilerini R2'deki rollup nesnelerine işler."""
+    for key, delta in rollup_entries(entries).items():
+        _merge_into_object(s3_client, bucket, key, delta)
+
+
+def window_keys(since: datetime, until: datetime) -> List[str]:
+    """[since, until) aralığını kapsayan en az sayıda rollup anahtarını döner.
+
+    Tam aylar için aylık, ay kenarlarındaki tam günler için günlük, gün kenarlarındaki
+    saatler için saatlik nesneler kullanılır. Okuma sayısı sabit değildir, pencerenin ay ve
+    gün sınırlarına göre değişir; ancak MAX_WINDOW içinde MAX_WINDOW_KEYS ile sınırlıdır.
+    """
+    cursor = since.replace(minute=0, second=0, microsecond=0)
+    keys = []
+    while cursor < until:
+        next_day = cursor + timedelta(days=1)
+        if cursor.day == 1 and cursor.hour == 0 and _next_month(cursor) <= until:
+            keys.append(monthly_key(cursor))
+            cursor = _next_month(cursor)
+        elif cursor.hour == 0 and next_day <= until:
+            keys.append(daily_key(cursor))
+            cursor = next_day
+        else:
+            keys.append(hourly_key(cursor))
+            cursor += timedelta(hours=1)
+    return keys
+
+
+def summarize_rollups(rollups: Iterable[Optional[Dict]]) -> Dict:
+    total = empty_rollup()
+    for rollup in rollups:
+        if rollup:
+            merge_rollup(total, rollup)
+    return total
+
+
+def rebuild_rollups(s3_client, bucket: str):
+    """Tüm logs/ önekini tarayıp rollup nesnelerini sıfırdan yazar."""
+    entries = []
+    paginator = s3_client.get_paginator("list_objects_v2")
+    for page in paginator.paginate(Bucket=bucket, Prefix="logs/"):
+        for obj in page.get("Contents", []):
+            content = s3_client.get_object(Bucket=bucket, Key=obj["Key"])["Body"].read()
+            if obj["Key"].endswith(".gz"):
+                content = gzip.decompress(content)
+            content = content.decode("utf-8")
+            entries.extend(json.loads(line) for line in content.splitlines() if line.strip())
+
+    rollups = rollup_entries(entries)
+    for key, rollup in rollups.items():
+        s3_client.put_object(
+            Bucket=bucket, Key=key, Body=json.dumps(rollup).encode("utf-8"), ContentType="application/json"
+        )
+    logging.info(f"✅ {len(entries)} log girdisinden {len(rollups)} rollup nesnesi yazıldı.")
+
+
+if __name__ == "__main__":
+    if "--rebuild" in sys.argv[1:]:
+        import main
+        logging.basicConfig(level=logging.INFO)
+        rebuild_rollups(main.get_s3_client(), main.S3_BUCKET_NAME)
+    else:
+        print("Kullanım: python usage_stats.py --rebuild")
@@ -1,13 +1,101 @@
+import hashlib
 import json
 import os
+import random
+import threading
+import time
 import logging
+from contextlib import contextmanager
 from dotenv import load_dotenv
-from google import genai
 from pydantic import BaseModel, Field, ValidationError # YENİ EKLENDİ
 from typing import Dict, List, Literal, Optional # YENİ EKLENDİ
 
 load_dotenv()
-client = genai.Client(api_key=os.getenv("GEMINI_API_KEY"))
+
+# google.genai ağır bir paket: yalnızca ilk Gemini çağrısında yüklenir (health modu hiç yüklemez).
+_client = None
+_client_lock = threading.Lock()
+
+def get_client():
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                from google import genai
+                _client = genai.Client(api_key=os.getenv("GEMINI_API_KEY"))
+    return _client
+
+GEMINI_MODEL = "gemini-2.5-flash"
+# API kotasına göre ayarlanır: dakikadaki istek sayısı ve aynı anda açık istek sınırı
+GEMINI_RPM = int(os.getenv("GEMINI_RPM", "10"))
+GEMINI_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", "3"))
+GEMINI_MAX_RETRIES = int(os.getenv("GEMINI_MAX_RETRIES", "4"))
+RETRYABLE_STATUS_CODES = (429, 500, 503)
+
+# --- YENİ: Hız Sınırlayıcı (Token Bucket) ---
+
+class RateLimiter:
+    """
+    Thread-safe token bucket + eşzamanlı istek sınırı.
+    Kota hatası alındığında pause() ile tüm thread'ler birlikte bekletilir.
+    """
+
+    def __init__(self, requests_per_minute: int, max_in_flight: int):
+        self.rate = max(1, requests_per_minute) / 60.0  # saniyedeki token
+        self.capacity = max(1, min(requests_per_minute, max_in_flight))
+        self.tokens = float(self.capacity)
+        self.updated_at = time.monotonic()
+        self.blocked_until = 0.0
+        self.lock = threading.Lock()
+        self.semaphore = threading.BoundedSemaphore(max(1, max_in_flight))
+
+    def pause(self, seconds: float):
+        with self.lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+    def _take_token(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if now >= self.blocked_until and self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = max(self.blocked_until - now, (1 - self.tokens) / self.rate)
+            time.sleep(wait)
+
+    @contextmanager
+    def slot(self):
+        with self.semaphore:
+            self._take_token()
+            yield
+
+gemini_limiter = RateLimiter(GEMINI_RPM, GEMINI_MAX_CONCURRENCY)
+
+def generate_with_retry(prompt: str, game_name: str):
+    """Gemini çağrısını hız sınırlayıcı altında yapar; kota / geçici hatalarda üstel bekleme ile yeniden dener."""
+    from google.genai import errors as genai_errors, types as genai_types
+
+    client = get_client()
+    for attempt in range(GEMINI_MAX_RETRIES + 1):
+        with gemini_limiter.slot():
+            try:
+                return client.models.generate_content(
+                    model=GEMINI_MODEL,
+                    contents=prompt,
+                    config=genai_types.GenerateContentConfig(
+                        system_instruction=SYSTEM_INSTRUCTION,
+                        response_mime_type="application/json"
+                    ),
+                )
+            except genai_errors.APIError as e:
+                if e.code not in RETRYABLE_STATUS_CODES or attempt == GEMINI_MAX_RETRIES:
+                    raise
+                error_code = e.code
+                delay = min(60, 5 * 2 ** attempt) + random.uniform(0, 2)
+        logging.warning(f"⏳ Gemini kota/geçici hata ({game_name}, kod {error_code}). {delay:.1f}s sonra tekrar denenecek ({attempt + 1}/{GEMINI_MAX_RETRIES}).")
+        gemini_limiter.pause(delay)
 
 # --- YENİ EKLENDİ: Pydantic Modelleri (AI Çıktı Şeması) ---
 
@@ -44,8 +132,119 @@ ANA KURALLAR:
 7.  `type` alanı SADECE şunlardan biri olabilir: "nerf", "buff", "new", "fix", "other".
 """
 
-def analyze_with_gemini(raw_text: str, game_name: str, send_alert: callable):
+# Prompt şablonu değiştiğinde artırılmalı; eski cache girdileri böylece geçersiz olur.
+PROMPT_VERSION = "v4"
+
+# --- YENİ: Analiz Sonuç Cache'i (İçerik Adresli) ---
+
+class AnalysisCache:
+    """
+    Doğrulanmış PatchResult sonuçlarını (ham metin, prompt sürümü, sistem talimatı, model)
+    özetine göre saklar. S3 client verilirse S3'te, verilmezse yerel diskte tutar.
+
+    Eviction: S3'te 'max_age_days' günden eski girdiler prune() ile silinir;
+    diskte en eski erişilen girdiler 'max_entries' sınırına göre silinir.
+    """
+
+    def __init__(self, s3_client=None, bucket=None, prefix="_cache/gemini/",
+                 local_dir=".gemini_cache", max_entries=500, max_age_days=90):
+        self.s3_client = s3_client
+        self.bucket = bucket
+        self.prefix = prefix
+        self.local_dir = local_dir
+        self.max_entries = max_entries
+        self.max_age_days = max_age_days
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        if self.s3_client is None:
+            os.makedirs(self.local_dir, exist_ok=True)
+
+    @staticmethod
+    def key_for(raw_text: str, game_name: str) -> str:
+        material = json.dumps([PROMPT_VERSION, GEMINI_MODEL, SYSTEM_INSTRUCTION, game_name, raw_text], ensure_ascii=False)
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def _record(self, hit: bool):
+        with self.lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get(self, key: str) -> Optional[dict]:
+        try:
+            if self.s3_client is not None:
+                response = self.s3_client.get_object(Bucket=self.bucket, Key=f"{self.prefix}{key}.json")
+                result = json.loads(response["Body"].read())
+            else:
+                path = os.path.join(self.local_dir, f"{key}.json")
+                with open(path, "r", encoding="utf-8") as f:
+                    result = json.load(f)
+                os.utime(path)  # LRU için erişim zamanını güncelle
+            # Şema değişmişse eski girdi kullanılmaz
+            result = PatchResult.parse_obj(result).dict()
+        except Exception:
+            self._record(hit=False)
+            return None
+        self._record(hit=True)
+        return result
+
+    def put(self, key: str, result: dict):
+        body = json.dumps(result, ensure_ascii=False)
+        try:
+            if self.s3_client is not None:
+                self.s3_client.put_object(
+                    Bucket=self.bucket, Key=f"{self.prefix}{key}.json", Body=body.encode("utf-8"),
+                    ContentType="application/json",
+                )
+            else:
+                with open(os.path.join(self.local_dir, f"{key}.json"), "w", encoding="utf-8") as f:
+                    f.write(body)
+                self._evict_local()
+        except Exception as e:
+            logging.warning(f"Gemini cache yazma hatası ({key[:12]}): {e}")
+
+    def _evict_local(self):
+        with self.lock:
+            paths = [os.path.join(self.local_dir, name) for name in os.listdir(self.local_dir) if name.endswith(".json")]
+            if len(paths) <= self.max_entries:
+                return
+            paths.sort(key=os.path.getmtime)
+            for path in paths[:len(paths) - self.max_entries]:
+                os.remove(path)
+
+    def prune(self):
+        """S3'te süresi dolmuş girdileri siler."""
+        if self.s3_client is None:
+            return
+        cutoff = time.time() - self.max_age_days * 86400
+        expired = []
+        paginator = self.s3_client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self.prefix):
+            expired.extend({"Key": obj["Key"]} for obj in page.get("Contents", [])
+                           if obj["LastModified"].timestamp() < cutoff)
+        for i in range(0, len(expired), 1000):
+            self.s3_client.delete_objects(Bucket=self.bucket, Delete={"Objects": expired[i:i + 1000]})
+        if expired:
+            logging.info(f"🧹 Gemini cache: {len(expired)} eski girdi silindi.")
+
+    def stats(self) -> Dict[str, int]:
+        with self.lock:
+            return {"hits": self.hits, "misses": self.misses}
+
+def analyze_with_gemini(raw_text: str, game_name: str, send_alert: callable,
+                        cache: Optional[AnalysisCache] = None):
     
+    cache_key = None
+    if cache is not None:
+        cache_key = cache.key_for(raw_text, game_name)
+        cached_result = cache.get(cache_key)
+        if cached_result is not None:
+            logging.info(f"♻️ Gemini cache isabeti ({game_name}): {cache_key[:12]}. API çağrısı atlanıyor.")
+            return cached_result
+
+
     # GÜNCELLENMİŞ PROMPT (v4) - JSON Formatı Pydantic'e uyumlu hale getirildi
     prompt = f"""
     Aşağıdaki oyun yama notu metnini analiz et.
@@ -83,14 +282,7 @@ def analyze_with_gemini(raw_text: str, game_name: str, send_alert: callable):
     """
 
     try:
-        response = client.models.generate_content(
-            model="gemini-2.5-flash", # Model adını güncelledim
-            contents=prompt,
-            system_instruction=SYSTEM_INSTRUCTION,
-            config=genai.types.GenerateContentConfig(
-                response_mime_type="application/json" 
-            ),
-        )
+        response = generate_with_retry(prompt, game_name)
         
         content = response.text.strip()
             
@@ -104,7 +296,10 @@ def analyze_with_gemini(raw_text: str, game_name: str, send_alert: callable):
             validated_data = PatchResult.parse_obj(raw_json_data)
             
             # 3. Pydantic modelini tekrar standart dict'e çevirerek döndür
-            return validated_data.dict()
+            result = validated_data.dict()
+            if cache is not None:
+                cache.put(cache_key, result)
+            return result
 
         except ValidationError as e:
             # Pydantic doğrulaması başarısız oldu (örn: 'tr' anahtarı eksik, 'target' çok uzun)
@@ -125,4 +320,65 @@ def analyze_with_gemini(raw_text: str, game_name: str, send_alert: callable):
         error_msg = f"❌ Gemini API Çağrı Hatası ({game_name}): {e}\nResponse: {response.text if 'response' in locals() else 'No response'}"
         logging.error(error_msg)
         send_alert(error_msg) 
-        return None
\ No newline at end of file
+        return None
+
+# --- YENİ: Parçalı (map-reduce) Analiz ---
+# Uzun yama notları text_limit ile kırpılmak yerine bölüm sınırlarından parçalara ayrılır
+# (bkz. chunking.py). Her parça analyze_with_gemini ile ayrı analiz edilir (map); hız
+# sınırı ve cache parça başınadır, yani düzenlenen bir sayfada yalnızca değişen parçalar
+# için API çağrısı yapılır. Sonuçlar tek bir PatchResult'ta birleştirilir (reduce).
+
+def _change_identity(change: Dict) -> tuple:
+    """Parçalar arasında tekrarlanan değişiklikleri ayıklamak için normalize anahtar."""
+    normalize = lambda value: " ".join(str(value or "").split()).casefold()
+    return (change["type"], normalize(change["target"]), normalize(change.get("ability")),
+            normalize(change["details"]["en"]))
+
+def merge_patch_results(results: List[Dict], game_name: str) -> Dict:
+    """Parça sonuçlarını sırayla birleştirir: sürüm / tarih ilk bilinen değerden alınır,
+    aynı değişiklik birden fazla parçada geçiyorsa bir kez tutulur."""
+    merged = {"game": game_name, "patch_version": "unknown", "date": "unknown", "changes": []}
+    seen = set()
+    for result in results:
+        for field in ("patch_version", "date"):
+            if merged[field] == "unknown" and str(result.get(field) or "unknown").lower() != "unknown":
+                merged[field] = result[field]
+        for change in result.get("changes", []):
+            identity = _change_identity(change)
+            if identity not in seen:
+                seen.add(identity)
+                merged["changes"].append(change)
+    return PatchResult.parse_obj(merged).dict()
+
+def analyze_chunked(raw_text: str, game_name: str, send_alert: callable,
+                    cache: Optional[AnalysisCache] = None, chunk_size: Optional[int] = None):
+    """Metni parçalara bölüp eşzamanlı analiz eder ve birleşik sonucu döner.
+
+    Herhangi bir parça başarısız olursa None döner (eksik yama yayınlanmaz); başarılı
+    parçalar cache'te kaldığı için sonraki denemede yalnızca eksikler analiz edilir.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    from chunking import DEFAULT_CHUNK_SIZE, split_into_chunks
+
+    chunks = split_into_chunks(raw_text, chunk_size or DEFAULT_CHUNK_SIZE)
+    if len(chunks) <= 1:
+        return analyze_with_gemini(raw_text, game_name, send_alert, cache=cache)
+
+    logging.info(f"🧩 {game_name}: metin {len(raw_text)} karakter, {len(chunks)} parça halinde analiz ediliyor.")
+    # Eşzamanlılık asıl olarak gemini_limiter ile sınırlıdır; havuz yalnızca parçaları sıraya koyar.
+    with ThreadPoolExecutor(max_workers=min(len(chunks), GEMINI_MAX_CONCURRENCY),
+                            thread_name_prefix="gemini-chunk") as executor:
+        results = list(executor.map(
+            lambda chunk: analyze_with_gemini(chunk, game_name, send_alert, cache=cache), chunks))
+
+    failed = sum(1 for result in results if not result)
+    if failed:
+        logging.error(f"❌ {game_name}: {len(chunks)} parçanın {failed} tanesi analiz edilemedi.")
+        return None
+    try:
+        return merge_patch_results(results, game_name)
+    except ValidationError as e:
+        error_msg = f"❌ Gemini Parça Birleştirme Hatası ({game_name}): {e}"
+        logging.error(error_msg)
+        send_alert(error_msg)
+        return None